@@ -27,6 +27,13 @@ load_dotenv()
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('SECRET_KEY')
 
+# Fernet key (urlsafe base64) untuk encrypt API key third-party service.
+# Jika kosong, key diderive dari SECRET_KEY saat pertama kali dipakai.
+ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY')
+
+# Key lama yang masih boleh decrypt, dipisah koma (lihat `manage.py rotate_encryption_keys`)
+ENCRYPTION_OLD_KEYS = [key for key in os.getenv('ENCRYPTION_OLD_KEYS', '').split(',') if key]
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
@@ -68,6 +75,7 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    'services.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -130,6 +138,119 @@ CACHES = {
     }
 }
 
+# TTL (detik) negative cache untuk response 400/404/422 dari upstream, per service
+NEGATIVE_CACHE_TTL = {
+    'default': 60,
+    'github': 600,
+    'coingecko': 300,
+    'openweather': 300,
+}
+
+# Berapa lama (detik) setelah expired response cache masih boleh dipakai saat upstream overload
+STALE_CACHE_TTL = int(os.getenv('STALE_CACHE_TTL', 3600))
+
+# Admission control per upstream service (lihat services/utils/admission.py).
+# 'default' berlaku untuk semua service, key lain meng-override per service.
+ADMISSION_CONTROL = {
+    'default': {
+        'initial_limit': 10,
+        'max_limit': 50,
+        'queue_size': 20,
+        'queue_timeout': 2.0,
+        'retry_after': 5,
+    },
+}
+
+# Timeout adaptif dan hedging per upstream service (lihat services/utils/latency.py)
+UPSTREAM_LATENCY = {
+    'default': {
+        'min_samples': 20,
+        'timeout_multiplier': 3.0,
+        'min_timeout': 2.0,
+        'max_timeout': 15.0,
+    },
+    'coingecko': {'hedge': True},
+    'newsapi': {'hedge': True},
+}
+# Bagian maksimal request tambahan dari hedging (0.1 = +10%)
+HEDGE_BUDGET = float(os.getenv('HEDGE_BUDGET', 0.1))
+
+# Tier cache shared-memory di depan FileCache untuk semua worker di host yang sama
+# (lihat services/utils/shared_cache.py). Matikan jika api_cache dibagi antar host.
+SHARED_CACHE = {
+    'enabled': os.getenv('SHARED_CACHE_ENABLED', 'True') == 'True',
+    'path': os.getenv('SHARED_CACHE_PATH') or None,
+    'slots': int(os.getenv('SHARED_CACHE_SLOTS', 2048)),
+    'slot_size': int(os.getenv('SHARED_CACHE_SLOT_SIZE', 16384)),
+}
+
+# Backend koordinasi antar node (Redis, lihat services/utils/coordination.py): cache API
+# bersama, counter rate limit, single-flight lock dan state circuit breaker.
+# Kosongkan REDIS_URL untuk koordinasi per node saja.
+COORDINATION_BACKEND = {
+    'url': os.getenv('REDIS_URL', ''),
+    'prefix': os.getenv('REDIS_PREFIX', 'api-aggregator:'),
+    'timeout': float(os.getenv('REDIS_TIMEOUT', 0.5)),
+}
+
+# TTL cache adaptif per endpoint (lihat services/utils/adaptive_ttl.py): TTL statis endpoint
+# dinaikkan selama response tidak berubah dan diturunkan saat berubah, dalam batas min/max.
+ADAPTIVE_TTL = {
+    'default': {
+        'enabled': os.getenv('ADAPTIVE_TTL_ENABLED', 'True') == 'True',
+        # Kosong: batas bawah min_ratio x TTL statis endpoint (isi per service untuk batas tetap)
+        'min_ttl': int(os.environ['ADAPTIVE_TTL_MIN']) if os.getenv('ADAPTIVE_TTL_MIN') else None,
+        'max_ttl': int(os.getenv('ADAPTIVE_TTL_MAX', 86400)),
+    },
+}
+
+# Circuit breaker per provider untuk failover (lihat services/providers.py)
+CIRCUIT_BREAKER = {
+    'failure_threshold': int(os.getenv('CIRCUIT_BREAKER_FAILURES', 5)),
+    'cooldown': int(os.getenv('CIRCUIT_BREAKER_COOLDOWN', 30)),
+}
+
+# Instrumentasi request (lihat services/utils/metrics.py): header Server-Timing dan /metrics.
+# /metrics hanya untuk staff, atau scraper dengan 'Authorization: Bearer <METRICS_TOKEN>'.
+METRICS = {
+    'server_timing': os.getenv('SERVER_TIMING_HEADER', 'True') == 'True',
+    'token': os.getenv('METRICS_TOKEN', ''),
+}
+
+# Store time-series market_chart lokal (lihat services/utils/timeseries_store.py)
+MARKET_CHART_STORE_DIR = os.getenv('MARKET_CHART_STORE_DIR', os.path.join(BASE_DIR, 'timeseries'))
+MARKET_CHART_REFRESH_INTERVAL = int(os.getenv('MARKET_CHART_REFRESH_INTERVAL', 300))
+
+# Ukuran grid (derajat) untuk cache cuaca berbasis koordinat, 0.01 ~ 1 km
+WEATHER_GEO_GRID = float(os.getenv('WEATHER_GEO_GRID', 0.01))
+
+# Window micro-batching /simple/price dalam milidetik (0 = nonaktif). Hanya berguna di worker
+# gthread/ASGI, dan hanya dipakai saat ada request /simple/price lain yang sedang berjalan
+SIMPLE_PRICE_BATCH_WINDOW_MS = int(os.getenv('SIMPLE_PRICE_BATCH_WINDOW_MS', 0))
+
+# Interval poll (detik) untuk stream harga SSE /api/simple/price/stream/
+PRICE_STREAM_INTERVAL = int(os.getenv('PRICE_STREAM_INTERVAL', 10))
+
+# Index pencarian coin lokal (lihat services/utils/search_index.py)
+COIN_SEARCH_REFRESH_INTERVAL = int(os.getenv('COIN_SEARCH_REFRESH_INTERVAL', 6 * 3600))
+COIN_SEARCH_RANK_PAGES = int(os.getenv('COIN_SEARCH_RANK_PAGES', 4))
+# Jeda sebelum refresh index yang gagal dicoba lagi
+COIN_SEARCH_RETRY_INTERVAL = int(os.getenv('COIN_SEARCH_RETRY_INTERVAL', 60))
+
+# Rate limit per API key berdasarkan plan (format: <jumlah>/<s|m|h|d>)
+API_RATE_LIMIT_PLANS = {
+    'free': '10/m',
+    'pro': '100/m',
+    'enterprise': '1000/m',
+}
+
+# Counter rate limit tanpa Redis: file mmap yang dibagi semua worker di host ini
+# (services/utils/rate_limiter.py SharedCounterStore), default di /dev/shm
+RATE_LIMIT_STORE = {
+    'path': os.getenv('RATE_LIMIT_STORE_PATH') or None,
+    'slots': int(os.getenv('RATE_LIMIT_STORE_SLOTS', 65536)),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,68 @@
+"""
+Benchmark waktu startup: berapa lama `django.setup()` (yang mengimport services.models)
+dan encrypt/decrypt pertama, dengan key diderive dari SECRET_KEY vs ENCRYPTION_KEY dari env.
+
+Jalankan dari root project:
+    python benchmarks/bench_startup.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+
+SNIPPET = """
+import time
+t0 = time.perf_counter()
+import django
+django.setup()
+import services.models
+t1 = time.perf_counter()
+from services.utils.encryption_service import encryption_service
+encryption_service.decrypt(encryption_service.encrypt('benchmark'))
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+
+def run(env_overrides):
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'benchmark-secret-key')
+    env['DJANGO_SETTINGS_MODULE'] = 'api_aggregator.settings'
+    env.pop('ENCRYPTION_KEY', None)
+    env.update(env_overrides)
+
+    setup_times, first_use_times = [], []
+    for _ in range(RUNS):
+        output = subprocess.check_output([sys.executable, '-c', SNIPPET], cwd=ROOT, env=env, text=True)
+        setup, first_use = map(float, output.split())
+        setup_times.append(setup * 1000)
+        first_use_times.append(first_use * 1000)
+    return statistics.median(setup_times), statistics.median(first_use_times)
+
+
+def main():
+    sys.path.insert(0, ROOT)
+    from cryptography.fernet import Fernet
+
+    scenarios = [
+        ('derived from SECRET_KEY', {}),
+        ('ENCRYPTION_KEY from env', {'ENCRYPTION_KEY': Fernet.generate_key().decode()}),
+    ]
+
+    from services.utils.encryption_service import derive_key
+    start = time.perf_counter()
+    derive_key('benchmark-secret-key')
+    print(f"PBKDF2 derivation previously paid at import: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print(f"{'scenario':<28}{'django.setup (ms)':>20}{'first encrypt (ms)':>20}")
+    for name, env in scenarios:
+        setup, first_use = run(env)
+        print(f"{name:<28}{setup:>20.1f}{first_use:>20.1f}")
+
+
+if __name__ == '__main__':
+    main()
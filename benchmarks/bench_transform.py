@@ -0,0 +1,170 @@
+"""
+Benchmark transformasi response: ukuran body upstream vs dokumen yang di-cache,
+per endpoint yang punya Transform, plus biaya transformasi per request.
+
+Payload dibuat sintetis dengan bentuk yang sama seperti response asli
+(jumlah bahasa, jumlah artikel, dst. mengikuti response upstream yang umum).
+
+Jalankan dari root project:
+    python benchmarks/bench_transform.py
+"""
+import copy
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.endpoints import get_endpoint  # noqa: E402
+
+LANGUAGES = ['en', 'de', 'es', 'fr', 'it', 'pl', 'ro', 'hu', 'nl', 'pt', 'sv', 'vi', 'tr', 'ru', 'ja',
+             'zh', 'zh-tw', 'ko', 'ar', 'th', 'id', 'cs', 'da', 'el', 'hi', 'no', 'sk', 'uk', 'he',
+             'fi', 'bg', 'hr', 'lt', 'sl']
+CURRENCIES = ['usd', 'eur', 'idr', 'jpy', 'gbp', 'aud', 'cad', 'chf', 'cny', 'hkd', 'inr', 'krw', 'sgd',
+              'btc', 'eth', 'ltc', 'bch', 'bnb', 'eos', 'xrp', 'xlm', 'link', 'dot', 'yfi', 'ars', 'bdt',
+              'bhd', 'bmd', 'brl', 'clp', 'czk', 'dkk', 'huf', 'ils', 'kwd', 'lkr', 'mmk', 'mxn', 'myr',
+              'ngn', 'nok', 'nzd', 'php', 'pkr', 'pln', 'rub', 'sar', 'sek', 'thb', 'try', 'twd', 'uah',
+              'vef', 'vnd', 'zar', 'xdr', 'xag', 'xau', 'bits', 'sats']
+DESCRIPTION = "Bitcoin is the first successful internet money based on peer-to-peer technology. " * 30
+
+
+def per_currency(value):
+    return {currency: value * (i + 1) for i, currency in enumerate(CURRENCIES)}
+
+
+def coin_detail():
+    return {
+        'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin', 'web_slug': 'bitcoin',
+        'asset_platform_id': None, 'platforms': {'': ''}, 'detail_platforms': {'': {'decimal_place': None}},
+        'block_time_in_minutes': 10, 'hashing_algorithm': 'SHA-256',
+        'categories': ['Cryptocurrency', 'Layer 1 (L1)', 'FTX Holdings', 'Proof of Work (PoW)'],
+        'preview_listing': False, 'public_notice': None, 'additional_notices': [],
+        'localization': {lang: 'Bitcoin' for lang in LANGUAGES},
+        'description': {lang: DESCRIPTION for lang in LANGUAGES},
+        'links': {
+            'homepage': ['http://www.bitcoin.org', '', ''], 'whitepaper': 'https://bitcoin.org/bitcoin.pdf',
+            'blockchain_site': [f'https://explorer{i}.example.com/btc' for i in range(10)],
+            'official_forum_url': ['https://bitcointalk.org/'], 'chat_url': ['', '', ''],
+            'announcement_url': ['', ''], 'twitter_screen_name': 'bitcoin',
+            'facebook_username': 'bitcoins', 'subreddit_url': 'https://www.reddit.com/r/Bitcoin/',
+            'repos_url': {'github': ['https://github.com/bitcoin/bitcoin'], 'bitbucket': []},
+        },
+        'image': {'thumb': 'https://example.com/thumb.png', 'small': 'https://example.com/small.png',
+                  'large': 'https://example.com/large.png'},
+        'country_origin': '', 'genesis_date': '2009-01-03',
+        'sentiment_votes_up_percentage': 84.07, 'sentiment_votes_down_percentage': 15.93,
+        'watchlist_portfolio_users': 1541900, 'market_cap_rank': 1,
+        'market_data': {
+            key: per_currency(123.45) for key in [
+                'current_price', 'ath', 'ath_change_percentage', 'ath_date', 'atl',
+                'atl_change_percentage', 'atl_date', 'market_cap', 'fully_diluted_valuation',
+                'total_volume', 'high_24h', 'low_24h', 'price_change_24h_in_currency',
+                'price_change_percentage_1h_in_currency', 'price_change_percentage_24h_in_currency',
+                'price_change_percentage_7d_in_currency', 'price_change_percentage_14d_in_currency',
+                'price_change_percentage_30d_in_currency', 'price_change_percentage_60d_in_currency',
+                'price_change_percentage_200d_in_currency', 'price_change_percentage_1y_in_currency',
+                'market_cap_change_24h_in_currency', 'market_cap_change_percentage_24h_in_currency',
+            ]
+        } | {
+            'price_change_percentage_24h': 1.2, 'price_change_percentage_7d': 3.4,
+            'price_change_percentage_30d': 5.6, 'total_supply': 21000000.0,
+            'max_supply': 21000000.0, 'circulating_supply': 19700000.0,
+        },
+        'community_data': {'facebook_likes': None, 'reddit_subscribers': 0},
+        'developer_data': {'forks': 36426, 'stars': 73168, 'commit_count_4_weeks': 108},
+        'status_updates': [],
+        'last_updated': '2024-01-01T00:00:00.000Z',
+        'tickers': [
+            {'base': 'BTC', 'target': 'USDT', 'market': {'name': f'Exchange {i}', 'identifier': f'ex{i}'},
+             'last': 42000.0, 'volume': 12345.6, 'converted_last': per_currency(1.0),
+             'converted_volume': per_currency(2.0), 'trust_score': 'green',
+             'trade_url': f'https://exchange{i}.example.com/trade/BTC_USDT'}
+            for i in range(100)
+        ],
+    }
+
+
+def github_user():
+    body = {
+        'login': 'torvalds', 'id': 1024025, 'node_id': 'MDQ6VXNlcjEwMjQwMjU=',
+        'avatar_url': 'https://avatars.githubusercontent.com/u/1024025?v=4', 'gravatar_id': '',
+        'html_url': 'https://github.com/torvalds', 'type': 'User', 'site_admin': False,
+        'name': 'Linus Torvalds', 'company': 'Linux Foundation', 'blog': '', 'location': 'Portland, OR',
+        'email': None, 'hireable': None, 'bio': None, 'twitter_username': None,
+        'public_repos': 7, 'public_gists': 0, 'followers': 200000, 'following': 0,
+        'created_at': '2011-09-03T15:26:22Z', 'updated_at': '2024-01-01T00:00:00Z',
+    }
+    for rel in ['url', 'followers_url', 'following_url', 'gists_url', 'starred_url', 'subscriptions_url',
+                'organizations_url', 'repos_url', 'events_url', 'received_events_url']:
+        body[rel] = f'https://api.github.com/users/torvalds/{rel}{{/other_user}}'
+    return body
+
+
+def weather():
+    return {
+        'coord': {'lon': -0.1257, 'lat': 51.5085},
+        'weather': [{'id': 803, 'main': 'Clouds', 'description': 'broken clouds', 'icon': '04d'}],
+        'base': 'stations',
+        'main': {'temp': 11.2, 'feels_like': 10.4, 'temp_min': 10.1, 'temp_max': 12.3, 'pressure': 1012,
+                 'humidity': 81, 'sea_level': 1012, 'grnd_level': 1008},
+        'visibility': 10000, 'wind': {'speed': 4.6, 'deg': 250}, 'clouds': {'all': 75},
+        'dt': 1700000000, 'sys': {'type': 2, 'id': 2075535, 'country': 'GB', 'sunrise': 1699990000,
+                                  'sunset': 1700020000},
+        'timezone': 0, 'id': 2643743, 'name': 'London', 'cod': 200,
+    }
+
+
+def news():
+    return {
+        'status': 'ok', 'totalResults': 38,
+        'articles': [
+            {'source': {'id': None, 'name': f'Source {i}'}, 'author': 'Reporter',
+             'title': f'Headline number {i}', 'description': 'Short summary of the article. ' * 4,
+             'url': f'https://news.example.com/{i}', 'urlToImage': f'https://news.example.com/{i}.jpg',
+             'publishedAt': '2024-01-01T00:00:00Z', 'content': 'Full article content ' * 40}
+            for i in range(10)
+        ],
+    }
+
+
+def exchange_rates():
+    return {
+        'result': 'success', 'documentation': 'https://www.exchangerate-api.com/docs',
+        'terms_of_use': 'https://www.exchangerate-api.com/terms',
+        'time_last_update_unix': 1700000000, 'time_last_update_utc': 'Tue, 14 Nov 2023 00:00:01 +0000',
+        'time_next_update_unix': 1700086400, 'time_next_update_utc': 'Wed, 15 Nov 2023 00:00:01 +0000',
+        'base_code': 'USD',
+        'conversion_rates': {currency.upper(): 1.0 + i / 100 for i, currency in enumerate(CURRENCIES)},
+    }
+
+
+SAMPLES = [
+    ('coingecko', 'coin-info', coin_detail),
+    ('github', 'github-user', github_user),
+    ('openweather', 'unified-weather', weather),
+    ('newsapi', 'unified-news', news),
+    ('exchangeRate', 'exchanges-rate', exchange_rates),
+]
+
+
+def main():
+    print(f"{'service':<14}{'endpoint':<18}{'upstream B':>12}{'cached B':>10}{'saved':>8}{'transform us':>14}")
+    for service, name, factory in SAMPLES:
+        transform = get_endpoint(name).transform
+        body = factory()
+        raw_size = len(json.dumps(body).encode())
+        slim_size = len(json.dumps(transform(copy.deepcopy(body))).encode())
+
+        runs = 200
+        bodies = [copy.deepcopy(body) for _ in range(runs)]
+        iterator = iter(bodies)
+        seconds = timeit.timeit(lambda: transform(next(iterator)), number=runs)
+
+        saved = 1 - slim_size / raw_size
+        print(f"{service:<14}{name:<18}{raw_size:>12}{slim_size:>10}{saved:>8.1%}{seconds / runs * 1e6:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
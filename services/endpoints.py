@@ -0,0 +1,526 @@
+# services/endpoints.py
+"""
+Registry deklaratif untuk semua endpoint yang di-expose aggregator.
+
+Setiap Endpoint menjelaskan path upstream, schema parameter, cara inject API key,
+TTL cache dan aturan normalisasi parameter. Routes (services/urls.py) dan view
+(services/views.py) dibuat dari registry ini.
+"""
+import math
+import re
+from datetime import datetime, timedelta
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+
+from .utils.downsample import METHODS, downsample_chart
+from .utils.transform import Transform
+
+
+class ParamError(ValueError):
+    """Parameter request tidak valid, dikembalikan ke client sebagai 400"""
+
+
+# Normalizers
+
+def strip(value):
+    return value.strip()
+
+
+def lower(value):
+    return value.strip().lower()
+
+
+def upper(value):
+    return value.strip().upper()
+
+
+def collapse(value):
+    """'  New   York ' -> 'new york'"""
+    return ' '.join(value.split()).lower()
+
+
+def csv_sorted(value):
+    """'usd, EUR,usd' -> 'eur,usd' supaya urutan dan duplikat tidak menghasilkan cache key baru"""
+    items = {item.strip().lower() for item in value.split(',') if item.strip()}
+    return ','.join(sorted(items))
+
+
+# Validators
+
+def digits(value):
+    if not value.isdigit():
+        raise ParamError("The parameter '{name}' must be a number.")
+    return value
+
+
+def chart_days(value):
+    """'max' atau jumlah hari positif; float() juga menerima nan/inf sehingga dicek terpisah"""
+    if value == 'max':
+        return value
+    try:
+        days = float(value)
+    except ValueError:
+        days = None
+    if days is None or not math.isfinite(days) or days <= 0:
+        raise ParamError("The parameter '{name}' must be 'max' or a positive number.")
+    return value
+
+
+def point_count(value):
+    if not value.isdigit() or not 3 <= int(value) <= 5000:
+        raise ParamError("The parameter '{name}' must be a number between 3 and 5000.")
+    return int(value)
+
+
+def downsample_method(value):
+    if value not in METHODS:
+        raise ParamError(f"The parameter '{{name}}' must be one of: {', '.join(METHODS)}.")
+    return value
+
+
+def latitude(value):
+    return _coordinate(value, 90)
+
+
+def longitude(value):
+    return _coordinate(value, 180)
+
+
+def _coordinate(value, bound):
+    try:
+        number = float(value)
+    except ValueError:
+        number = None
+    if number is None or not -bound <= number <= bound:
+        raise ParamError(f"The parameter '{{name}}' must be a number between -{bound} and {bound}.")
+    return number
+
+
+def city_ids(value):
+    """'2643743, 2988507' -> ['2643743', '2988507'] (duplikat dibuang)"""
+    ids = [item.strip() for item in value.split(',') if item.strip()]
+    if not all(item.isdigit() for item in ids):
+        raise ParamError("The parameter '{name}' must be a comma separated list of numbers.")
+    return list(dict.fromkeys(ids))
+
+
+def city_names(value):
+    """'London, UK; paris,FR' -> ['london,uk', 'paris,fr']"""
+    names = [','.join(collapse(part) for part in item.split(',')) for item in value.split(';') if item.strip()]
+    return list(dict.fromkeys(names))
+
+
+def coordinate_pairs(value):
+    """'51.5,-0.12;48.85,2.35' -> [(51.5, -0.12), (48.85, 2.35)]"""
+    pairs = []
+    for item in value.split(';'):
+        if not item.strip():
+            continue
+        parts = item.split(',')
+        if len(parts) != 2:
+            raise ParamError("The parameter '{name}' must be a ';' separated list of lat,lon pairs.")
+        pairs.append((latitude(parts[0].strip()), longitude(parts[1].strip())))
+    return pairs
+
+
+GITHUB_LOGIN = re.compile(r'^[a-z0-9](?:[a-z0-9-]{0,38})$')
+GITHUB_BATCH_MAX = 200
+
+
+def github_logins(value):
+    """'torvalds, Gvanrossum' -> ['torvalds', 'gvanrossum'] (duplikat dibuang)"""
+    logins = list(dict.fromkeys(item.strip().lower() for item in value.split(',') if item.strip()))
+    if not all(GITHUB_LOGIN.match(login) for login in logins):
+        raise ParamError("The parameter '{name}' must be a comma separated list of GitHub usernames.")
+    if len(logins) > GITHUB_BATCH_MAX:
+        raise ParamError(f'A maximum of {GITHUB_BATCH_MAX} usernames is allowed per request')
+    return logins
+
+
+def history_date(value):
+    try:
+        datetime.strptime(value, "%d-%m-%Y")
+    except ValueError:
+        raise ParamError('Invalid date format. Expected dd-mm-yyyy')
+    return value
+
+
+def within_public_history_range(date):
+    """Public API CoinGecko hanya melayani history 365 hari terakhir"""
+    return (datetime.today().date() - date).days <= 365
+
+
+# Auth styles
+
+class QueryAuth:
+    """API key dikirim sebagai query parameter"""
+
+    def __init__(self, param):
+        self.param = param
+
+    def apply(self, api_key, path, params, headers):
+        params[self.param] = api_key
+        return path
+
+
+class HeaderAuth:
+    """API key dikirim lewat header, opsional dengan format tertentu"""
+
+    def __init__(self, header, template='{key}', placeholder=None):
+        self.header = header
+        self.template = template
+        self.placeholder = placeholder
+
+    def has_key(self, api_key):
+        return bool(api_key) and api_key != self.placeholder
+
+    def apply(self, api_key, path, params, headers):
+        if self.has_key(api_key):
+            headers[self.header] = self.template.format(key=api_key)
+        return path
+
+
+class PathPrefixAuth:
+    """API key menjadi segmen pertama path (ExchangeRate-API)"""
+
+    def apply(self, api_key, path, params, headers):
+        return f"/{api_key}{path}"
+
+
+SERVICE_AUTH = {
+    'openweather': QueryAuth('appid'),
+    'newsapi': HeaderAuth('X-Api-Key'),
+    'coingecko': QueryAuth('x_cg_demo_api_key'),
+    'exchangeRate': PathPrefixAuth(),
+    'github': HeaderAuth('Authorization', 'token {key}', placeholder='YOUR_GITHUB_TOKEN'),
+}
+
+
+class Param:
+    """
+    Parameter query dari client. Param `local` tidak dikirim ke upstream;
+    nilainya dipakai oleh `derive` milik endpoint.
+    """
+
+    def __init__(self, name, required=False, default=None, normalize=strip, validate=None, local=False):
+        self.name = name
+        self.required = required
+        self.default = default
+        self.normalize = normalize
+        self.validate = validate
+        self.local = local
+
+    def clean(self, raw):
+        if raw is None or raw == '':
+            return self.default
+        value = self.normalize(raw) if self.normalize else raw
+        if self.validate:
+            try:
+                value = self.validate(value)
+            except ParamError as e:
+                raise ParamError(str(e).replace('{name}', self.name))
+        return value
+
+
+class Endpoint:
+    """
+    Satu endpoint aggregator.
+
+    Parameter yang muncul di `path` (misalnya '/coins/{id}') dipakai untuk mengisi path,
+    sisanya dikirim sebagai query string bersama `fixed_params`.
+    `ttl` boleh berupa angka atau callable(params) -> detik. Dengan `adaptive_ttl` TTL itu
+    hanya titik awal dan disesuaikan dari seberapa sering response berubah
+    (services.utils.adaptive_ttl).
+    `transform` (services.utils.transform.Transform) dijalankan sekali saat data
+    diambil dari upstream, sebelum di-cache.
+    `derive` adalah callable(data, local_params) untuk varian turunan dari response
+    (misalnya downsampling); setiap varian di-cache terpisah dari response penuh.
+    """
+
+    def __init__(self, name, route, service, path, params=(), fixed_params=None,
+                 ttl=300, cacheable=True, auth=None, prepare=None, transform=None, derive=None,
+                 adaptive_ttl=True):
+        self.name = name
+        self.route = route
+        self.service = service
+        self.path = path
+        self.params = list(params)
+        self.fixed_params = fixed_params or {}
+        self.ttl = ttl
+        self.adaptive_ttl = adaptive_ttl
+        self.cacheable = cacheable
+        self.auth = auth or SERVICE_AUTH.get(service)
+        self.prepare = prepare
+        self.transform = transform
+        self.derive = derive
+        self._path_pattern = None
+
+    def clean(self, query):
+        """Validasi dan normalisasi query dari client, raise ParamError jika tidak valid"""
+        missing = [p.name for p in self.params if p.required and not query.get(p.name)]
+        if missing:
+            raise ParamError(f"{' and '.join(missing)} parameter required")
+
+        return {p.name: p.clean(query.get(p.name)) for p in self.params}
+
+    def local_values(self, cleaned):
+        """Nilai param local yang diisi client, kosong berarti response penuh"""
+        return {
+            p.name: cleaned[p.name]
+            for p in self.params
+            if p.local and cleaned.get(p.name) is not None
+        }
+
+    def build(self, cleaned):
+        """Return (path, query params) untuk request upstream"""
+        local = {p.name for p in self.params if p.local}
+        values = {name: value for name, value in cleaned.items() if name not in local}
+        if self.prepare:
+            values = self.prepare(values)
+
+        path_values = {}
+        query = {}
+        for name, value in values.items():
+            if '{' + name + '}' in self.path:
+                path_values[name] = '' if value is None else quote(str(value), safe='')
+            elif value is not None:
+                query[name] = value
+
+        query.update(self.fixed_params)
+        return self.path.format(**path_values), query
+
+    def get_ttl(self, params):
+        return self.ttl(params) if callable(self.ttl) else self.ttl
+
+    def path_values(self, path):
+        """Kebalikan build untuk path: '/coins/bitcoin' -> {'id': 'bitcoin'}, None jika tidak cocok"""
+        if self._path_pattern is None:
+            pattern = re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>[^/]*)', re.escape(self.path))
+            self._path_pattern = re.compile(pattern + '$')
+        match = self._path_pattern.match(path)
+        if match is None:
+            return None
+        return {name: unquote(value) for name, value in match.groupdict().items()}
+
+    def list_params(self):
+        """Nama param berisi daftar dipisah koma (ids, vs_currencies, ...)"""
+        return {p.name for p in self.params if p.normalize is csv_sorted}
+
+
+def geo_bucket(lat, lon):
+    """
+    Koordinat dibulatkan ke grid WEATHER_GEO_GRID derajat, sehingga lokasi yang
+    berdekatan memakai satu request upstream dan satu cache entry.
+    """
+    grid = getattr(settings, 'WEATHER_GEO_GRID', 0.01)
+    return {
+        'lat': round(round(lat / grid) * grid, 6),
+        'lon': round(round(lon / grid) * grid, 6),
+    }
+
+
+def weather_query(values):
+    """Lokasi dinormalisasi: city id, grid cell koordinat, atau 'city,country' lowercase"""
+    if values.get('id'):
+        return {'id': values['id']}
+    if values.get('lat') is not None or values.get('lon') is not None:
+        if values.get('lat') is None or values.get('lon') is None:
+            raise ParamError('lat and lon parameter required')
+        return geo_bucket(values['lat'], values['lon'])
+    return {'q': f"{values['city']},{values['country']}"}
+
+
+WEATHER_BATCH_MAX = 100
+
+
+def weather_batch_locations(values):
+    """
+    Return [(label, query weather_query)] untuk mode multi-city. Lokasi yang jatuh
+    ke grid cell atau nama yang sama digabung menjadi satu.
+    """
+    locations = {}
+    for city_id in values.get('ids') or []:
+        locations.setdefault(city_id, {'id': city_id})
+    for name in values.get('cities') or []:
+        locations.setdefault(name, {'q': name})
+    for lat, lon in values.get('coords') or []:
+        bucket = geo_bucket(lat, lon)
+        locations.setdefault(f"{bucket['lat']},{bucket['lon']}", bucket)
+
+    if not locations:
+        raise ParamError('ids, cities or coords parameter required')
+    if len(locations) > WEATHER_BATCH_MAX:
+        raise ParamError(f'A maximum of {WEATHER_BATCH_MAX} locations is allowed per request')
+    return list(locations.items())
+
+
+def downsample_market_chart(data, local):
+    if 'points' not in local:
+        return data
+    return downsample_chart(data, local['points'], local.get('downsample') or 'lttb')
+
+
+def history_ttl(params):
+    """Data historis untuk tanggal yang sudah lewat tidak akan berubah lagi"""
+    today = datetime.today().strftime("%d-%m-%Y")
+    return 3600 if params.get('date') == today else int(timedelta(days=30).total_seconds())
+
+
+ENDPOINTS = [
+    Endpoint(
+        'unified-weather', 'api/weather/', 'openweather', '/weather',
+        params=[
+            Param('city', default='london', normalize=collapse),
+            Param('country', default='uk', normalize=collapse),
+            Param('id', validate=digits),
+            Param('lat', validate=latitude),
+            Param('lon', validate=longitude),
+        ],
+        fixed_params={'units': 'metric'},
+        prepare=weather_query,
+        ttl=600,
+        transform=Transform(
+            keep=['id', 'name', 'coord', 'weather', 'main', 'visibility', 'wind', 'clouds',
+                  'rain', 'snow', 'sys.country', 'sys.sunrise', 'sys.sunset', 'dt', 'timezone'],
+        ),
+    ),
+    Endpoint(
+        'weather-batch', 'api/weather/batch/', 'openweather', '/group',
+        params=[
+            Param('ids', validate=city_ids),
+            Param('cities', validate=city_names),
+            Param('coords', validate=coordinate_pairs),
+        ],
+        fixed_params={'units': 'metric'},
+        ttl=600,
+        # Cache per lokasi (entry /api/weather/), bukan per kombinasi lokasi
+        cacheable=False,
+    ),
+    Endpoint(
+        'unified-news', 'api/news/', 'newsapi', '/v2/top-headlines',
+        params=[Param('category', default='general', normalize=lower)],
+        fixed_params={'pageSize': 10},
+        ttl=300,
+        transform=Transform(
+            keep=['status', 'totalResults', 'articles.source.name', 'articles.author', 'articles.title',
+                  'articles.description', 'articles.url', 'articles.urlToImage', 'articles.publishedAt'],
+        ),
+    ),
+    Endpoint(
+        'github-user', 'api/github/user/', 'github', '/users/{username}',
+        params=[Param('username', required=True, normalize=lower)],
+        ttl=1800,
+        transform=Transform(
+            keep=['login', 'id', 'avatar_url', 'html_url', 'type', 'name', 'company', 'blog',
+                  'location', 'email', 'bio', 'twitter_username', 'public_repos', 'public_gists',
+                  'followers', 'following', 'created_at', 'updated_at'],
+        ),
+    ),
+    Endpoint(
+        'github-users', 'api/github/users/', 'github', '/graphql',
+        params=[Param('usernames', required=True, validate=github_logins)],
+        ttl=1800,
+        # Cache per user (entry /api/github/user/), bukan per kombinasi username
+        cacheable=False,
+    ),
+    Endpoint(
+        'simple-price', 'api/simple/price/', 'coingecko', '/simple/price',
+        params=[
+            Param('ids', required=True, normalize=csv_sorted),
+            Param('vs_currencies', required=True, normalize=csv_sorted),
+        ],
+        ttl=60,
+    ),
+    Endpoint(
+        'coin-info', 'api/coins/', 'coingecko', '/coins/{id}',
+        params=[Param('id', required=True, normalize=lower)],
+        ttl=600,
+        transform=Transform(
+            keep=['id', 'symbol', 'name', 'categories', 'hashing_algorithm', 'genesis_date',
+                  'description.en', 'links.homepage', 'links.blockchain_site', 'links.subreddit_url',
+                  'links.repos_url.github', 'image', 'market_cap_rank', 'sentiment_votes_up_percentage',
+                  'market_data.current_price', 'market_data.market_cap', 'market_data.total_volume',
+                  'market_data.high_24h', 'market_data.low_24h', 'market_data.ath', 'market_data.atl',
+                  'market_data.price_change_percentage_24h', 'market_data.price_change_percentage_7d',
+                  'market_data.price_change_percentage_30d', 'market_data.circulating_supply',
+                  'market_data.total_supply', 'market_data.max_supply', 'last_updated'],
+            rename={'description.en': 'description'},
+            coerce={
+                'market_data.circulating_supply': float,
+                'market_data.total_supply': float,
+                'market_data.max_supply': float,
+            },
+        ),
+    ),
+    Endpoint(
+        'coins-market-chart', 'api/coins/market_chart/', 'coingecko', '/coins/{id}/market_chart',
+        params=[
+            Param('vs_currency', required=True, normalize=lower),
+            Param('days', required=True, normalize=lower, validate=chart_days),
+            Param('id', required=True, normalize=lower),
+            Param('points', validate=point_count, local=True),
+            Param('downsample', normalize=lower, validate=downsample_method, local=True),
+        ],
+        ttl=900,
+        derive=downsample_market_chart,
+    ),
+    Endpoint(
+        'coins-history', 'api/coins/history/', 'coingecko', '/coins/{id}/history',
+        params=[
+            Param('date', required=True, validate=history_date),
+            Param('id', required=True, normalize=lower),
+        ],
+        ttl=history_ttl,
+        # TTL sudah ditentukan dari tanggal, data historis tidak berubah
+        adaptive_ttl=False,
+        transform=Transform(
+            keep=['id', 'symbol', 'name', 'image', 'market_data', 'community_data', 'developer_data'],
+        ),
+    ),
+    Endpoint(
+        'search', 'api/search/', 'coingecko', '/search',
+        params=[Param('query', required=True, normalize=lower)],
+        ttl=1800,
+    ),
+    Endpoint(
+        'search-trending', 'api/search/trending/', 'coingecko', '/search/trending',
+        ttl=900,
+    ),
+    Endpoint(
+        'exchanges', 'api/exchanges/', 'coingecko', '/exchanges',
+        ttl=3600,
+    ),
+    Endpoint(
+        'exchanges-detail', 'api/exchanges/detail/', 'coingecko', '/exchanges/{id}',
+        params=[Param('id', required=True, normalize=lower)],
+        ttl=600,
+    ),
+    Endpoint(
+        'exchanges-rate', 'api/exchanges-rate/', 'exchangeRate', '/latest/{currency}',
+        params=[Param('currency', required=True, normalize=upper)],
+        ttl=3600,
+        transform=Transform(
+            keep=['result', 'base_code', 'conversion_rates', 'time_last_update_unix', 'time_next_update_unix'],
+        ),
+    ),
+    Endpoint(
+        'pair', 'api/pair/', 'exchangeRate', '/pair/{from}/{to}/{amount}',
+        params=[
+            Param('from', required=True, normalize=upper),
+            Param('to', required=True, normalize=upper),
+            Param('amount', default='', validate=digits),
+        ],
+        ttl=3600,
+        transform=Transform(
+            keep=['result', 'base_code', 'target_code', 'conversion_rate', 'conversion_result',
+                  'time_last_update_unix', 'time_next_update_unix'],
+        ),
+    ),
+]
+
+ENDPOINTS_BY_NAME = {endpoint.name: endpoint for endpoint in ENDPOINTS}
+
+
+def get_endpoint(name):
+    return ENDPOINTS_BY_NAME[name]
@@ -4,7 +4,7 @@ import glob
 import json
 import pickle
 from datetime import datetime
-from services.utils.cache_service import FileCache
+from services.utils.cache_service import FileCache, file_cache
 
 class Command(BaseCommand):
     help = 'Clean up expired cache files'
@@ -53,3 +53,10 @@ class Command(BaseCommand):
                 pass
 
         self.stdout.write(f"Deleted {deleted_count} expired cache files")
+
+        # Bloom filter tier shared-memory masih berisi key yang file-nya baru dihapus
+        if file_cache.shared is not None:
+            file_cache.rebuild_filter()
+
+        # Index tag juga (lokal dan remote): buang digest yang entry-nya sudah tidak ada
+        file_cache.compact_tags()
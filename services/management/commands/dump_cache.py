@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from services.utils.cache_service import file_cache
+from services.utils.cache_snapshot import dump_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Export entry cache yang belum expired ke satu file snapshot gzip (untuk load_cache di node lain)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File snapshot (.jsonl.gz), gunakan - untuk stdout')
+        parser.add_argument('--workers', type=int, default=8)
+
+    def handle(self, *args, **options):
+        count = dump_snapshot(file_cache, options['path'], workers=options['workers'])
+        if options['path'] != '-':
+            self.stdout.write(self.style.SUCCESS(f"Dumped {count} cache entries to {options['path']}"))
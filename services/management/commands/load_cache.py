@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.utils.cache_service import file_cache
+from services.utils.cache_snapshot import SnapshotError, load_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Import snapshot dari dump_cache ke cache lokal, dengan sisa TTL yang sama'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File snapshot, gunakan - untuk stdin')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--overwrite', action='store_true', help='Timpa entry yang sudah ada di node ini')
+
+    def handle(self, *args, **options):
+        try:
+            loaded, skipped = load_snapshot(
+                file_cache, options['path'], workers=options['workers'], overwrite=options['overwrite']
+            )
+        except (OSError, SnapshotError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} cache entries ({skipped} expired or existing skipped)"))
@@ -0,0 +1,41 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from services.utils.history_store import history_store, parse_date
+
+
+class Command(BaseCommand):
+    help = 'Bulk load snapshot history coin dari file JSON Lines ({"id": ..., "date": "dd-mm-yyyy", "data": {...}})'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File .jsonl, gunakan - untuk stdin')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        stream = sys.stdin if options['path'] == '-' else open(options['path'])
+        batch_size = options['batch_size']
+
+        loaded = 0
+        batch = []
+        try:
+            for line_number, line in enumerate(stream, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    batch.append((record['id'].strip().lower(), parse_date(record['date']), record['data']))
+                except (ValueError, KeyError, AttributeError) as e:
+                    raise CommandError(f"Invalid record on line {line_number}: {e}")
+
+                if len(batch) >= batch_size:
+                    loaded += history_store.bulk_load(batch, batch_size)
+                    batch = []
+
+            if batch:
+                loaded += history_store.bulk_load(batch, batch_size)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {loaded} history snapshots (existing snapshots are skipped)"))
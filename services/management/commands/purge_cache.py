@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from services.utils.cache_service import file_cache
+from services.utils.cache_tags import TAG_PREFIXES
+
+
+class Command(BaseCommand):
+    help = 'Hapus entry cache berdasarkan tag (service:<name>, endpoint:<service>:<path>, param:<name>=<value>)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tag', action='append', required=True, dest='tags',
+            help='Bisa diulang; entry harus punya semua tag, misalnya --tag service:coingecko --tag param:id=bitcoin',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Hanya hitung entry yang cocok')
+
+    def handle(self, *args, **options):
+        tags = options['tags']
+        invalid = [tag for tag in tags if not tag.startswith(TAG_PREFIXES)]
+        if invalid:
+            raise CommandError(f"Unknown tag type: {', '.join(invalid)}")
+
+        if options['dry_run']:
+            self.stdout.write(f"{len(file_cache.match(tags))} cache entries match {', '.join(tags)}")
+            return
+
+        purged = file_cache.purge(tags)
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} cache entries tagged {', '.join(tags)}"))
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from services.models import ThirdPartyService
+from services.utils.encryption_service import derive_key, encryption_service
+
+
+class Command(BaseCommand):
+    help = 'Re-encrypt API key semua third-party service dengan ENCRYPTION_KEY yang aktif'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--print-derived-key',
+            action='store_true',
+            help='Tampilkan key hasil derive dari SECRET_KEY untuk dipakai sebagai ENCRYPTION_KEY / ENCRYPTION_OLD_KEYS',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['print_derived_key']:
+            self.stdout.write(derive_key(settings.SECRET_KEY).decode())
+            return
+
+        rotated = 0
+        failed = 0
+        batch = []
+
+        with transaction.atomic():
+            for service in ThirdPartyService.objects.only('id', 'api_key').iterator():
+                new_value = encryption_service.rotate(service.api_key)
+                if new_value is None:
+                    failed += 1
+                    self.stderr.write(f"Cannot decrypt API key for service id={service.id}")
+                    continue
+
+                service.api_key = new_value
+                batch.append(service)
+                if len(batch) >= options['batch_size']:
+                    ThirdPartyService.objects.bulk_update(batch, ['api_key'])
+                    rotated += len(batch)
+                    batch = []
+
+            if batch:
+                ThirdPartyService.objects.bulk_update(batch, ['api_key'])
+                rotated += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rotated {rotated} API keys ({failed} failed)")
+        )
@@ -33,13 +33,18 @@ class Command(BaseCommand):
                 'name': 'coingecko',
                 'api_endpoint': 'https://api.coingecko.com/api/v3',
                 'api_key': os.getenv("COINGECKO_API_KEY"),
-                'rate_limit_per_hour': 60
+                'rate_limit_per_hour': 60,
+                # Provider utama untuk failover (services/providers.py)
+                'capability': 'crypto_price',
+                'priority': 0
             },
             {
                 'name': 'exchangeRate',
                 'api_endpoint': 'https://v6.exchangerate-api.com/v6',
                 'api_key': os.getenv("EXCHANGE-RATE-API-KEY"),
-                'rate_limit_per_hour': 60
+                'rate_limit_per_hour': 60,
+                'capability': 'fx',
+                'priority': 0
             }
         ]
 
@@ -53,8 +58,20 @@ class Command(BaseCommand):
 
             decrypted_key = service.get_api_key() if not created else None
 
-            if created or decrypted_key != api_key:
+            # Capability/priority juga diset pada service yang sudah ada (install sebelum failover)
+            routing = {
+                field: service_data[field]
+                for field in ('capability', 'priority')
+                if field in service_data and getattr(service, field) != service_data[field]
+            }
+            for field, value in routing.items():
+                setattr(service, field, value)
+
+            key_changed = created or decrypted_key != api_key
+            if key_changed:
                 service.set_api_key(api_key)
+
+            if key_changed or routing:
                 service.save()
                 action = "Created" if created else "Updated"
                 self.stdout.write(
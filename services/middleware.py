@@ -0,0 +1,54 @@
+# services/middleware.py
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .utils.metrics import PHASE_DURATION, REQUEST_DURATION, finish_request, server_timing, start_request
+
+
+class ServerTimingMiddleware:
+    """
+    Ukur setiap request: durasi total dan per fase (services.utils.metrics.phase) masuk ke
+    histogram /metrics, dan dikirim ke client lewat header Server-Timing. Mendukung sync dan
+    async sehingga di bawah ASGI tidak memaksa seluruh stack middleware ke mode sync.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.header = getattr(settings, 'METRICS', {}).get('server_timing', True)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = start_request()
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = finish_request(token)
+        return self._finish(request, response, timings, perf_counter() - started)
+
+    async def __acall__(self, request):
+        token = start_request()
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = finish_request(token)
+        return self._finish(request, response, timings, perf_counter() - started)
+
+    def _finish(self, request, response, timings, total):
+        match = request.resolver_match
+        REQUEST_DURATION.observe(total, match.url_name if match else '', request.method, response.status_code)
+        for name, seconds in timings.items():
+            PHASE_DURATION.observe(seconds, name)
+
+        if self.header:
+            response['Server-Timing'] = server_timing(timings, total)
+        return response
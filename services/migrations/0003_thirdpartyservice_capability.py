@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+EXISTING_CAPABILITIES = {
+    'exchangeRate': 'fx',
+    'coingecko': 'crypto_price',
+}
+
+
+def set_existing_capabilities(apps, schema_editor):
+    ThirdPartyService = apps.get_model('services', 'ThirdPartyService')
+    for name, capability in EXISTING_CAPABILITIES.items():
+        ThirdPartyService.objects.filter(name=name).update(capability=capability)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('services', '0002_coinhistorysnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thirdpartyservice',
+            name='capability',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='thirdpartyservice',
+            name='priority',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(set_existing_capabilities, migrations.RunPython.noop),
+    ]
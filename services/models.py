@@ -9,6 +9,10 @@ class ThirdPartyService(models.Model):
     api_key = models.TextField()  # Untuk encrypted data
     rate_limit_per_hour = models.IntegerField(default=100)
     is_active = models.BooleanField(default=True)
+    # Provider dengan capability yang sama saling menjadi failover (lihat services/providers.py)
+    capability = models.CharField(max_length=50, blank=True, default='')
+    # Angka lebih kecil dicoba lebih dulu
+    priority = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def set_api_key(self, plain_text_key):
@@ -55,3 +59,15 @@ class CacheMetadata(models.Model):
             models.Index(fields=['cache_key']),
             models.Index(fields=['expires_at']),
         ]
+
+class CoinHistorySnapshot(models.Model):
+    """Snapshot /coins/{id}/history untuk tanggal yang sudah lewat, tidak pernah kedaluwarsa"""
+    coin_id = models.CharField(max_length=100)
+    date = models.DateField()
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['coin_id', 'date'], name='unique_coin_history_snapshot'),
+        ]
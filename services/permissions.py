@@ -1,28 +1,39 @@
 from rest_framework_api_key.permissions import BaseHasAPIKey
 from user.models import UserAPIKey
+from .utils.api_key_cache import verified_key_cache
+from .utils.metrics import phase
 
 class HasAPIKey(BaseHasAPIKey):
     model = UserAPIKey
 
     def has_permission(self, request, view):
-        has_key = super().has_permission(request, view)
-
-        if not has_key:
-            return False
+        with phase('auth'):
+            return self._has_permission(request)
 
+    def _has_permission(self, request):
         auth_header = request.META.get("HTTP_AUTHORIZATION", "")
 
         if not auth_header.startswith("Api-Key "):
             return False
 
-        try:
-            key = self.get_key(request)
-            print(f"key: {key}")
-            user_api_key = UserAPIKey.objects.get_from_key(key)
+        key = self.get_key(request)
+        if not key:
+            return False
 
-            if user_api_key.revoked:
+        # Hot path: key yang sudah diverifikasi cukup dicari di memory
+        verified = verified_key_cache.get(key)
+
+        if verified is None:
+            try:
+                user_api_key = self.model.objects.get_from_key(key)
+            except (self.model.DoesNotExist, IndexError):
                 return False
+            verified = verified_key_cache.set(key, user_api_key)
 
-            return True
-        except (UserAPIKey.DoesNotExist, IndexError):
+        if not verified.is_usable():
             return False
+
+        request.api_key_id = verified.key_id
+        request.api_key_user_id = verified.user_id
+        request.api_key_plan = verified.plan
+        return True
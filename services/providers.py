@@ -0,0 +1,255 @@
+# services/providers.py
+"""
+Provider failover untuk capability yang bisa dilayani lebih dari satu upstream.
+
+ThirdPartyService dengan `capability` yang sama (misalnya 'fx' atau 'crypto_price') adalah
+provider alternatif. Setiap provider punya adapter yang menerjemahkan operasi ke request
+upstream dan menormalisasi response ke format yang sama (format provider utama), sehingga
+client tidak tahu provider mana yang menjawab.
+
+ProviderRouter memilih provider berdasarkan circuit breaker, sisa kuota per jam, `priority`
+dan p50 latency terakhir, lalu pindah ke provider berikutnya jika request gagal.
+"""
+import calendar
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from .utils.circuit_breaker import OPEN, circuit_breakers
+from .utils.latency import upstream_latency
+from .utils.service_registry import service_registry
+
+logger = logging.getLogger(__name__)
+
+QUOTA_WINDOW = 3600
+
+
+class ProviderAdapter:
+    """Adapter satu provider: operasi -> (path, query), response -> format normal"""
+    operations = ()
+
+    def supports(self, operation, params):
+        return operation in self.operations
+
+    def request(self, operation, params):
+        raise NotImplementedError
+
+    def normalize(self, operation, data, params):
+        return data
+
+
+class ExchangeRateAPIAdapter(ProviderAdapter):
+    """ExchangeRate-API (v6), format referensi untuk capability 'fx'"""
+    operations = ('latest', 'pair')
+
+    def request(self, operation, params):
+        if operation == 'latest':
+            return f"/latest/{params['currency']}", {}
+        return f"/pair/{params['from']}/{params['to']}/{params.get('amount') or ''}", {}
+
+
+class FrankfurterAdapter(ProviderAdapter):
+    """Frankfurter (kurs ECB), tanpa API key"""
+    operations = ('latest', 'pair')
+
+    def request(self, operation, params):
+        if operation == 'latest':
+            return '/latest', {'from': params['currency']}
+        query = {'from': params['from'], 'to': params['to']}
+        if params.get('amount'):
+            query['amount'] = params['amount']
+        return '/latest', query
+
+    def normalize(self, operation, data, params):
+        base = data['base']
+        rates = data.get('rates', {})
+        updated = calendar.timegm(datetime.strptime(data['date'], '%Y-%m-%d').timetuple())
+
+        if operation == 'latest':
+            return {
+                'result': 'success',
+                'base_code': base,
+                'conversion_rates': {base: 1.0, **rates},
+                'time_last_update_unix': updated,
+            }
+
+        target = params['to']
+        if target not in rates:
+            return {'error': f"Unsupported currency pair {base}/{target}", 'status': 404}
+        amount = float(data.get('amount', 1.0))
+        result = {
+            'result': 'success',
+            'base_code': base,
+            'target_code': target,
+            # Frankfurter mengembalikan rate yang sudah dikali amount
+            'conversion_rate': rates[target] / amount if amount else rates[target],
+            'time_last_update_unix': updated,
+        }
+        if params.get('amount'):
+            result['conversion_result'] = rates[target]
+        return result
+
+
+class CoinGeckoAdapter(ProviderAdapter):
+    """CoinGecko /simple/price, format referensi untuk capability 'crypto_price'"""
+    operations = ('simple_price',)
+
+    def request(self, operation, params):
+        return '/simple/price', {'ids': params['ids'], 'vs_currencies': params['vs_currencies']}
+
+
+# Id CoinGecko -> id CoinCap untuk coin yang namanya berbeda; selain ini id-nya sama
+COINCAP_IDS = {
+    'binancecoin': 'binance-coin',
+    'ripple': 'xrp',
+    'avalanche-2': 'avalanche',
+    'matic-network': 'polygon',
+    'dai': 'multi-collateral-dai',
+    'near': 'near-protocol',
+    'crypto-com-chain': 'crypto-com-coin',
+    'elrond-erd-2': 'elrond-egld',
+    'the-open-network': 'toncoin',
+}
+
+
+class CoinCapAdapter(ProviderAdapter):
+    """CoinCap /v2/assets, hanya harga dalam USD"""
+    operations = ('simple_price',)
+
+    def supports(self, operation, params):
+        return super().supports(operation, params) and params['vs_currencies'] == 'usd'
+
+    def request(self, operation, params):
+        ids = [COINCAP_IDS.get(coin_id, coin_id) for coin_id in params['ids'].split(',')]
+        return '/v2/assets', {'ids': ','.join(ids)}
+
+    def normalize(self, operation, data, params):
+        prices = {
+            asset['id']: float(asset['priceUsd'])
+            for asset in data.get('data', [])
+            if asset.get('priceUsd') is not None
+        }
+        result = {}
+        missing = []
+        for coin_id in filter(None, params.get('ids', '').split(',')):
+            price = prices.get(COINCAP_IDS.get(coin_id, coin_id))
+            if price is None:
+                missing.append(coin_id)
+            else:
+                result[coin_id] = {'usd': price}
+        if missing:
+            # Jangan diam-diam membuang coin yang tidak dikenal CoinCap dari response
+            return {'error': f"No CoinCap price for: {', '.join(missing)}", 'status': 404}
+        return result
+
+
+PROVIDER_ADAPTERS = {
+    'exchangeRate': ExchangeRateAPIAdapter(),
+    'frankfurter': FrankfurterAdapter(),
+    'coingecko': CoinGeckoAdapter(),
+    'coincap': CoinCapAdapter(),
+}
+
+
+def is_failure(result):
+    """Error yang membuat provider berikutnya dicoba: timeout, 5xx, throttle, konfigurasi"""
+    return isinstance(result, dict) and 'error' in result and result.get('status', 503) >= 500
+
+
+class ProviderRouter:
+    def __init__(self, adapters=None):
+        self.adapters = PROVIDER_ADAPTERS if adapters is None else adapters
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def candidates(self, capability, operation, params):
+        """Provider aktif untuk capability, urut dari yang paling layak dicoba"""
+        services = [
+            service for service in service_registry.by_capability(capability)
+            if service.name in self.adapters and self.adapters[service.name].supports(operation, params)
+        ]
+        return sorted(services, key=self._rank)
+
+    def call(self, client, capability, operation, params, user=None, spec=None):
+        """
+        Response ternormalisasi dari provider pertama yang berhasil, atau None jika
+        tidak ada provider yang dikonfigurasi (caller memakai jalur lama).
+        `spec` dipakai untuk provider yang sama dengan spec.service (TTL, transform, auth).
+        """
+        candidates = self.candidates(capability, operation, params)
+        if not candidates:
+            return None
+
+        requests = []
+        for service in candidates:
+            adapter = self.adapters[service.name]
+            path, query = adapter.request(operation, params)
+            cached = client.get_cached(service.name, path, query, user=user, log=True)
+            if cached is not None and not (isinstance(cached, dict) and 'error' in cached):
+                return adapter.normalize(operation, cached, params)
+            requests.append((service, adapter, path, query))
+
+        last_error = None
+        for service, adapter, path, query in requests:
+            breaker = circuit_breakers.get(service.name)
+            if not breaker.allow():
+                continue
+
+            self._record_call(service.name)
+            data = client.make_request(
+                service.name,
+                path,
+                params=query,
+                user=user,
+                spec=spec if spec is not None and spec.service == service.name else None
+            )
+            if is_failure(data):
+                breaker.record_failure()
+                logger.warning(f"Provider {service.name} gagal untuk {capability}: {data['error']}")
+                continue
+
+            breaker.record_success()
+            if isinstance(data, dict) and 'error' in data:
+                # 4xx: provider sehat tapi request ditolak, provider lain mungkin mendukungnya
+                last_error = data
+                continue
+            return adapter.normalize(operation, data, params)
+
+        if last_error is not None:
+            return last_error
+        return {'error': f"Semua provider untuk {capability} sedang tidak tersedia", 'status': 503}
+
+    def _rank(self, service):
+        breaker = circuit_breakers.get(service.name)
+        p50 = upstream_latency.tracker(service.name).percentile(50)
+        return (
+            breaker.state == OPEN,
+            self._quota_exhausted(service),
+            service.priority,
+            # Provider tanpa sampel latency dicoba dulu supaya punya data
+            p50 if p50 is not None else 0.0,
+        )
+
+    def _record_call(self, name):
+        with self._lock:
+            self._calls.setdefault(name, deque()).append(time.monotonic())
+
+    def _quota_exhausted(self, service):
+        with self._lock:
+            calls = self._calls.get(service.name)
+            if not calls:
+                return False
+            cutoff = time.monotonic() - QUOTA_WINDOW
+            while calls and calls[0] < cutoff:
+                calls.popleft()
+            return len(calls) >= service.rate_limit_per_hour
+
+    def reset(self):
+        with self._lock:
+            self._calls = {}
+
+
+# Singleton instance
+provider_router = ProviderRouter()
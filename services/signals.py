@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from user.models import UserAPIKey
+from .models import ThirdPartyService
+from .utils.api_key_cache import verified_key_cache
+from .utils.service_registry import service_registry
+
+
+@receiver(post_save, sender=ThirdPartyService)
+@receiver(post_delete, sender=ThirdPartyService)
+def invalidate_service_registry(sender, **kwargs):
+    """Reload registry lokal sekarang, worker lain setelah commit"""
+    service_registry.invalidate()
+    transaction.on_commit(service_registry.bump_version)
+
+
+@receiver(post_save, sender=UserAPIKey)
+@receiver(post_delete, sender=UserAPIKey)
+def invalidate_verified_key(sender, instance, **kwargs):
+    """Key yang di-revoke atau dihapus tidak boleh lagi lolos dari cache"""
+    verified_key_cache.invalidate(instance.pk)
+    transaction.on_commit(verified_key_cache.bump_version)
@@ -1,11 +1,28 @@
 
 from unittest.mock import patch
+from django.test import AsyncClient, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
 from user.models import UserAPIKey
-from services.models import ThirdPartyService
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+from services.models import APIRequestLog, CoinHistorySnapshot, ThirdPartyService
+from services.endpoints import get_endpoint
+from services.providers import provider_router
+from services.utils.cache_service import FileCache
+from services.utils.circuit_breaker import circuit_breakers
+from services.utils.metrics import CACHE_LOOKUPS, REQUEST_DURATION
+from services.utils.service_registry import service_registry
+from services.views import PriceStreamView
 
 class BaseServiceIntegrationTest(APITestCase):
     def setUp(self):
@@ -61,10 +78,27 @@ class WeatherViewTests(BaseServiceIntegrationTest):
         mock_make_request.assert_called_once_with(
             'openweather',
             '/weather',
-            params={'q': 'London,UK', 'units': 'metric'},
-            user=self.user
+            params={'q': 'london,uk', 'units': 'metric'},
+            user=self.user,
+            spec=get_endpoint('unified-weather')
         )
 
+    def test_location_normalized(self, mock_make_request):
+        """Uji bahwa penulisan lokasi yang berbeda menghasilkan query upstream yang sama."""
+        mock_make_request.return_value = {'name': 'London'}
+        self.client.get(reverse('unified-weather') + '?city=%20London%20&country=uk')
+        self.client.get(reverse('unified-weather') + '?city=london&country=UK')
+        self.assertEqual(mock_make_request.call_args_list[0], mock_make_request.call_args_list[1])
+
+    def test_coordinates_bucketed(self, mock_make_request):
+        """Uji bahwa koordinat yang berdekatan jatuh ke grid cell yang sama."""
+        mock_make_request.return_value = {'name': 'London'}
+        self.client.get(reverse('unified-weather') + '?lat=51.5074&lon=-0.1278')
+        self.assertEqual(mock_make_request.call_args.kwargs['params'], {'lat': 51.51, 'lon': -0.13, 'units': 'metric'})
+
+        response = self.client.get(reverse('unified-weather') + '?lat=51.5')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_weather_view_no_api_key(self, mock_make_request):
         """Uji akses endpoint cuaca tanpa API key."""
         self.client.credentials() # Hapus header otentikasi
@@ -73,6 +107,90 @@ class WeatherViewTests(BaseServiceIntegrationTest):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class PriceStreamViewTests(BaseServiceIntegrationTest):
+    async def stream(self, query, api_key=True):
+        headers = {'Authorization': f'Api-Key {self.key_plain}'} if api_key else {}
+        return await AsyncClient().get(reverse('simple-price-stream') + query, headers=headers)
+
+    async def test_requires_api_key(self):
+        """Uji bahwa stream butuh API key."""
+        response = await self.stream('?ids=bitcoin&vs_currencies=usd', api_key=False)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def test_params_required(self):
+        """Uji validasi parameter stream."""
+        response = await self.stream('?ids=bitcoin')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_wsgi_rejected(self):
+        """Uji bahwa stream lewat WSGI ditolak dengan 501, bukan di-buffer tanpa akhir."""
+        response = self.client.get(reverse('simple-price-stream') + '?ids=bitcoin&vs_currencies=usd')
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+
+    @patch('services.views.price_stream_hub')
+    async def test_event_stream(self, mock_hub):
+        """Uji bahwa update dari hub dikirim sebagai event SSE."""
+        import asyncio
+
+        queue = asyncio.Queue()
+        queue.put_nowait({'bitcoin': {'usd': 100}})
+        mock_hub.subscribe.return_value.queue = queue
+
+        response = await self.stream('?ids=Bitcoin&vs_currencies=usd')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        events = response.streaming_content.__aiter__()
+        chunks = [await events.__anext__(), await events.__anext__()]
+        await events.aclose()
+        self.assertEqual(chunks[1], b'event: price\ndata: {"bitcoin": {"usd": 100}}\n\n')
+        mock_hub.subscribe.assert_called_once_with(['bitcoin'], ['usd'])
+
+        # Saat koneksi putus generator event ditutup dan subscription dilepas
+        generator = PriceStreamView().events(['bitcoin'], ['usd'])
+        await generator.__anext__()
+        await generator.aclose()
+        mock_hub.unsubscribe.assert_called_once()
+
+
+class WeatherBatchViewTests(BaseServiceIntegrationTest):
+    @patch('services.views.APIClient.get_cached_many', side_effect=lambda service, requests: [None] * len(requests))
+    @patch('services.views.APIClient.set_cached')
+    @patch('services.views.APIClient.make_request')
+    def test_ids_resolved_with_group(self, mock_make_request, mock_set_cached, mock_get_cached):
+        """Uji bahwa city id yang belum di-cache di-resolve lewat satu request /group."""
+        mock_make_request.return_value = {'cnt': 2, 'list': [
+            {'id': 2988507, 'name': 'Paris', 'main': {'temp': 18}},
+            {'id': 2643743, 'name': 'London', 'main': {'temp': 15}},
+        ]}
+
+        response = self.client.get(reverse('weather-batch') + '?ids=2643743,2988507,1')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['name'] for item in response.data['list']], ['London', 'Paris'])
+        self.assertEqual(response.data['errors'], {'1': 'city not found'})
+        mock_make_request.assert_called_once()
+        self.assertEqual(mock_make_request.call_args[0][1], '/group')
+        self.assertEqual(mock_make_request.call_args.kwargs['params']['id'], '2643743,2988507,1')
+        self.assertEqual(mock_set_cached.call_count, 2)
+
+    @patch('services.views.APIClient.get_cached_many')
+    @patch('services.views.APIClient.make_request')
+    def test_cached_locations_skip_upstream(self, mock_make_request, mock_get_cached):
+        """Uji bahwa lokasi yang sudah di-cache tidak di-request lagi."""
+        mock_get_cached.side_effect = lambda service, requests: [{'name': params.get('q')} for path, params in requests]
+
+        response = self.client.get(reverse('weather-batch') + '?cities=London,UK;%20paris,%20FR')
+
+        self.assertEqual(response.data['list'], [{'name': 'london,uk'}, {'name': 'paris,fr'}])
+        mock_make_request.assert_not_called()
+
+    def test_locations_required(self):
+        """Uji bahwa minimal satu lokasi diperlukan."""
+        response = self.client.get(reverse('weather-batch'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 @patch('services.views.APIClient.make_request')
 class NewsViewTests(BaseServiceIntegrationTest):
     def test_get_news_success(self, mock_make_request):
@@ -84,7 +202,8 @@ class NewsViewTests(BaseServiceIntegrationTest):
             'newsapi',
             '/v2/top-headlines',
             params={'category': 'technology', 'pageSize': 10},
-            user=self.user
+            user=self.user,
+            spec=get_endpoint('unified-news')
         )
 
 @patch('services.views.APIClient.make_request')
@@ -97,17 +216,60 @@ class GitHubViewTests(BaseServiceIntegrationTest):
         mock_make_request.assert_called_with(
             'github',
             '/users/testuser',
-            user=self.user
+            params={},
+            user=self.user,
+            spec=get_endpoint('github-user')
         )
 
+    def test_upstream_not_found_status(self, mock_make_request):
+        """Uji bahwa 404 dari upstream diteruskan sebagai status HTTP."""
+        mock_make_request.return_value = {'error': 'Not Found', 'status': 404}
+        response = self.client.get(reverse('github-user') + '?username=no-such-user')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data, {'error': 'Not Found'})
+
+    def test_upstream_rate_limited(self, mock_make_request):
+        """Uji bahwa Retry-After diteruskan ke client."""
+        mock_make_request.return_value = {'error': 'rate limited', 'status': 503, 'retry_after': 30}
+        response = self.client.get(reverse('github-user') + '?username=torvalds')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '30')
+
     def test_get_github_user_no_username(self, mock_make_request):
         url = reverse('github-user')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+class GitHubUsersViewTests(BaseServiceIntegrationTest):
+    @patch('services.views.service_registry')
+    @patch('services.views.APIClient.get_cached_many', side_effect=lambda service, requests: [None] * len(requests))
+    @patch('services.views.APIClient.set_cached')
+    @patch('services.views.APIClient.make_request')
+    def test_graphql_with_token(self, mock_make_request, mock_set_cached, mock_get_cached, mock_registry):
+        """Uji bahwa batch memakai satu query GraphQL jika token tersedia."""
+        mock_registry.get.return_value.api_key = 'ghp_token'
+        mock_make_request.return_value = {'data': {
+            'u0': {'__typename': 'User', 'login': 'torvalds'},
+            'u1': {'__typename': 'User', 'login': 'gvanrossum'},
+        }}
+        response = self.client.get(reverse('github-users') + '?usernames=Torvalds,gvanrossum,torvalds')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([user['login'] for user in response.data['users']], ['torvalds', 'gvanrossum'])
+        mock_make_request.assert_called_once()
+        self.assertEqual(mock_make_request.call_args.kwargs['json_body']['variables'], {'l0': 'torvalds', 'l1': 'gvanrossum'})
+
+    def test_invalid_username(self):
+        """Uji validasi username."""
+        response = self.client.get(reverse('github-users') + '?usernames=torvalds,bad%20name')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 @patch('services.views.APIClient.make_request')
 class CoinGeckoViewsTests(BaseServiceIntegrationTest):
-    def test_simple_price_success(self, mock_make_request):
+    @patch('services.views.APIClient.set_cached')
+    @patch('services.views.APIClient.get_cached', return_value=None)
+    def test_simple_price_success(self, mock_get_cached, mock_set_cached, mock_make_request):
         mock_make_request.return_value = {'bitcoin': {'usd': 50000}}
         url = reverse('simple-price') + '?ids=bitcoin&vs_currencies=usd'
         response = self.client.get(url)
@@ -116,9 +278,20 @@ class CoinGeckoViewsTests(BaseServiceIntegrationTest):
             'coingecko',
             '/simple/price',
             params={'ids': 'bitcoin', 'vs_currencies': 'usd'},
-            user=self.user
+            user=self.user,
+            spec=get_endpoint('simple-price')
         )
 
+    @patch('services.views.APIClient.set_cached')
+    @patch('services.views.APIClient.get_cached')
+    def test_simple_price_cache_hit(self, mock_get_cached, mock_set_cached, mock_make_request):
+        """Uji bahwa cache hit tidak masuk ke micro-batch."""
+        mock_get_cached.return_value = {'bitcoin': {'usd': 50000}}
+        response = self.client.get(reverse('simple-price') + '?ids=bitcoin&vs_currencies=usd')
+        self.assertEqual(response.data, {'bitcoin': {'usd': 50000}})
+        mock_make_request.assert_not_called()
+        mock_set_cached.assert_not_called()
+
     def test_coin_detail_missing_param(self, mock_make_request):
         url = reverse('coin-info')
         response = self.client.get(url)
@@ -132,7 +305,9 @@ class CoinGeckoViewsTests(BaseServiceIntegrationTest):
         mock_make_request.assert_called_with(
             'coingecko',
             '/coins/bitcoin',
-            user=self.user
+            params={},
+            user=self.user,
+            spec=get_endpoint('coin-info')
         )
 
 @patch('services.views.APIClient.make_request')
@@ -145,7 +320,9 @@ class ExchangeRateViewsTests(BaseServiceIntegrationTest):
         mock_make_request.assert_called_with(
             'exchangeRate',
             '/latest/USD',
-            user=self.user
+            params={},
+            user=self.user,
+            spec=get_endpoint('exchanges-rate')
         )
 
     def test_convert_currency_success(self, mock_make_request):
@@ -156,5 +333,514 @@ class ExchangeRateViewsTests(BaseServiceIntegrationTest):
         mock_make_request.assert_called_with(
             'exchangeRate',
             '/pair/USD/JPY/1',
-            user=self.user
+            params={},
+            user=self.user,
+            spec=get_endpoint('pair')
         )
+
+def stub_server(routes):
+    """
+    HTTP server lokal untuk menguji adapter provider. `routes` adalah
+    {path: (status, body)}; server dihentikan otomatis lewat addCleanup di caller.
+    """
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            status_code, body = routes.get(self.path.split('?')[0], (404, {'error': 'not found'}))
+            payload = json.dumps(body).encode()
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}", requests
+
+
+FRANKFURTER_LATEST = {'amount': 1.0, 'base': 'USD', 'date': '2024-01-02', 'rates': {'EUR': 0.9, 'JPY': 140.0}}
+
+
+@patch('services.utils.api_client.time.sleep')
+class ProviderFailoverTests(BaseServiceIntegrationTest):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = FileCache()
+        cache.cache_dir = tmp.name
+        cache_patch = patch('services.utils.api_client.file_cache', cache)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+        circuit_breakers.reset()
+        provider_router.reset()
+        self.addCleanup(circuit_breakers.reset)
+        self.addCleanup(provider_router.reset)
+
+    def provider(self, name, routes, priority=0):
+        server, url, requests = stub_server(routes)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        service, _ = ThirdPartyService.objects.update_or_create(
+            name=name,
+            defaults={'api_endpoint': url, 'capability': 'fx', 'priority': priority, 'is_active': True},
+        )
+        service.set_api_key('provider_key')
+        service.save()
+        service_registry.invalidate()
+        return requests
+
+    def test_failover_to_secondary_provider(self, mock_sleep):
+        """Uji bahwa provider utama yang 503 dilewati dan response Frankfurter dinormalisasi."""
+        primary = self.provider('exchangeRate', {'/provider_key/latest/USD': (503, {})}, priority=0)
+        self.provider('frankfurter', {'/latest': (200, FRANKFURTER_LATEST)}, priority=1)
+
+        response = self.client.get(reverse('exchanges-rate') + '?currency=USD')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['base_code'], 'USD')
+        self.assertEqual(response.data['conversion_rates'], {'USD': 1.0, 'EUR': 0.9, 'JPY': 140.0})
+        self.assertEqual(response.data['time_last_update_unix'], 1704153600)
+        self.assertEqual(primary, ['/provider_key/latest/USD'] * 3)
+        self.assertEqual(circuit_breakers.get('exchangeRate').failures, 1)
+
+    def test_pair_normalized_from_frankfurter(self, mock_sleep):
+        """Uji bahwa konversi dengan amount dari Frankfurter memakai format ExchangeRate-API."""
+        body = {'amount': 10.0, 'base': 'USD', 'date': '2024-01-02', 'rates': {'EUR': 9.0}}
+        requests = self.provider('frankfurter', {'/latest': (200, body)})
+
+        response = self.client.get(reverse('pair') + '?from=USD&to=EUR&amount=10')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['target_code'], 'EUR')
+        self.assertAlmostEqual(response.data['conversion_rate'], 0.9)
+        self.assertEqual(response.data['conversion_result'], 9.0)
+        self.assertIn('from=USD', requests[0])
+        self.assertIn('amount=10', requests[0])
+
+    def test_all_providers_down(self, mock_sleep):
+        """Uji bahwa 503 dikembalikan jika semua provider gagal."""
+        self.provider('frankfurter', {'/latest': (500, {})})
+
+        response = self.client.get(reverse('exchanges-rate') + '?currency=USD')
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@patch('services.views.APIClient.make_request')
+class RateLimitTests(BaseServiceIntegrationTest):
+    def test_rate_limit_headers(self, mock_make_request):
+        """Uji bahwa response menyertakan header RateLimit-*."""
+        mock_make_request.return_value = {'temperature': 25}
+        response = self.client.get(reverse('unified-weather'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['RateLimit-Limit'], '10')
+        self.assertEqual(response['RateLimit-Remaining'], '9')
+        self.assertIn('RateLimit-Reset', response)
+
+    @override_settings(API_RATE_LIMIT_PLANS={'free': '2/m', 'pro': '5/m'})
+    def test_rate_limit_per_api_key(self, mock_make_request):
+        """Uji bahwa limit dihitung per API key, bukan per IP."""
+        mock_make_request.return_value = {'temperature': 25}
+        url = reverse('unified-weather')
+
+        for _ in range(2):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+        # Key lain dari IP yang sama punya budget sendiri, sesuai plan-nya
+        _, other_key = UserAPIKey.objects.create_key(name="pro-key", user=self.user, plan='pro')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Api-Key {other_key}')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['RateLimit-Limit'], '5')
+
+@patch('services.views.APIClient.make_request')
+class EndpointRoutingTests(BaseServiceIntegrationTest):
+    def test_history_invalid_date(self, mock_make_request):
+        """Uji validasi format tanggal pada endpoint history."""
+        url = reverse('coins-history') + '?id=bitcoin&date=2020-01-01'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_make_request.assert_not_called()
+
+    def test_history_missing_date(self, mock_make_request):
+        """Uji bahwa date yang tidak dikirim menghasilkan 400, bukan 500."""
+        response = self.client.get(reverse('coins-history') + '?id=bitcoin')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'date parameter required'})
+
+    def test_exchanges_routes(self, mock_make_request):
+        """Uji bahwa endpoint exchanges ikut dibuat dari registry."""
+        mock_make_request.return_value = {'id': 'binance'}
+        response = self.client.get(reverse('exchanges-detail') + '?id=Binance')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_make_request.call_args[0], ('coingecko', '/exchanges/binance'))
+
+@patch('services.views.APIClient.make_request')
+class FieldProjectionViewTests(BaseServiceIntegrationTest):
+    def test_fields_projection(self, mock_make_request):
+        """Uji parameter fields= memangkas response dan tidak dikirim ke upstream."""
+        mock_make_request.return_value = {
+            'id': 'bitcoin',
+            'name': 'Bitcoin',
+            'market_data': {'current_price': {'usd': 50000, 'eur': 45000}},
+        }
+        url = reverse('coin-info') + '?id=bitcoin&fields=market_data.current_price.usd,name'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'name': 'Bitcoin', 'market_data': {'current_price': {'usd': 50000}}})
+        self.assertEqual(mock_make_request.call_args.kwargs['params'], {})
+
+    def test_fields_not_applied_to_errors(self, mock_make_request):
+        """Uji bahwa response error tidak ikut diproyeksikan."""
+        mock_make_request.return_value = {'error': 'Request timeout untuk github'}
+        response = self.client.get(reverse('github-user') + '?username=x&fields=login')
+        self.assertEqual(response.data, {'error': 'Request timeout untuk github'})
+
+class MarketChartDownsampleViewTests(BaseServiceIntegrationTest):
+    @patch('services.views.APIClient.make_derived_request')
+    def test_points_uses_derived_request(self, mock_derived):
+        """Uji bahwa points= memakai varian downsample."""
+        mock_derived.return_value = {'prices': [[0, 1.0]]}
+        url = reverse('coins-market-chart') + '?id=bitcoin&vs_currency=usd&days=365&points=500'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(mock_derived.call_args.kwargs['params'], {'vs_currency': 'usd', 'days': '365'})
+        self.assertEqual(mock_derived.call_args.kwargs['variant'], {'points': 500})
+
+    @patch('services.utils.timeseries_store.market_chart_store.get_chart')
+    def test_points_derives_from_local_store(self, mock_get_chart):
+        """Uji bahwa varian downsample dihitung dari store lokal."""
+        series = [[i * 1000, float(i)] for i in range(50)]
+        mock_get_chart.return_value = {'prices': series, 'market_caps': series, 'total_volumes': series}
+        url = reverse('coins-market-chart') + '?id=bitcoin&vs_currency=usd&days=30&points=10'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['prices']), 10)
+
+
+class MarketChartStoreViewTests(BaseServiceIntegrationTest):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.settings_override = override_settings(MARKET_CHART_STORE_DIR=self.tmp.name)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    @patch('services.views.APIClient.make_request')
+    def test_smaller_window_served_from_store(self, mock_make_request):
+        """Uji bahwa days lebih kecil setelah warm-up tidak memanggil upstream."""
+        now_ms = int(timezone.now().timestamp() * 1000)
+        series = [[now_ms - (30 - i) * 86400000 + 60000, float(i)] for i in range(31)]
+        mock_make_request.return_value = {'prices': series, 'market_caps': series, 'total_volumes': series}
+
+        first = self.client.get(reverse('coins-market-chart') + '?id=bitcoin&vs_currency=usd&days=30')
+        second = self.client.get(reverse('coins-market-chart') + '?id=bitcoin&vs_currency=usd&days=7')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first.data['prices']), 31)
+        self.assertEqual(len(second.data['prices']), 8)
+        mock_make_request.assert_called_once()
+        log = APIRequestLog.objects.get(cached=True)
+        self.assertEqual((log.endpoint_called, log.response_status), ('/coins/bitcoin/market_chart', 200))
+
+    @patch('services.views.APIClient.make_request')
+    def test_invalid_days_rejected(self, mock_make_request):
+        """Uji bahwa days yang bukan 'max' atau angka positif (termasuk nan/inf) menghasilkan 400."""
+        for days in ('abc', 'nan', 'inf', '-5'):
+            response = self.client.get(reverse('coins-market-chart') + f'?id=bitcoin&vs_currency=usd&days={days}')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_make_request.assert_not_called()
+
+
+@patch('services.views.coin_search_index')
+@patch('services.views.APIClient.make_request')
+class CoinSearchViewTests(BaseServiceIntegrationTest):
+    def test_cold_start_falls_back_to_upstream(self, mock_make_request, mock_index):
+        """Uji bahwa upstream dipakai selama index belum siap."""
+        mock_index.stale = True
+        mock_index.search.return_value = None
+        mock_make_request.return_value = {'coins': [{'id': 'solana'}]}
+
+        response = self.client.get(reverse('search') + '?query=Solana')
+
+        self.assertEqual(response.data, {'coins': [{'id': 'solana'}]})
+        mock_index.refresh_async.assert_called_once()
+        self.assertEqual(mock_make_request.call_args.kwargs['params'], {'query': 'solana'})
+
+    def test_served_from_index(self, mock_make_request, mock_index):
+        """Uji bahwa index yang siap menjawab tanpa request upstream."""
+        mock_index.stale = False
+        mock_index.search.return_value = [{'id': 'solana'}]
+
+        response = self.client.get(reverse('search') + '?query=sol')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['coins'], [{'id': 'solana'}])
+        mock_make_request.assert_not_called()
+        mock_index.refresh_async.assert_not_called()
+
+
+@patch('services.views.APIClient.make_request')
+class CoinHistoryStoreTests(BaseServiceIntegrationTest):
+    def test_past_date_fetched_once(self, mock_make_request):
+        """Uji bahwa tanggal yang sudah lewat hanya diambil sekali dari upstream."""
+        mock_make_request.return_value = {'id': 'bitcoin', 'market_data': {'current_price': {'usd': 1}}}
+        date = (timezone.now().date() - timedelta(days=10)).strftime('%d-%m-%Y')
+        url = reverse('coins-history') + f'?id=bitcoin&date={date}'
+
+        first = self.client.get(url)
+        second = self.client.get(url)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        mock_make_request.assert_called_once()
+        self.assertTrue(CoinHistorySnapshot.objects.filter(coin_id='bitcoin').exists())
+
+    def test_today_not_stored(self, mock_make_request):
+        """Uji bahwa data hari ini tidak disimpan permanen."""
+        mock_make_request.return_value = {'id': 'bitcoin'}
+        date = timezone.now().date().strftime('%d-%m-%Y')
+        self.client.get(reverse('coins-history') + f'?id=bitcoin&date={date}')
+        self.assertFalse(CoinHistorySnapshot.objects.exists())
+
+    def test_errors_not_stored(self, mock_make_request):
+        """Uji bahwa response error tidak disimpan."""
+        mock_make_request.return_value = {'error': 'Request timeout untuk coingecko'}
+        date = (timezone.now().date() - timedelta(days=3)).strftime('%d-%m-%Y')
+        self.client.get(reverse('coins-history') + f'?id=bitcoin&date={date}')
+        self.assertFalse(CoinHistorySnapshot.objects.exists())
+
+    def test_old_dates_served_only_from_store(self, mock_make_request):
+        """Uji bahwa tanggal di luar 365 hari hanya bisa dilayani dari store."""
+        old = timezone.now().date() - timedelta(days=800)
+        url = reverse('coins-history') + f"?id=bitcoin&date={old.strftime('%d-%m-%Y')}"
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+
+        CoinHistorySnapshot.objects.create(coin_id='bitcoin', date=old, data={'id': 'bitcoin'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'id': 'bitcoin'})
+        mock_make_request.assert_not_called()
+
+    def test_range_query(self, mock_make_request):
+        """Uji range query dari store tanpa request upstream."""
+        start = date(2024, 1, 1)
+        for offset in (0, 2):
+            CoinHistorySnapshot.objects.create(coin_id='bitcoin', date=start + timedelta(days=offset), data={'day': offset})
+
+        url = reverse('coins-history-range') + '?id=Bitcoin&from=01-01-2024&to=03-01-2024'
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['snapshots'], {'01-01-2024': {'day': 0}, '03-01-2024': {'day': 2}})
+        self.assertEqual(response.data['missing'], ['02-01-2024'])
+        mock_make_request.assert_not_called()
+
+    def test_range_query_validation(self, mock_make_request):
+        """Uji validasi parameter range query."""
+        url = reverse('coins-history-range')
+        self.assertEqual(self.client.get(url + '?id=bitcoin').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url + '?id=bitcoin&from=03-01-2024&to=01-01-2024').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url + '?id=bitcoin&from=01-01-2020&to=01-01-2024').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_load_coin_history_command(self, mock_make_request):
+        """Uji bulk load snapshot dari file JSON Lines."""
+        lines = [
+            json.dumps({'id': 'bitcoin', 'date': '01-01-2024', 'data': {'a': 1}}),
+            json.dumps({'id': 'bitcoin', 'date': '02-01-2024', 'data': {'a': 2}}),
+            json.dumps({'id': 'bitcoin', 'date': '01-01-2024', 'data': {'a': 1}}),
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write('\n'.join(lines))
+        try:
+            call_command('load_coin_history', f.name, stdout=StringIO())
+        finally:
+            os.remove(f.name)
+        self.assertEqual(CoinHistorySnapshot.objects.filter(coin_id='bitcoin').count(), 2)
+
+
+class CacheSnapshotCommandTests(APITestCase):
+    def setUp(self):
+        self.dirs = []
+        for _ in range(2):
+            tmp = tempfile.TemporaryDirectory()
+            self.addCleanup(tmp.cleanup)
+            self.dirs.append(tmp.name)
+        self.source, self.target = FileCache(), FileCache()
+        self.source.cache_dir, self.target.cache_dir = self.dirs
+        self.snapshot = os.path.join(self.dirs[0], 'snapshot.jsonl.gz')
+
+    def dump_and_load(self, **options):
+        with patch('services.management.commands.dump_cache.file_cache', self.source):
+            call_command('dump_cache', self.snapshot, stdout=StringIO())
+        out = StringIO()
+        with patch('services.management.commands.load_cache.file_cache', self.target):
+            call_command('load_cache', self.snapshot, stdout=out, **options)
+        return out.getvalue()
+
+    def test_live_entries_restored_with_same_expiry(self):
+        """Uji bahwa entry yang belum expired dipindah dengan expires yang sama."""
+        for i in range(1200):
+            self.source.set(f"coingecko:{i}", {'i': i}, timeout=600)
+        self.source.set('expired', {'v': 0}, timeout=-1, stale_ttl=60)
+
+        output = self.dump_and_load(workers=4)
+
+        self.assertIn('Loaded 1200 cache entries', output)
+        self.assertEqual(self.target.get('coingecko:7'), {'i': 7})
+        self.assertIsNone(self.target.get('expired'))
+        with open(self.source._get_file_path('coingecko:7')) as a, open(self.target._get_file_path('coingecko:7')) as b:
+            self.assertEqual(json.load(a)['expires'], json.load(b)['expires'])
+
+    def test_existing_entries_kept_unless_overwrite(self):
+        """Uji bahwa entry yang sudah ada di node tujuan tidak ditimpa kecuali --overwrite."""
+        self.source.set('key', {'v': 'snapshot'}, timeout=600)
+        self.target.set('key', {'v': 'local'}, timeout=600)
+
+        self.dump_and_load()
+        self.assertEqual(self.target.get('key'), {'v': 'local'})
+
+        self.dump_and_load(overwrite=True)
+        self.assertEqual(self.target.get('key'), {'v': 'snapshot'})
+
+    def test_tags_restored_for_purge(self):
+        """Uji bahwa tag ikut di snapshot sehingga entry hasil load bisa di-purge."""
+        self.source.set('btc', {'v': 1}, timeout=600, tags=['service:coingecko', 'param:id=bitcoin'])
+        self.source.set('eth', {'v': 2}, timeout=600, tags=['service:coingecko', 'param:id=ethereum'])
+
+        self.dump_and_load()
+
+        self.assertEqual(self.target.purge(['param:id=bitcoin']), 1)
+        self.assertIsNone(self.target.get('btc'))
+        self.assertEqual(self.target.get('eth'), {'v': 2})
+
+    def test_invalid_snapshot_rejected(self):
+        """Uji bahwa file yang bukan snapshot ditolak dengan CommandError."""
+        with open(self.snapshot, 'w') as f:
+            f.write('not a snapshot')
+        with patch('services.management.commands.load_cache.file_cache', self.target):
+            with self.assertRaises(CommandError):
+                call_command('load_cache', self.snapshot, stdout=StringIO())
+
+
+class CachePurgeTests(APITestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = FileCache()
+        self.cache.cache_dir = tmp.name
+        self.cache.set('btc', {'v': 1}, 60, tags=['service:coingecko', 'param:id=bitcoin'])
+        self.cache.set('eth', {'v': 2}, 60, tags=['service:coingecko', 'param:id=ethereum'])
+
+    def test_staff_can_purge(self):
+        """Uji bahwa staff bisa purge lewat endpoint admin."""
+        self.client.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+        with patch('services.views.file_cache', self.cache):
+            response = self.client.post(reverse('cache-purge'), {'tags': ['param:id=bitcoin']}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['purged'], 1)
+        self.assertIsNone(self.cache.get('btc'))
+        self.assertEqual(self.cache.get('eth'), {'v': 2})
+
+    def test_non_staff_and_invalid_tags_rejected(self):
+        """Uji bahwa user biasa ditolak dan tag tanpa prefix dikenal menghasilkan 400."""
+        self.client.force_authenticate(User.objects.create_user('user', password='x'))
+        response = self.client.post(reverse('cache-purge'), {'tags': ['param:id=bitcoin']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+        response = self.client.post(reverse('cache-purge'), {'tags': ['bitcoin']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_purge_command(self):
+        """Uji command purge_cache dengan --dry-run dan purge sebenarnya."""
+        out = StringIO()
+        with patch('services.management.commands.purge_cache.file_cache', self.cache):
+            call_command('purge_cache', '--tag', 'service:coingecko', '--dry-run', stdout=out)
+            call_command('purge_cache', '--tag', 'service:coingecko', stdout=out)
+
+        self.assertIn('2 cache entries match', out.getvalue())
+        self.assertIn('Purged 2 cache entries', out.getvalue())
+        self.assertIsNone(self.cache.get('eth'))
+
+    def test_learned_ttls_for_staff(self):
+        """Uji bahwa TTL adaptif per endpoint bisa dilihat staff."""
+        self.client.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+        with patch('services.views.adaptive_ttl') as ttls:
+            ttls.stats.return_value = {'exchanges': {'ttl': 4500, 'base_ttl': 3600}}
+            response = self.client.get(reverse('cache-ttl'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['exchanges']['ttl'], 4500)
+
+
+class MetricsTests(BaseServiceIntegrationTest):
+    def test_server_timing_and_metrics(self):
+        """Uji header Server-Timing per fase dan counter cache di /metrics."""
+        hits = CACHE_LOOKUPS.value('openweather', 'hit')
+        requests = REQUEST_DURATION.count('unified-weather', 'GET', 200)
+        with patch('services.utils.api_client.file_cache') as cache:
+            cache.get.return_value = {'name': 'London'}
+            response = self.client.get(reverse('unified-weather') + '?city=London')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        phases = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        self.assertEqual(phases[-1], 'total')
+        for name in ('auth', 'ratelimit', 'cache', 'log'):
+            self.assertIn(name, phases)
+        self.assertEqual(CACHE_LOOKUPS.value('openweather', 'hit'), hits + 1)
+        self.assertEqual(REQUEST_DURATION.count('unified-weather', 'GET', 200), requests + 1)
+
+        self.client.force_login(User.objects.create_user('ops', password='x', is_staff=True))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('# TYPE api_request_duration_seconds histogram', body)
+        self.assertIn(f'api_cache_lookups_total{{service="openweather",result="hit"}} {hits + 1}', body)
+        self.assertIn('api_request_phase_seconds_bucket{phase="auth",le="+Inf"}', body)
+
+    def test_metrics_private_by_default(self):
+        """Uji bahwa tanpa METRICS['token'] /metrics hanya untuk staff, bukan pemilik API key."""
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+
+    @override_settings(METRICS={'token': 'secret'})
+    def test_metrics_token(self):
+        """Uji bahwa /metrics butuh bearer token jika METRICS['token'] diisi."""
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class SetupServicesCommandTests(APITestCase):
+    ENV = {
+        'OPENWEATHER_API_KEY': 'w', 'NEWSAPI_API_KEY': 'n', 'GITHUB_PERSONAL_TOKEN': 'g',
+        'COINGECKO_API_KEY': 'c', 'EXCHANGE-RATE-API-KEY': 'e',
+    }
+
+    def test_sets_capability_on_fresh_and_existing_services(self):
+        """Uji bahwa setup_services mengisi capability/priority, juga pada service yang sudah ada."""
+        existing = ThirdPartyService(name='coingecko', api_endpoint='https://api.coingecko.com/api/v3')
+        existing.set_api_key('c')
+        existing.save()
+
+        with patch.dict(os.environ, self.ENV):
+            call_command('setup_services', stdout=StringIO())
+
+        self.assertEqual(ThirdPartyService.objects.get(name='coingecko').capability, 'crypto_price')
+        self.assertEqual(ThirdPartyService.objects.get(name='exchangeRate').capability, 'fx')
+        self.assertEqual(ThirdPartyService.objects.get(name='openweather').capability, '')
@@ -1,15 +1,53 @@
 
 import os
+import tempfile
 import json
+import hashlib
+from datetime import datetime
 import time
 import requests
+import socket
+import threading
+import asyncio
+from asgiref.sync import iscoroutinefunction
 from unittest.mock import patch, MagicMock
-from django.test import TestCase, override_settings
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
 from django.contrib.auth.models import User
 from services.utils.cache_service import FileCache
-from services.utils.encryption_service import encryption_service
+from services.utils.cache_tags import TAG_ADD_SCRIPT
+from services.utils.shared_cache import SharedMemoryCache
+from services.utils.coordination import (APPEND_LOG_SCRIPT, UNLOCK_SCRIPT, CoordinationBackend, RedisConnection, SingleFlight,
+                                         encode_command, read_reply)
+from services.utils.circuit_breaker import CircuitBreakerRegistry
+from services.utils.rate_limiter import BackendCounterStore
+from cryptography.fernet import Fernet
+from services.utils.encryption_service import EncryptionService, encryption_service
 from services.models import ThirdPartyService, APIRequestLog
-from services.utils.api_client import APIClient
+from services.utils.api_client import APIClient, _hedge_pool
+from services.utils.service_registry import ServiceRegistry, service_registry
+from services.utils.api_key_cache import VerifiedKeyCache, verified_key_cache
+from services.permissions import HasAPIKey
+from services.endpoints import SERVICE_AUTH, ParamError, geo_bucket, get_endpoint, weather_batch_locations
+from services.utils.downsample import downsample, downsample_chart, lttb, minmax
+from services.utils.transform import Transform, compile_paths, compile_projection, project
+from services.utils.rate_limiter import (InMemoryCounterStore, SharedCounterStore, SlidingWindowRateLimiter,
+                                         parse_rate)
+from services.utils.search_index import CoinSearchIndex
+from services.utils.weather_batch import WeatherBatch
+from services.utils.price_batcher import PriceBatcher, split_prices
+from services.utils.price_stream import PriceStreamHub
+from services.utils.admission import AdaptiveLimiter, AdmissionControl, Overloaded
+from services.utils.latency import HedgeBudget, LatencyRegistry, LatencyTracker
+from services.utils.adaptive_ttl import AdaptiveTTL, adaptive_ttl
+from services.middleware import ServerTimingMiddleware
+from services.utils.metrics import MetricsRegistry, finish_request, phase, server_timing, start_request
+from services.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from services.providers import CoinCapAdapter, ExchangeRateAPIAdapter, ProviderRouter
+from services.utils.service_registry import ServiceConfig
+from services.utils.github_batch import GitHubUserBatch, build_query, to_rest_user
+from services.utils.timeseries_store import DAY_MS, TimeSeriesStore, bucket_rows, chart_to_rows, rows_to_chart
+from user.models import UserAPIKey
 
 # Gunakan direktori cache sementara untuk pengujian
 TEST_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'test_cache')
@@ -73,6 +111,15 @@ class FileCacheTests(TestCase):
         file_path = self.cache._get_file_path(key)
         self.assertFalse(os.path.exists(file_path))
 
+    def test_stale_read_within_grace(self):
+        """Uji bahwa data expired masih bisa dibaca lewat get_stale selama stale_ttl."""
+        self.cache.set("stale_key", {"v": 1}, timeout=-1, stale_ttl=60)
+        self.assertIsNone(self.cache.get("stale_key"))
+        self.assertEqual(self.cache.get_stale("stale_key"), {"v": 1})
+
+        self.cache.set("gone_key", {"v": 1}, timeout=-1)
+        self.assertIsNone(self.cache.get_stale("gone_key"))
+
     def test_delete_cache(self):
         """Uji menghapus item dari cache."""
         key = "delete_key"
@@ -119,6 +166,39 @@ class EncryptionServiceTests(TestCase):
         """Uji dekripsi nilai None."""
         self.assertIsNone(encryption_service.decrypt(None))
 
+    def test_key_is_not_derived_at_init(self):
+        """Uji bahwa PBKDF2 tidak dijalankan saat instance dibuat."""
+        with patch('services.utils.encryption_service.PBKDF2HMAC') as mock_kdf:
+            service = EncryptionService()
+            mock_kdf.assert_not_called()
+        self.assertIsNone(service._fernet)
+
+    def test_uses_encryption_key_from_settings(self):
+        """Uji bahwa ENCRYPTION_KEY dipakai langsung tanpa derivasi."""
+        key = Fernet.generate_key()
+        with override_settings(ENCRYPTION_KEY=key.decode()):
+            service = EncryptionService()
+            with patch('services.utils.encryption_service.derive_key') as mock_derive:
+                encrypted = service.encrypt("secret")
+                mock_derive.assert_not_called()
+            self.assertEqual(service.key, key)
+            self.assertEqual(service.decrypt(encrypted), "secret")
+
+    def test_rotate_to_new_key(self):
+        """Uji bahwa data lama tetap terbaca dan rotate memakai key baru."""
+        old_key, new_key = Fernet.generate_key(), Fernet.generate_key()
+        with override_settings(ENCRYPTION_KEY=old_key.decode()):
+            old_encrypted = EncryptionService().encrypt("secret")
+
+        with override_settings(ENCRYPTION_KEY=new_key.decode(), ENCRYPTION_OLD_KEYS=[old_key.decode()]):
+            service = EncryptionService()
+            self.assertEqual(service.decrypt(old_encrypted), "secret")
+            rotated = service.rotate(old_encrypted)
+
+        with override_settings(ENCRYPTION_KEY=new_key.decode(), ENCRYPTION_OLD_KEYS=[]):
+            self.assertEqual(EncryptionService().decrypt(rotated), "secret")
+            self.assertIsNone(EncryptionService().decrypt(old_encrypted))
+
 
 @patch('services.models.encryption_service')
 class ThirdPartyServiceModelTests(TestCase):
@@ -182,14 +262,14 @@ class ThirdPartyServiceModelTests(TestCase):
 @patch('services.utils.api_client.APIRequestLog')
 @patch('requests.Session.get')
 @patch('services.utils.api_client.file_cache')
-@patch('services.utils.api_client.ThirdPartyService')
+@patch('services.utils.api_client.service_registry')
 class APIClientTests(TestCase):
 
     def setUp(self):
         self.client = APIClient()
         self.user = User.objects.create(username='testuser')
 
-    def test_make_request_returns_cached_data(self, mock_service_model, mock_cache, mock_session_get, mock_log):
+    def test_make_request_returns_cached_data(self, mock_registry, mock_cache, mock_session_get, mock_log):
         """Uji bahwa make_request mengembalikan data dari cache jika tersedia."""
         mock_cache.get.return_value = {'data': 'cached_response'}
         
@@ -200,14 +280,14 @@ class APIClientTests(TestCase):
         mock_session_get.assert_not_called()
         mock_log.objects.create.assert_called_once()
 
-    def test_make_request_fetches_from_api_and_caches(self, mock_service_model, mock_cache, mock_session_get, mock_log):
+    def test_make_request_fetches_from_api_and_caches(self, mock_registry, mock_cache, mock_session_get, mock_log):
         """Uji permintaan API ketika data tidak ada di cache."""
         mock_cache.get.return_value = None
         
         mock_service = MagicMock()
         mock_service.api_endpoint = 'http://api.example.com'
-        mock_service.get_api_key.return_value = 'decrypted_key'
-        mock_service_model.objects.get.return_value = mock_service
+        mock_service.api_key = 'decrypted_key'
+        mock_registry.get.return_value = mock_service
         
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -218,32 +298,47 @@ class APIClientTests(TestCase):
 
         self.assertEqual(response, {'data': 'live_response'})
         mock_cache.get.assert_called_once()
-        mock_service_model.objects.get.assert_any_call(name='openweather', is_active=True)
+        mock_registry.get.assert_any_call('openweather')
         mock_session_get.assert_called_once()
         mock_cache.set.assert_called_once()
         mock_log.objects.create.assert_called_once()
 
-    def test_service_not_found(self, mock_service_model, mock_cache, mock_session_get, mock_log):
+    def test_cache_tags_exclude_upstream_key(self, mock_registry, mock_cache, mock_session_get, mock_log):
+        """Uji bahwa API key yang ditambahkan QueryAuth tidak ikut menjadi tag cache."""
+        mock_cache.get.return_value = None
+        mock_service = MagicMock()
+        mock_service.api_endpoint = 'http://api.example.com'
+        mock_service.api_key = 'secret-cg-key'
+        mock_registry.get.return_value = mock_service
+        mock_session_get.return_value = MagicMock(status_code=200, json=MagicMock(return_value={'bitcoin': {}}))
+
+        self.client.make_request('coingecko', '/simple/price', params={'ids': 'bitcoin', 'vs_currencies': 'usd'},
+                                 spec=get_endpoint('simple-price'))
+
+        self.assertEqual(mock_session_get.call_args.kwargs['params']['x_cg_demo_api_key'], 'secret-cg-key')
+        tags = mock_cache.set.call_args.kwargs['tags']
+        self.assertIn('param:ids=bitcoin', tags)
+        self.assertFalse([tag for tag in tags if 'secret-cg-key' in tag])
+
+    def test_service_not_found(self, mock_registry, mock_cache, mock_session_get, mock_log):
         """Uji penanganan ketika service tidak ditemukan."""
         mock_cache.get.return_value = None
         
-        class MockDoesNotExist(Exception): pass
-        mock_service_model.DoesNotExist = MockDoesNotExist
-        mock_service_model.objects.get.side_effect = mock_service_model.DoesNotExist
+        mock_registry.get.return_value = None
 
         response = self.client.make_request('unknown_service', '/endpoint')
         
         self.assertEqual(response, {"error": "Service unknown_service tidak ditemukan atau tidak aktif"})
         mock_session_get.assert_not_called()
 
-    def test_request_timeout(self, mock_service_model, mock_cache, mock_session_get, mock_log):
+    def test_request_timeout(self, mock_registry, mock_cache, mock_session_get, mock_log):
         """Uji penanganan timeout request."""
         mock_cache.get.return_value = None
         
         mock_service = MagicMock()
         mock_service.api_endpoint = 'http://api.example.com'
-        mock_service.get_api_key.return_value = 'decrypted_key'
-        mock_service_model.objects.get.return_value = mock_service
+        mock_service.api_key = 'decrypted_key'
+        mock_registry.get.return_value = mock_service
         
         mock_session_get.side_effect = requests.Timeout
 
@@ -251,3 +346,1864 @@ class APIClientTests(TestCase):
 
         self.assertEqual(response, {"error": "Request timeout untuk github"})
         mock_log.objects.create.assert_called_once()
+
+
+
+@patch('services.utils.api_client.time.sleep')
+@patch('services.utils.api_client.APIRequestLog')
+@patch('requests.Session.get')
+@patch('services.utils.api_client.file_cache')
+@patch('services.utils.api_client.service_registry')
+class APIClientNegativeCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def upstream(self, mock_registry, mock_session_get, status_code, body=None, headers=None):
+        mock_registry.get.return_value = MagicMock(id=1, api_endpoint='http://api.example.com', api_key='k')
+        mock_session_get.return_value = MagicMock(
+            status_code=status_code, json=MagicMock(return_value=body or {}), headers=headers or {}
+        )
+
+    @override_settings(NEGATIVE_CACHE_TTL={'default': 60, 'github': 600})
+    def test_not_found_cached_without_retry(self, mock_registry, mock_cache, mock_session_get, mock_log, mock_sleep):
+        """Uji bahwa 404 tidak di-retry dan di-cache dengan TTL negative milik service."""
+        mock_cache.get.return_value = None
+        self.upstream(mock_registry, mock_session_get, 404, {'message': 'Not Found'})
+
+        result = self.client.make_request('github', '/users/no-such-user')
+
+        self.assertEqual(result, {'error': 'Not Found', 'status': 404})
+        mock_session_get.assert_called_once()
+        mock_sleep.assert_not_called()
+        key, data, ttl = mock_cache.set.call_args[0]
+        self.assertEqual((data, ttl), (result, 600))
+        self.assertEqual(mock_log.objects.create.call_args.kwargs['response_status'], 404)
+
+    def test_negative_entry_served_from_cache(self, mock_registry, mock_cache, mock_session_get, mock_log, mock_sleep):
+        """Uji bahwa negative entry dilayani dari cache dengan status aslinya."""
+        mock_cache.get.return_value = {'error': 'coin not found', 'status': 404}
+        mock_registry.get.return_value = MagicMock(id=1)
+
+        result = self.client.make_request('coingecko', '/coins/nope')
+
+        self.assertEqual(result['status'], 404)
+        mock_session_get.assert_not_called()
+        self.assertEqual(mock_log.objects.create.call_args.kwargs['response_status'], 404)
+
+    def test_server_error_retried_not_cached(self, mock_registry, mock_cache, mock_session_get, mock_log, mock_sleep):
+        """Uji bahwa 5xx tetap di-retry, tidak di-cache dan menjadi 502."""
+        mock_cache.get.return_value = None
+        self.upstream(mock_registry, mock_session_get, 503)
+
+        result = self.client.make_request('coingecko', '/simple/price')
+
+        self.assertEqual(result, {'error': 'coingecko returned HTTP 503', 'status': 502})
+        self.assertEqual(mock_session_get.call_count, 3)
+        mock_cache.set.assert_not_called()
+
+    def test_upstream_rate_limit(self, mock_registry, mock_cache, mock_session_get, mock_log, mock_sleep):
+        """Uji bahwa 429 upstream menjadi 503 dengan Retry-After."""
+        mock_cache.get.return_value = None
+        self.upstream(mock_registry, mock_session_get, 429, headers={'Retry-After': '30'})
+
+        result = self.client.make_request('coingecko', '/simple/price')
+
+        self.assertEqual(result['status'], 503)
+        self.assertEqual(result['retry_after'], 30)
+        mock_cache.set.assert_not_called()
+
+class ServiceRegistryTests(TestCase):
+    def setUp(self):
+        self.registry = ServiceRegistry(check_interval=60)
+        service = ThirdPartyService(
+            name="openweather",
+            api_endpoint="http://api.example.com",
+        )
+        service.set_api_key("weather_key")
+        service.save()
+        ThirdPartyService.objects.create(
+            name="disabled",
+            api_endpoint="http://api.example.com",
+            api_key=encryption_service.encrypt("disabled_key"),
+            is_active=False
+        )
+
+    def test_get_returns_decrypted_config(self):
+        """Uji registry mengembalikan config dengan API key yang sudah didecrypt."""
+        config = self.registry.get("openweather")
+        self.assertEqual(config.api_key, "weather_key")
+        self.assertEqual(config.api_endpoint, "http://api.example.com")
+        self.assertIsNone(self.registry.get("disabled"))
+        self.assertIsNone(self.registry.get("unknown"))
+
+    def test_loads_once(self):
+        """Uji bahwa lookup berikutnya tidak menyentuh database."""
+        self.registry.get("openweather")
+        with self.assertNumQueries(0):
+            self.registry.get("openweather")
+            self.registry.get("unknown")
+
+    def test_save_invalidates_registry(self):
+        """Uji bahwa post_save signal membuang snapshot registry singleton."""
+        self.assertEqual(service_registry.get("openweather").api_key, "weather_key")
+
+        service = ThirdPartyService.objects.get(name="openweather")
+        service.set_api_key("rotated_key")
+        service.save()
+
+        self.assertEqual(service_registry.get("openweather").api_key, "rotated_key")
+
+    def test_delete_invalidates_registry(self):
+        """Uji bahwa post_delete signal menghapus service dari registry."""
+        self.assertIsNotNone(service_registry.get("openweather"))
+        ThirdPartyService.objects.filter(name="openweather").delete()
+        self.assertIsNone(service_registry.get("openweather"))
+
+    @patch('services.utils.service_registry.cache')
+    def test_version_change_triggers_reload(self, mock_cache):
+        """Uji bahwa perubahan version stamp dari worker lain memicu reload."""
+        mock_cache.get.return_value = "v1"
+        self.registry.check_interval = 0
+        self.registry.get("openweather")
+
+        with self.assertNumQueries(0):
+            self.registry.get("openweather")
+
+        mock_cache.get.return_value = "v2"
+        with self.assertNumQueries(1):
+            self.registry.get("openweather")
+
+
+class HasAPIKeyCacheTests(TestCase):
+    def setUp(self):
+        verified_key_cache.clear()
+        self.factory = RequestFactory()
+        self.permission = HasAPIKey()
+        self.user = User.objects.create_user(username='keyuser', password='testpass123')
+        self.api_key, self.key = UserAPIKey.objects.create_key(name="test-key", user=self.user)
+
+    def _request(self, key):
+        return self.factory.get('/api/weather/', HTTP_AUTHORIZATION=f'Api-Key {key}')
+
+    def test_verified_key_served_from_memory(self):
+        """Uji bahwa verifikasi kedua tidak menyentuh database."""
+        self.assertTrue(self.permission.has_permission(self._request(self.key), None))
+
+        request = self._request(self.key)
+        with self.assertNumQueries(0):
+            self.assertTrue(self.permission.has_permission(request, None))
+        self.assertEqual(request.api_key_id, self.api_key.id)
+        self.assertEqual(request.api_key_user_id, self.user.id)
+
+    def test_invalid_key_rejected(self):
+        """Uji bahwa key yang salah ditolak."""
+        prefix = self.key.partition('.')[0]
+        self.assertFalse(self.permission.has_permission(self._request(f'{prefix}.wrong'), None))
+        self.assertFalse(self.permission.has_permission(self.factory.get('/'), None))
+
+    def test_revoke_invalidates_cache(self):
+        """Uji bahwa key yang di-revoke langsung ditolak walaupun sudah di-cache."""
+        self.assertTrue(self.permission.has_permission(self._request(self.key), None))
+
+        self.api_key.revoked = True
+        self.api_key.save()
+
+        self.assertFalse(self.permission.has_permission(self._request(self.key), None))
+
+    def test_delete_invalidates_cache(self):
+        """Uji bahwa key yang dihapus langsung ditolak."""
+        self.assertTrue(self.permission.has_permission(self._request(self.key), None))
+        self.api_key.delete()
+        self.assertFalse(self.permission.has_permission(self._request(self.key), None))
+
+    def test_cache_stores_digest_only(self):
+        """Uji bahwa plain text key tidak disimpan di cache."""
+        self.permission.has_permission(self._request(self.key), None)
+        self.assertNotIn(self.key, verified_key_cache._entries)
+        self.assertIn(VerifiedKeyCache.digest(self.key), verified_key_cache._entries)
+
+
+class SlidingWindowRateLimiterTests(TestCase):
+    def setUp(self):
+        self.limiter = SlidingWindowRateLimiter(store=InMemoryCounterStore())
+
+    def test_parse_rate(self):
+        """Uji parsing format rate."""
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('1000/h'), (1000, 3600))
+        self.assertEqual(parse_rate('5/second'), (5, 1))
+
+    @patch('services.utils.rate_limiter.time.time', return_value=6000.0)
+    def test_allows_until_limit(self, mock_time):
+        """Uji bahwa request ditolak setelah limit tercapai."""
+        results = [self.limiter.hit('key:a', 3, 60) for _ in range(4)]
+        self.assertEqual([r.allowed for r in results], [True, True, True, False])
+        self.assertEqual([r.remaining for r in results], [2, 1, 0, 0])
+        self.assertIn('Retry-After', results[-1].headers())
+
+    @patch('services.utils.rate_limiter.time.time', return_value=6000.0)
+    def test_identities_are_independent(self, mock_time):
+        """Uji bahwa setiap API key punya budget sendiri."""
+        for _ in range(3):
+            self.limiter.hit('key:a', 3, 60)
+        self.assertFalse(self.limiter.hit('key:a', 3, 60).allowed)
+        self.assertTrue(self.limiter.hit('key:b', 3, 60).allowed)
+
+    @patch('services.utils.rate_limiter.time.time')
+    def test_previous_window_is_weighted(self, mock_time):
+        """Uji bahwa window sebelumnya masih dihitung sesuai overlap-nya."""
+        mock_time.return_value = 6000.0
+        for _ in range(4):
+            self.limiter.hit('key:a', 4, 60)
+
+        # 15 detik ke window berikutnya: 4 * 0.75 = 3 request masih terhitung
+        mock_time.return_value = 6075.0
+        self.assertTrue(self.limiter.hit('key:a', 4, 60).allowed)
+        self.assertFalse(self.limiter.hit('key:a', 4, 60).allowed)
+
+        # Menjelang akhir window bobot window sebelumnya hampir nol
+        mock_time.return_value = 6119.0
+        self.assertTrue(self.limiter.hit('key:a', 4, 60).allowed)
+
+
+class SharedCounterStoreTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'counters')
+
+    def test_counters_shared_between_workers(self):
+        """Uji bahwa dua worker (file descriptor terpisah) berbagi counter, jadi limit tidak berlipat."""
+        worker_a = SlidingWindowRateLimiter(SharedCounterStore(self.path, slots=64))
+        worker_b = SlidingWindowRateLimiter(SharedCounterStore(self.path, slots=64))
+        results = [worker.hit('key:a', 3, 60).allowed for worker in (worker_a, worker_b, worker_a, worker_b)]
+        self.assertEqual(results, [True, True, True, False])
+
+    @patch('services.utils.rate_limiter.time.time')
+    def test_counter_expires(self, mock_time):
+        """Uji bahwa counter mulai dari nol lagi setelah TTL-nya lewat."""
+        store = SharedCounterStore(self.path, slots=64)
+        mock_time.return_value = 1000.0
+        self.assertEqual(store.incr('a', 10), 1)
+        self.assertEqual(store.get_and_incr('a', 'a', 10), (1, 2))
+        mock_time.return_value = 1011.0
+        self.assertEqual(store.get('a'), 0)
+        self.assertEqual(store.incr('a', 10), 1)
+
+    @patch('services.utils.rate_limiter.time.time', return_value=1000.0)
+    def test_full_table_replaces_soonest_expiring(self, mock_time):
+        """Uji bahwa tabel penuh mengganti counter yang paling cepat expired."""
+        store = SharedCounterStore(self.path, slots=8)
+        for i in range(8):
+            store.incr(f"k{i}", 100 + i)
+        store.incr('new', 50)
+        self.assertEqual(store.get('k0'), 0)
+        self.assertEqual(store.get('k7'), 1)
+        self.assertEqual(store.get('new'), 1)
+
+    def test_resized_table_starts_empty(self):
+        """Uji bahwa file dengan jumlah slot berbeda diinisialisasi ulang."""
+        SharedCounterStore(self.path, slots=64).incr('a', 60)
+        self.assertEqual(SharedCounterStore(self.path, slots=128).get('a'), 0)
+
+
+class EndpointRegistryTests(TestCase):
+    def test_normalization_produces_same_upstream_request(self):
+        """Uji bahwa variasi input yang setara menghasilkan request upstream yang sama."""
+        endpoint = get_endpoint('simple-price')
+        a = endpoint.build(endpoint.clean({'ids': 'Ethereum, bitcoin', 'vs_currencies': 'USD'}))
+        b = endpoint.build(endpoint.clean({'ids': 'bitcoin,ethereum,bitcoin', 'vs_currencies': 'usd'}))
+        self.assertEqual(a, b)
+        self.assertEqual(a, ('/simple/price', {'ids': 'bitcoin,ethereum', 'vs_currencies': 'usd'}))
+
+    def test_path_template_and_fixed_params(self):
+        """Uji pengisian path template dan parameter tetap."""
+        endpoint = get_endpoint('coins-market-chart')
+        path, params = endpoint.build(endpoint.clean({'id': 'Bitcoin', 'vs_currency': 'usd', 'days': '7'}))
+        self.assertEqual(path, '/coins/bitcoin/market_chart')
+        self.assertEqual(params, {'vs_currency': 'usd', 'days': '7'})
+
+        endpoint = get_endpoint('unified-news')
+        self.assertEqual(endpoint.build(endpoint.clean({})), ('/v2/top-headlines', {'category': 'general', 'pageSize': 10}))
+
+    def test_path_values_are_quoted(self):
+        """Uji bahwa parameter path tidak bisa keluar dari segmennya."""
+        endpoint = get_endpoint('github-user')
+        path, _ = endpoint.build(endpoint.clean({'username': '../orgs/x'}))
+        self.assertEqual(path, '/users/..%2Forgs%2Fx')
+
+    def test_missing_and_invalid_params(self):
+        """Uji error untuk parameter yang hilang atau tidak valid."""
+        with self.assertRaisesMessage(ParamError, 'ids and vs_currencies parameter required'):
+            get_endpoint('simple-price').clean({})
+        with self.assertRaisesMessage(ParamError, "The parameter 'amount' must be a number."):
+            get_endpoint('pair').clean({'from': 'USD', 'to': 'JPY', 'amount': 'abc'})
+        with self.assertRaisesMessage(ParamError, 'Invalid date format'):
+            get_endpoint('coins-history').clean({'id': 'bitcoin', 'date': '2020-01-01'})
+
+    def test_history_ttl(self):
+        """Uji bahwa tanggal yang sudah lewat mendapat TTL panjang."""
+        endpoint = get_endpoint('coins-history')
+        today = datetime.today().strftime("%d-%m-%Y")
+        self.assertEqual(endpoint.get_ttl({'date': today}), 3600)
+        self.assertGreater(endpoint.get_ttl({'date': '01-01-2024'}), 86400)
+
+    def test_auth_styles(self):
+        """Uji cara inject API key setiap service."""
+        params, headers = {}, {}
+        self.assertEqual(SERVICE_AUTH['exchangeRate'].apply('k', '/latest/USD', params, headers), '/k/latest/USD')
+        SERVICE_AUTH['openweather'].apply('k', '/weather', params, headers)
+        SERVICE_AUTH['github'].apply('k', '/users/x', params, headers)
+        self.assertEqual(params, {'appid': 'k'})
+        self.assertEqual(headers, {'Authorization': 'token k'})
+
+
+@patch('services.utils.api_client.APIRequestLog')
+@patch('requests.Session.get')
+@patch('services.utils.api_client.file_cache')
+@patch('services.utils.api_client.service_registry')
+class APIClientEndpointSpecTests(TestCase):
+    def test_uses_endpoint_ttl_and_caches_body(self, mock_registry, mock_cache, mock_session_get, mock_log):
+        """Uji bahwa TTL endpoint dipakai dan yang di-cache adalah body JSON."""
+        mock_cache.get.return_value = None
+        mock_registry.get.return_value = MagicMock(api_endpoint='http://api.example.com', api_key='k')
+        mock_session_get.return_value = MagicMock(status_code=200, json=MagicMock(return_value={'bitcoin': {'usd': 1}}))
+
+        endpoint = get_endpoint('simple-price')
+        APIClient().make_request('coingecko', '/simple/price', params={'ids': 'bitcoin', 'vs_currencies': 'usd'}, spec=endpoint)
+
+        key, data, ttl = mock_cache.set.call_args[0]
+        self.assertEqual(data, {'bitcoin': {'usd': 1}})
+        self.assertEqual(ttl, endpoint.ttl)
+        self.assertEqual(mock_session_get.call_args.kwargs['params']['x_cg_demo_api_key'], 'k')
+
+    def test_cache_key_is_stable(self, mock_registry, mock_cache, mock_session_get, mock_log):
+        """Uji bahwa cache key tidak bergantung pada hash() per process dan urutan params."""
+        client = APIClient()
+        a = client._get_cache_key('coingecko', '/search', {'query': 'btc', 'x': '1'})
+        b = client._get_cache_key('coingecko', '/search', {'x': '1', 'query': 'btc'})
+        self.assertEqual(a, b)
+        self.assertEqual(a, 'coingecko:' + hashlib.md5('/search?{"query": "btc", "x": "1"}'.encode()).hexdigest())
+
+
+class TransformTests(TestCase):
+    def test_keep_nested_paths_and_lists(self):
+        """Uji bahwa hanya path yang dideklarasikan yang dipertahankan."""
+        transform = Transform(keep=['id', 'market_data.current_price.usd', 'articles.title'])
+        data = {
+            'id': 'bitcoin',
+            'localization': {'de': 'Bitcoin', 'fr': 'Bitcoin'},
+            'market_data': {'current_price': {'usd': 1, 'eur': 2}, 'market_cap': {'usd': 3}},
+            'articles': [{'title': 'a', 'content': 'x'}, {'title': 'b', 'content': 'y'}],
+        }
+        self.assertEqual(transform(data), {
+            'id': 'bitcoin',
+            'market_data': {'current_price': {'usd': 1}},
+            'articles': [{'title': 'a'}, {'title': 'b'}],
+        })
+
+    def test_rename_and_coerce(self):
+        """Uji rename path dan konversi tipe."""
+        transform = Transform(
+            keep=['description.en', 'supply', 'items.source.name'],
+            rename={'description.en': 'description', 'items.source.name': 'items.source_name'},
+            coerce={'supply': float},
+        )
+        data = {
+            'description': {'en': 'english', 'de': 'deutsch'},
+            'supply': '21000000',
+            'items': [{'source': {'name': 'a', 'id': 1}}],
+        }
+        self.assertEqual(transform(data), {
+            'description': 'english',
+            'supply': 21000000.0,
+            'items': [{'source': {}, 'source_name': 'a'}],
+        })
+
+    def test_coerce_leaves_invalid_values(self):
+        """Uji bahwa nilai yang gagal dikonversi tidak menyebabkan error."""
+        self.assertEqual(Transform(coerce={'supply': float})({'supply': None}), {'supply': None})
+        self.assertEqual(Transform(coerce={'supply': float})({'supply': 'n/a'}), {'supply': 'n/a'})
+
+    def test_compile_paths(self):
+        """Uji bahwa parent yang diambil utuh tidak dipecah oleh path yang lebih dalam."""
+        self.assertEqual(compile_paths(['a', 'a.b', 'c.d']), {'a': None, 'c': {'d': None}})
+
+    @patch('services.utils.api_client.APIRequestLog')
+    @patch('requests.Session.get')
+    @patch('services.utils.api_client.file_cache')
+    @patch('services.utils.api_client.service_registry')
+    def test_client_caches_transformed_body(self, mock_registry, mock_cache, mock_session_get, mock_log):
+        """Uji bahwa yang di-cache adalah dokumen hasil transformasi."""
+        mock_cache.get.return_value = None
+        mock_registry.get.return_value = MagicMock(api_endpoint='http://api.example.com', api_key='k')
+        body = {'id': 'bitcoin', 'localization': {'de': 'Bitcoin'}, 'description': {'en': 'x', 'de': 'y'}}
+        mock_session_get.return_value = MagicMock(status_code=200, json=MagicMock(return_value=body))
+
+        result = APIClient().make_request('coingecko', '/coins/bitcoin', spec=get_endpoint('coin-info'))
+
+        self.assertEqual(result, {'id': 'bitcoin', 'description': 'x'})
+        self.assertEqual(mock_cache.set.call_args[0][1], {'id': 'bitcoin', 'description': 'x'})
+
+
+class FieldProjectionTests(TestCase):
+    def test_projection(self):
+        """Uji projection dengan path bertingkat."""
+        data = {'name': 'Bitcoin', 'market_data': {'current_price': {'usd': 1, 'eur': 2}, 'market_cap': {}}}
+        plan = compile_projection('market_data.current_price.usd,name')
+        self.assertEqual(project(data, plan), {'name': 'Bitcoin', 'market_data': {'current_price': {'usd': 1}}})
+
+    def test_plan_is_memoized(self):
+        """Uji bahwa plan untuk string fields yang sama hanya di-compile sekali."""
+        compile_projection.cache_clear()
+        first = compile_projection('a,b.c')
+        second = compile_projection('a,b.c')
+        self.assertIs(first, second)
+        self.assertEqual(compile_projection.cache_info().hits, 1)
+
+    def test_unknown_fields_are_ignored(self):
+        """Uji bahwa field yang tidak ada tidak menyebabkan error."""
+        self.assertEqual(project({'a': 1}, compile_projection('b,a.x,')), {'a': 1})
+
+
+class DownsampleTests(TestCase):
+    def setUp(self):
+        self.series = [[i * 1000, float((i * 37) % 101)] for i in range(1000)]
+
+    def test_lttb_keeps_endpoints_and_size(self):
+        """Uji bahwa LTTB menghasilkan jumlah titik yang diminta dan mempertahankan titik ujung."""
+        result = lttb(self.series, 100)
+        self.assertEqual(len(result), 100)
+        self.assertEqual(result[0], self.series[0])
+        self.assertEqual(result[-1], self.series[-1])
+        timestamps = [point[0] for point in result]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_minmax_keeps_extremes(self):
+        """Uji bahwa min/max bucketing mempertahankan nilai ekstrem."""
+        result = minmax(self.series, 50)
+        self.assertLessEqual(len(result), 50)
+        values = [point[1] for point in result]
+        self.assertEqual(max(values), 100.0)
+        self.assertEqual(min(values), 0.0)
+
+    def test_small_series_unchanged(self):
+        """Uji bahwa series yang lebih pendek dari target tidak diubah."""
+        self.assertEqual(downsample(self.series[:10], 50), self.series[:10])
+        self.assertEqual(downsample([], 50), [])
+
+    def test_downsample_chart(self):
+        """Uji bahwa setiap series market_chart di-downsample."""
+        chart = {'prices': self.series, 'market_caps': self.series, 'total_volumes': self.series}
+        result = downsample_chart(chart, 20, 'minmax')
+        self.assertEqual(set(result), set(chart))
+        self.assertTrue(all(len(series) <= 20 for series in result.values()))
+
+    def test_points_param_is_local(self):
+        """Uji bahwa points tidak dikirim ke upstream."""
+        endpoint = get_endpoint('coins-market-chart')
+        cleaned = endpoint.clean({'id': 'bitcoin', 'vs_currency': 'usd', 'days': '365', 'points': '200'})
+        self.assertEqual(endpoint.build(cleaned)[1], {'vs_currency': 'usd', 'days': '365'})
+        self.assertEqual(endpoint.local_values(cleaned), {'points': 200})
+        with self.assertRaises(ParamError):
+            endpoint.clean({'id': 'bitcoin', 'vs_currency': 'usd', 'days': '365', 'points': '1'})
+
+
+@patch('services.utils.api_client.APIRequestLog')
+@patch('services.utils.api_client.file_cache')
+@patch('services.utils.api_client.service_registry')
+class APIClientDerivedRequestTests(TestCase):
+    def test_variant_cached_separately(self, mock_registry, mock_cache, mock_log):
+        """Uji bahwa varian downsample di-cache dengan key sendiri."""
+        series = [[i * 1000, float(i % 13)] for i in range(100)]
+        full = {'prices': series, 'market_caps': series, 'total_volumes': series}
+        endpoint = get_endpoint('coins-market-chart')
+        client = APIClient()
+        mock_cache.get.return_value = None
+
+        with patch.object(client, 'make_request', return_value=full) as mock_make_request:
+            result = client.make_derived_request(
+                'coingecko', '/coins/bitcoin/market_chart', params={'vs_currency': 'usd', 'days': '1'},
+                spec=endpoint, variant={'points': 10}
+            )
+
+        mock_make_request.assert_called_once()
+        self.assertEqual(len(result['prices']), 10)
+        variant_key, data, _ = mock_cache.set.call_args[0]
+        self.assertEqual(data, result)
+        self.assertNotEqual(variant_key, client._get_cache_key('coingecko', '/coins/bitcoin/market_chart', {'vs_currency': 'usd', 'days': '1'}))
+
+    def test_variant_cache_hit_skips_full_series(self, mock_registry, mock_cache, mock_log):
+        """Uji bahwa varian yang sudah di-cache tidak memuat series penuh."""
+        mock_cache.get.return_value = {'prices': [[0, 1.0]]}
+        client = APIClient()
+        with patch.object(client, 'make_request') as mock_make_request:
+            result = client.make_derived_request(
+                'coingecko', '/coins/bitcoin/market_chart', params={}, spec=get_endpoint('coins-market-chart'),
+                variant={'points': 10}
+            )
+        mock_make_request.assert_not_called()
+        self.assertEqual(result, {'prices': [[0, 1.0]]})
+
+
+class TimeSeriesStoreTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TimeSeriesStore(base_dir=self.tmp.name, refresh_interval=300)
+        self.now_ms = int(time.time() * 1000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def chart(self, start_ms, count, step_ms=DAY_MS):
+        series = [[start_ms + i * step_ms, float(i)] for i in range(count)]
+        return {'prices': series, 'market_caps': series, 'total_volumes': series}
+
+    def test_chart_roundtrip(self):
+        """Uji konversi response market_chart ke baris kolom dan sebaliknya."""
+        chart = self.chart(1000, 5)
+        self.assertEqual(rows_to_chart(chart_to_rows(chart)), chart)
+
+    def test_append_only_newer_rows(self):
+        """Uji bahwa append hanya menambah baris setelah timestamp terakhir."""
+        self.store.append('bitcoin', 'usd', chart_to_rows(self.chart(0, 5)))
+        added = self.store.append('bitcoin', 'usd', chart_to_rows(self.chart(3 * DAY_MS, 4)))
+        self.assertEqual(added, 2)
+        self.assertEqual(self.store.read('bitcoin', 'usd')['ts'].tolist(), [i * DAY_MS for i in range(7)])
+
+    def test_tail_refreshes_bucketed_to_series_resolution(self):
+        """Uji bahwa ekor 5 menit yang di-append berulang kali tidak membuat series harian tumbuh tanpa batas."""
+        step = 5 * 60 * 1000
+        self.store.append('bitcoin', 'usd', chart_to_rows(self.chart(0, 10)))
+        for i in range(100):
+            self.store.append('bitcoin', 'usd', chart_to_rows(self.chart(9 * DAY_MS + i * step, 2, step_ms=step)))
+        # Bucket yang masih berjalan: titik awal bucket + titik terbaru yang terus ditimpa
+        self.assertEqual(self.store.read('bitcoin', 'usd')['ts'][-2:].tolist(), [9 * DAY_MS, 9 * DAY_MS + 100 * step])
+
+        for i in range(100, 3 * 288):
+            self.store.append('bitcoin', 'usd', chart_to_rows(self.chart(9 * DAY_MS + i * step, 2, step_ms=step)))
+        self.assertEqual(self.store.read('bitcoin', 'usd')['ts'].tolist(), [i * DAY_MS for i in range(13)])
+
+    def test_window_slices_by_timestamp(self):
+        """Uji bahwa window days diambil dengan slicing."""
+        self.store.append('bitcoin', 'usd', chart_to_rows(self.chart(0, 10)))
+        rows = self.store.window('bitcoin', 'usd', since_ms=7 * DAY_MS)
+        self.assertEqual(rows['ts'].tolist(), [7 * DAY_MS, 8 * DAY_MS, 9 * DAY_MS])
+
+    def test_cold_start_then_tail_fetch(self):
+        """Uji bahwa setelah warm-up upstream hanya diminta ekor data sejak timestamp terakhir."""
+        client = MagicMock()
+        start = self.now_ms - 365 * DAY_MS + 60000
+        client.make_request.return_value = self.chart(start, 366)
+
+        first = self.store.get_chart(client, 'bitcoin', 'usd', '365')
+        self.assertEqual(len(first['prices']), 366)
+        self.assertEqual(client.make_request.call_args[0][1], '/coins/bitcoin/market_chart')
+
+        client.log_cached.assert_not_called()
+
+        # Window lebih kecil dengan granularity harian dilayani dari store tanpa request upstream
+        client.make_request.reset_mock()
+        window = self.store.get_chart(client, 'bitcoin', 'usd', '200')
+        client.make_request.assert_not_called()
+        self.assertEqual(len(window['prices']), 201)
+        client.log_cached.assert_called_once_with('coingecko', '/coins/bitcoin/market_chart', None)
+
+        # Setelah refresh interval lewat hanya ekor data yang diambil
+        self.store._write_meta('bitcoin', 'usd', refreshed_at=0)
+        last_ts = start + 365 * DAY_MS
+        tail = self.chart(last_ts, 3, step_ms=3600 * 1000)
+        client.make_request.return_value = tail
+        self.store.get_chart(client, 'bitcoin', 'usd', '365')
+
+        args, kwargs = client.make_request.call_args
+        self.assertEqual(args[1], '/coins/bitcoin/market_chart/range')
+        self.assertEqual(kwargs['params']['from'], last_ts // 1000)
+        # Ekor per jam di-bucket harian: titik terakhir selalu ada, titik lain hanya jika membuka hari baru
+        self.assertEqual(len(self.store.read('bitcoin', 'usd')), 365 + len(bucket_rows(chart_to_rows(tail), DAY_MS)))
+        self.assertEqual(self.store.read('bitcoin', 'usd')['ts'][-1], last_ts + 2 * 3600 * 1000)
+
+    def test_upstream_error_serves_stored_rows(self):
+        """Uji bahwa kegagalan refresh tetap melayani data yang sudah tersimpan."""
+        step = 5 * 60 * 1000
+        self.store.append('bitcoin', 'usd', chart_to_rows(self.chart(self.now_ms - 3 * step, 3, step_ms=step)), '5m')
+        client = MagicMock()
+        client.make_request.return_value = {'error': 'Request timeout untuk coingecko'}
+
+        result = self.store.get_chart(client, 'bitcoin', 'usd', '1')
+        self.assertEqual(len(result['prices']), 3)
+
+    def test_daily_series_not_sliced_for_short_window(self):
+        """Uji bahwa days=1 (granularity 5 menit) tidak di-slice dari series harian hasil warm-up."""
+        client = MagicMock()
+        client.make_request.return_value = self.chart(self.now_ms - 365 * DAY_MS + 60000, 366)
+        self.store.get_chart(client, 'bitcoin', 'usd', '365')
+
+        step = 5 * 60 * 1000
+        client.make_request.return_value = self.chart(self.now_ms - 288 * step + 60000, 289, step_ms=step)
+        day = self.store.get_chart(client, 'bitcoin', 'usd', '1')
+
+        self.assertEqual(client.make_request.call_args.kwargs['params']['days'], '1')
+        self.assertEqual(len(day['prices']), 289)
+        self.assertEqual(len(self.store.read('bitcoin', 'usd', 'daily')), 366)
+
+    def test_coin_id_quoted_in_upstream_path(self):
+        """Uji bahwa coin id di-quote di path upstream seperti EndpointView.build."""
+        client = MagicMock()
+        client.make_request.return_value = self.chart(self.now_ms - 30 * DAY_MS, 31)
+        self.store.get_chart(client, 'a/b?x', 'usd', '30')
+        self.assertEqual(client.make_request.call_args[0][1], '/coins/a%2Fb%3Fx/market_chart')
+
+    def test_chart_days_validation(self):
+        """Uji bahwa days nan, inf dan negatif ditolak."""
+        spec = get_endpoint('coins-market-chart')
+        for days in ('nan', 'inf', '-1', '0', 'abc'):
+            with self.assertRaises(ParamError):
+                spec.clean({'id': 'bitcoin', 'vs_currency': 'usd', 'days': days})
+        self.assertEqual(spec.clean({'id': 'bitcoin', 'vs_currency': 'usd', 'days': 'MAX'})['days'], 'max')
+
+    def test_upstream_error_without_data(self):
+        """Uji bahwa error diteruskan jika store masih kosong."""
+        client = MagicMock()
+        client.make_request.return_value = {'error': 'Request timeout untuk coingecko'}
+        self.assertEqual(self.store.get_chart(client, 'bitcoin', 'usd', '30'), {'error': 'Request timeout untuk coingecko'})
+
+
+class CoinSearchIndexTests(TestCase):
+    COINS = [
+        {'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin'},
+        {'id': 'bitcoin-cash', 'symbol': 'bch', 'name': 'Bitcoin Cash'},
+        {'id': 'wrapped-bitcoin', 'symbol': 'wbtc', 'name': 'Wrapped Bitcoin'},
+        {'id': 'bitcore', 'symbol': 'btx', 'name': 'BitCore'},
+        {'id': 'solana', 'symbol': 'sol', 'name': 'Solana'},
+    ]
+    RANKS = {'bitcoin': 1, 'wrapped-bitcoin': 15, 'bitcoin-cash': 20, 'solana': 5}
+
+    def setUp(self):
+        self.index = CoinSearchIndex()
+        self.index.build(self.COINS, self.RANKS)
+
+    def ids(self, query):
+        return [coin['id'] for coin in self.index.search(query)]
+
+    def test_not_ready_returns_none(self):
+        """Uji bahwa index yang belum dibangun mengembalikan None."""
+        self.assertIsNone(CoinSearchIndex().search('bitcoin'))
+
+    def test_prefix_ranked_by_market_cap(self):
+        """Uji bahwa prefix match diurutkan berdasarkan market cap rank."""
+        self.assertEqual(self.ids('bitc'), ['bitcoin', 'bitcoin-cash', 'bitcore', 'wrapped-bitcoin'])
+
+    def test_exact_match_first(self):
+        """Uji bahwa exact match (id, symbol atau nama) selalu di atas."""
+        self.assertEqual(self.ids('bitcore')[0], 'bitcore')
+        self.assertEqual(self.ids('SOL'), ['solana'])
+
+    def test_substring_match(self):
+        """Uji bahwa substring di tengah nama ditemukan lewat index trigram."""
+        self.assertEqual(self.ids('coin cash'), ['bitcoin-cash'])
+        self.assertEqual(self.ids('lana'), ['solana'])
+
+    def test_short_prefix(self):
+        """Uji bahwa prefix pendek memakai hasil yang sudah dihitung."""
+        self.assertEqual(self.ids('b')[:2], ['bitcoin', 'bitcoin-cash'])
+        self.assertEqual(self.ids('zz'), [])
+
+    def test_refresh_builds_from_coin_list(self):
+        """Uji refresh dari /coins/list dan /coins/markets."""
+        client = MagicMock()
+        client.make_request.side_effect = [
+            self.COINS,
+            [{'id': 'solana', 'market_cap_rank': 5}],
+            {'error': 'Rate limit'},
+        ]
+        index = CoinSearchIndex(rank_pages=3)
+        self.assertTrue(index.refresh(client))
+        self.assertEqual(index.search('sol')[0]['market_cap_rank'], 5)
+        self.assertEqual(client.make_request.call_count, 3)
+
+    def test_refresh_error_keeps_old_index(self):
+        """Uji bahwa refresh yang gagal tidak menghapus index lama."""
+        client = MagicMock()
+        client.make_request.return_value = {'error': 'Request timeout untuk coingecko'}
+        self.assertFalse(self.index.refresh(client))
+        self.assertEqual(self.ids('solana'), ['solana'])
+
+
+class CoinSearchRefreshBackoffTests(TestCase):
+    def test_failed_refresh_not_retried_every_request(self):
+        """Uji bahwa refresh_async yang gagal baru dicoba lagi setelah retry_interval."""
+        index = CoinSearchIndex(retry_interval=60)
+        with patch.object(index, 'refresh', return_value=False) as refresh, \
+                patch('services.utils.search_index.time.monotonic', return_value=1000.0) as monotonic:
+            self.assertTrue(index.refresh_async())
+            for thread in threading.enumerate():
+                if thread.name == 'coin-search-index':
+                    thread.join()
+            self.assertFalse(index.refresh_async())
+
+            monotonic.return_value = 1061.0
+            self.assertTrue(index.refresh_async())
+            for thread in threading.enumerate():
+                if thread.name == 'coin-search-index':
+                    thread.join()
+        self.assertEqual(refresh.call_count, 2)
+        self.assertTrue(index.stale)
+
+
+class WeatherBatchTests(TestCase):
+    def setUp(self):
+        self.spec = get_endpoint('unified-weather')
+        self.client = MagicMock()
+        self.client.get_cached_many.side_effect = lambda service, requests: [None] * len(requests)
+
+    def test_geo_bucket(self):
+        """Uji pembulatan koordinat ke grid."""
+        self.assertEqual(geo_bucket(51.5074, -0.1278), {'lat': 51.51, 'lon': -0.13})
+        self.assertEqual(geo_bucket(51.5112, -0.1349), {'lat': 51.51, 'lon': -0.13})
+
+    @override_settings(WEATHER_GEO_GRID=0.1)
+    def test_geo_bucket_grid_setting(self):
+        """Uji ukuran grid dari settings."""
+        self.assertEqual(geo_bucket(51.5074, -0.1278), {'lat': 51.5, 'lon': -0.1})
+
+    def test_locations_deduplicated(self):
+        """Uji bahwa koordinat di grid cell yang sama digabung."""
+        locations = weather_batch_locations({'ids': ['1'], 'cities': None, 'coords': [(51.5074, -0.1278), (51.5101, -0.1301)]})
+        self.assertEqual([label for label, _ in locations], ['1', '51.51,-0.13'])
+
+    def test_too_many_locations(self):
+        """Uji batas jumlah lokasi per request."""
+        with self.assertRaises(ParamError):
+            weather_batch_locations({'ids': [str(i) for i in range(101)]})
+
+    def test_ids_chunked_by_group_size(self):
+        """Uji bahwa id dipecah per 20 untuk /group."""
+        self.client.make_request.side_effect = lambda service, path, params, **kwargs: {
+            'list': [{'id': int(city_id), 'name': city_id} for city_id in params['id'].split(',')]
+        }
+        locations = [(str(i), {'id': str(i)}) for i in range(1, 46)]
+
+        result = WeatherBatch(self.client, self.spec).fetch(locations)
+
+        self.assertEqual(self.client.make_request.call_count, 3)
+        self.assertEqual(result['cnt'], 45)
+        self.assertEqual(result['list'][0]['name'], '1')
+        self.assertEqual(self.client.set_cached.call_count, 45)
+        _, path, params, _, ttl = self.client.set_cached.call_args[0]
+        self.assertEqual((path, params, ttl), ('/weather', {'id': '45', 'units': 'metric'}, 600))
+
+    def test_group_error_reported_per_id(self):
+        """Uji bahwa error /group dilaporkan untuk setiap id di chunk."""
+        self.client.make_request.return_value = {'error': 'Request timeout untuk openweather'}
+        result = WeatherBatch(self.client, self.spec).fetch([('1', {'id': '1'}), ('2', {'id': '2'})])
+        self.assertEqual(result['list'], [])
+        self.assertEqual(result['errors'], {'1': 'Request timeout untuk openweather', '2': 'Request timeout untuk openweather'})
+
+    def test_names_fetched_individually(self):
+        """Uji bahwa nama kota di-request lewat endpoint /weather dengan spec yang sama."""
+        self.client.make_request.side_effect = lambda service, path, params, **kwargs: {'name': params['q']}
+        result = WeatherBatch(self.client, self.spec).fetch([('london,uk', {'q': 'london,uk'}), ('paris,fr', {'q': 'paris,fr'})])
+        self.assertEqual(result['list'], [{'name': 'london,uk'}, {'name': 'paris,fr'}])
+        self.assertIs(self.client.make_request.call_args.kwargs['spec'], self.spec)
+
+    def test_cached_not_found_reported_as_error(self):
+        """Uji bahwa negative cache 404 masuk errors, bukan list, tanpa request upstream."""
+        self.client.get_cached_many.side_effect = lambda service, requests: [
+            {'error': 'city not found', 'status': 404}, {'name': 'Paris'}
+        ]
+        result = WeatherBatch(self.client, self.spec).fetch([('atlantis', {'q': 'atlantis'}), ('paris,fr', {'q': 'paris,fr'})])
+        self.assertEqual(result['list'], [{'name': 'Paris'}])
+        self.assertEqual(result['errors'], {'atlantis': 'city not found'})
+        self.client.make_request.assert_not_called()
+
+
+class GitHubUserBatchTests(TestCase):
+    NODE = {
+        '__typename': 'User', 'login': 'torvalds', 'databaseId': 1024025, 'avatarUrl': 'a', 'url': 'u',
+        'name': 'Linus Torvalds', 'company': 'Linux Foundation', 'websiteUrl': None, 'location': 'Portland',
+        'email': '', 'bio': None, 'twitterUsername': None, 'createdAt': '2011-09-03T15:26:22Z',
+        'updatedAt': '2024-01-01T00:00:00Z', 'repositories': {'totalCount': 8}, 'gists': {'totalCount': 0},
+        'followers': {'totalCount': 200000}, 'following': {'totalCount': 0},
+    }
+
+    def setUp(self):
+        self.spec = get_endpoint('github-user')
+        self.client = MagicMock()
+        self.client.get_cached_many.side_effect = lambda service, requests: [None] * len(requests)
+
+    def test_query_uses_aliases_and_variables(self):
+        """Uji bahwa username dikirim sebagai variable GraphQL, bukan diinterpolasi."""
+        payload = build_query(['torvalds', 'gvanrossum'])
+        self.assertIn('u1: repositoryOwner(login: $l1)', payload['query'])
+        self.assertEqual(payload['variables'], {'l0': 'torvalds', 'l1': 'gvanrossum'})
+
+    def test_rest_shape(self):
+        """Uji konversi node GraphQL ke bentuk response REST."""
+        user = to_rest_user(self.NODE)
+        self.assertEqual(user['id'], 1024025)
+        self.assertEqual(user['public_repos'], 8)
+        self.assertEqual(user['followers'], 200000)
+        self.assertIsNone(user['email'])
+        self.assertEqual(user['blog'], '')
+
+    def test_misses_resolved_in_chunks_and_cached_per_user(self):
+        """Uji bahwa miss di-resolve per chunk dan ditulis ke cache key single-user."""
+        self.client.get_cached_many.side_effect = lambda service, requests: [
+            {'login': 'cached'} if path == '/users/cached' else None for path, params in requests
+        ]
+        self.client.make_request.side_effect = lambda service, path, **kwargs: {
+            'data': {alias: dict(self.NODE, login=login) for alias, login in
+                     ((f"u{key[1:]}", value) for key, value in kwargs['json_body']['variables'].items())}
+        }
+        logins = ['cached'] + [f'user{i}' for i in range(5)]
+
+        result = GitHubUserBatch(self.client, self.spec, chunk_size=2).fetch(logins)
+
+        self.assertEqual([user['login'] for user in result['users']], logins)
+        self.assertEqual(self.client.make_request.call_count, 3)
+        self.assertEqual(self.client.make_request.call_args[0][1], '/graphql')
+        service, path, params, document, ttl = self.client.set_cached.call_args[0]
+        self.assertEqual((service, path, params, ttl), ('github', '/users/user4', {}, 1800))
+        self.assertEqual(document['login'], 'user4')
+
+    def test_unknown_user_reported(self):
+        """Uji bahwa user yang tidak ada dilaporkan di errors."""
+        self.client.make_request.return_value = {'data': {'u0': self.NODE, 'u1': None}, 'errors': [{'type': 'NOT_FOUND'}]}
+        result = GitHubUserBatch(self.client, self.spec).fetch(['torvalds', 'no-such-user'])
+        self.assertEqual(len(result['users']), 1)
+        self.assertEqual(result['errors'], {'no-such-user': 'Not Found'})
+
+    def test_rest_fallback_without_token(self):
+        """Uji fallback REST per user jika GraphQL tidak tersedia."""
+        self.client.make_request.side_effect = [{'login': 'torvalds'}, {'error': 'API request failed: Client Error'}]
+        result = GitHubUserBatch(self.client, self.spec).fetch(['torvalds', 'ghost'], graphql=False)
+        self.assertEqual(result['users'], [{'login': 'torvalds'}])
+        self.assertEqual(result['errors'], {'ghost': 'API request failed: Client Error'})
+        self.assertEqual(self.client.make_request.call_args_list[0][0][1], '/users/torvalds')
+
+    def test_cached_not_found_reported_as_error(self):
+        """Uji bahwa user dengan negative cache 404 dilaporkan di errors."""
+        self.client.get_cached_many.side_effect = lambda service, requests: [
+            {'login': 'torvalds'}, {'error': 'Not Found', 'status': 404}
+        ]
+        result = GitHubUserBatch(self.client, self.spec).fetch(['torvalds', 'ghost'])
+        self.assertEqual(result['users'], [{'login': 'torvalds'}])
+        self.assertEqual(result['errors'], {'ghost': 'Not Found'})
+        self.client.make_request.assert_not_called()
+
+
+class PriceBatcherTests(TestCase):
+    PRICES = {
+        'bitcoin': {'usd': 50000, 'eur': 46000},
+        'ethereum': {'usd': 3000, 'eur': 2800},
+        'solana': {'usd': 150, 'eur': 140},
+    }
+
+    def test_split_prices(self):
+        """Uji pemecahan response gabungan untuk satu request."""
+        self.assertEqual(split_prices(self.PRICES, ['bitcoin', 'dogecoin'], {'eur'}), {'bitcoin': {'eur': 46000}})
+
+    def test_concurrent_requests_share_one_upstream_call(self):
+        """Uji bahwa request bersamaan dalam window digabung menjadi satu request upstream."""
+        client = MagicMock()
+        release = threading.Event()
+        first_call = threading.Event()
+
+        def make_request(*args, **kwargs):
+            if not first_call.is_set():
+                first_call.set()
+                release.wait(5)
+                return {'dogecoin': {'usd': 1}}
+            return self.PRICES
+
+        client.make_request.side_effect = make_request
+        batcher = PriceBatcher(window_ms=200)
+        # Request pertama masih berjalan, jadi request berikutnya menunggu window untuk digabung
+        blocker = threading.Thread(target=batcher.get, args=(client, ['dogecoin'], ['usd']))
+        blocker.start()
+        first_call.wait(5)
+
+        requests_ = [(['bitcoin'], ['usd']), (['ethereum'], ['eur']), (['bitcoin', 'solana'], ['usd', 'eur'])]
+        results = [None] * len(requests_)
+        start = threading.Barrier(len(requests_))
+
+        def run(i, ids, vs):
+            start.wait()
+            results[i] = batcher.get(client, ids, vs)
+
+        threads = [threading.Thread(target=run, args=(i, ids, vs)) for i, (ids, vs) in enumerate(requests_)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        release.set()
+        blocker.join()
+
+        self.assertEqual(client.make_request.call_count, 2)
+        self.assertEqual(client.make_request.call_args.kwargs['params'], {
+            'ids': 'bitcoin,ethereum,solana', 'vs_currencies': 'eur,usd'
+        })
+        self.assertEqual(results[0], {'bitcoin': {'usd': 50000}})
+        self.assertEqual(results[1], {'ethereum': {'eur': 2800}})
+        self.assertEqual(results[2], {'bitcoin': {'usd': 50000, 'eur': 46000}, 'solana': {'usd': 150, 'eur': 140}})
+
+    def test_error_shared_by_waiters(self):
+        """Uji bahwa error upstream diteruskan ke request di batch."""
+        client = MagicMock()
+        client.make_request.return_value = {'error': 'coingecko returned HTTP 503', 'status': 502}
+        self.assertEqual(PriceBatcher(window_ms=1).get(client, ['bitcoin'], ['usd'])['status'], 502)
+
+    def test_lone_request_not_delayed(self):
+        """Uji bahwa request tanpa request lain yang berjalan tidak menunggu window."""
+        client = MagicMock()
+        client.make_request.return_value = {'bitcoin': {'usd': 1}}
+        started = time.monotonic()
+        self.assertEqual(PriceBatcher(window_ms=500).get(client, ['bitcoin'], ['usd']), {'bitcoin': {'usd': 1}})
+        self.assertLess(time.monotonic() - started, 0.25)
+
+    def test_zero_window_disables_batching(self):
+        """Uji bahwa window 0 langsung meneruskan request."""
+        client = MagicMock()
+        client.make_request.return_value = {'bitcoin': {'usd': 1}}
+        self.assertEqual(PriceBatcher(window_ms=0).get(client, ['bitcoin'], ['usd']), {'bitcoin': {'usd': 1}})
+        client.make_request.assert_called_once()
+
+
+@patch('services.utils.price_stream.threading.Thread')
+class PriceStreamHubTests(TestCase):
+    def setUp(self):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.hub = PriceStreamHub(interval=60)
+        self.client = MagicMock()
+
+    def drain(self, subscription):
+        import asyncio
+        self.loop.run_until_complete(asyncio.sleep(0))
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+
+    def test_single_union_poll(self, mock_thread):
+        """Uji bahwa satu poll mengambil gabungan ids semua subscriber."""
+        self.hub.subscribe(['bitcoin'], ['usd'], loop=self.loop)
+        self.hub.subscribe(['ethereum', 'bitcoin'], ['eur'], loop=self.loop)
+        self.client.make_request.return_value = {}
+
+        self.hub.poll_once(self.client)
+
+        self.client.make_request.assert_called_once()
+        self.assertEqual(self.client.make_request.call_args.kwargs['params'], {'ids': 'bitcoin,ethereum', 'vs_currencies': 'eur,usd'})
+        mock_thread.return_value.start.assert_called_once()
+
+    def test_only_changed_values_delivered(self, mock_thread):
+        """Uji bahwa subscriber hanya menerima nilai yang berubah dan yang di-subscribe."""
+        btc = self.hub.subscribe(['bitcoin'], ['usd'], loop=self.loop)
+        eth = self.hub.subscribe(['ethereum'], ['usd'], loop=self.loop)
+
+        self.client.make_request.return_value = {'bitcoin': {'usd': 100}, 'ethereum': {'usd': 10}}
+        self.hub.poll_once(self.client)
+        self.assertEqual(self.drain(btc), [{'bitcoin': {'usd': 100}}])
+        self.assertEqual(self.drain(eth), [{'ethereum': {'usd': 10}}])
+
+        self.client.make_request.return_value = {'bitcoin': {'usd': 101}, 'ethereum': {'usd': 10}}
+        self.assertEqual(self.hub.poll_once(self.client), 1)
+        self.assertEqual(self.drain(btc), [{'bitcoin': {'usd': 101}}])
+        self.assertEqual(self.drain(eth), [])
+
+    def test_late_subscriber_gets_snapshot(self, mock_thread):
+        """Uji bahwa subscriber baru langsung menerima nilai terakhir."""
+        self.hub.subscribe(['bitcoin'], ['usd', 'eur'], loop=self.loop)
+        self.client.make_request.return_value = {'bitcoin': {'usd': 100, 'eur': 90}}
+        self.hub.poll_once(self.client)
+
+        late = self.hub.subscribe(['bitcoin'], ['eur'], loop=self.loop)
+        self.assertEqual(self.drain(late), [{'bitcoin': {'eur': 90}}])
+
+    def test_unsubscribe_stops_polling_ids(self, mock_thread):
+        """Uji bahwa ids dari subscriber yang sudah pergi tidak di-poll lagi."""
+        subscription = self.hub.subscribe(['bitcoin'], ['usd'], loop=self.loop)
+        self.hub.unsubscribe(subscription)
+        self.assertEqual(self.hub.poll_once(self.client), 0)
+        self.client.make_request.assert_not_called()
+
+
+class AdaptiveLimiterTests(TestCase):
+    def test_queue_full_sheds_immediately(self):
+        """Uji bahwa request ditolak langsung jika antrian penuh."""
+        limiter = AdaptiveLimiter('svc', initial_limit=1, queue_size=0)
+        limiter.acquire()
+        with self.assertRaises(Overloaded) as ctx:
+            limiter.acquire()
+        self.assertEqual(ctx.exception.retry_after, 5)
+        self.assertEqual(limiter.shed, 1)
+
+    def test_queue_deadline(self):
+        """Uji bahwa request di antrian ditolak setelah deadline."""
+        limiter = AdaptiveLimiter('svc', initial_limit=1, queue_size=5, queue_timeout=0.05)
+        limiter.acquire()
+        started = time.monotonic()
+        with self.assertRaises(Overloaded):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(limiter.waiting, 0)
+
+    def test_waiter_gets_released_slot(self):
+        """Uji bahwa request di antrian mendapat slot yang dilepas."""
+        import threading
+        limiter = AdaptiveLimiter('svc', initial_limit=1, queue_size=5, queue_timeout=5)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def wait_for_slot():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=wait_for_slot)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(acquired.is_set())
+        limiter.release(10)
+        thread.join(1)
+        self.assertTrue(acquired.is_set())
+        self.assertEqual(limiter.in_flight, 1)
+
+    def test_aimd(self):
+        """Uji bahwa limit naik saat sehat dan turun saat lambat atau gagal."""
+        limiter = AdaptiveLimiter('svc', initial_limit=4, min_limit=1, max_limit=5)
+        for _ in range(8):
+            limiter.acquire()
+            limiter.release(100)
+        self.assertGreater(limiter.limit, 5 - 0.01)
+        self.assertLessEqual(limiter.limit, 5)
+
+        limiter.acquire()
+        limiter.release(1000)
+        self.assertAlmostEqual(limiter.limit, 5 * 0.75)
+
+        limiter.acquire()
+        limiter.release(100, ok=False)
+        self.assertAlmostEqual(limiter.limit, 5 * 0.75 * 0.75)
+
+
+@patch('services.utils.api_client.APIRequestLog')
+@patch('services.utils.api_client.file_cache')
+@patch('services.utils.api_client.service_registry')
+@patch('services.utils.api_client.admission_control')
+class APIClientAdmissionTests(TestCase):
+    def test_cache_hit_skips_admission(self, mock_admission, mock_registry, mock_cache, mock_log):
+        """Uji bahwa cache hit tidak pernah antri di admission control."""
+        mock_cache.get.return_value = {'cached': True}
+        self.assertEqual(APIClient().make_request('coingecko', '/ping'), {'cached': True})
+        mock_admission.acquire.assert_not_called()
+
+    def test_shed_serves_stale(self, mock_admission, mock_registry, mock_cache, mock_log):
+        """Uji bahwa request yang ditolak dilayani data stale jika ada."""
+        mock_cache.get.return_value = None
+        mock_cache.get_stale.return_value = {'stale': True}
+        mock_admission.acquire.side_effect = Overloaded('coingecko', 5)
+        self.assertEqual(APIClient().make_request('coingecko', '/ping'), {'stale': True})
+
+    def test_shed_without_stale(self, mock_admission, mock_registry, mock_cache, mock_log):
+        """Uji bahwa request yang ditolak tanpa data stale menjadi 503 dengan Retry-After."""
+        mock_cache.get.return_value = None
+        mock_cache.get_stale.return_value = None
+        mock_admission.acquire.side_effect = Overloaded('coingecko', 7)
+        result = APIClient().make_request('coingecko', '/ping')
+        self.assertEqual(result, {'error': 'coingecko is overloaded, try again later', 'status': 503, 'retry_after': 7})
+
+    @patch('requests.Session.get')
+    def test_slot_released_with_outcome(self, mock_session_get, mock_admission, mock_registry, mock_cache, mock_log):
+        """Uji bahwa slot dilepas dengan hasil request upstream."""
+        mock_cache.get.return_value = None
+        mock_registry.get.return_value = MagicMock(id=1, api_endpoint='http://api.example.com', api_key='k')
+        mock_session_get.return_value = MagicMock(status_code=200, json=MagicMock(return_value={}))
+
+        APIClient().make_request('coingecko', '/ping')
+
+        limiter = mock_admission.acquire.return_value
+        latency_ms, ok = limiter.release.call_args[0]
+        self.assertTrue(ok)
+        self.assertGreaterEqual(latency_ms, 0)
+
+
+class LatencyTrackerTests(TestCase):
+    def test_percentiles_over_rolling_window(self):
+        """Uji percentile dari sampel terakhir saja."""
+        tracker = LatencyTracker(window=100)
+        for latency in range(1000):
+            tracker.record(latency)
+        self.assertEqual(len(tracker), 100)
+        self.assertAlmostEqual(tracker.percentile(50), 949.5)
+
+    @override_settings(UPSTREAM_LATENCY={'default': {'min_samples': 5, 'min_timeout': 1.0, 'max_timeout': 15.0}})
+    def test_adaptive_timeout(self):
+        """Uji timeout adaptif dari p99 dengan batas min/max."""
+        registry = LatencyRegistry()
+        self.assertEqual(registry.timeout_for('svc', default=15), 15)
+        for _ in range(10):
+            registry.record('svc', 1000)
+        self.assertAlmostEqual(registry.timeout_for('svc'), 3.0)
+
+        for _ in range(10):
+            registry.record('fast', 10)
+        self.assertEqual(registry.timeout_for('fast'), 1.0)
+
+    @override_settings(UPSTREAM_LATENCY={'default': {'min_samples': 5}, 'svc': {'hedge': True}})
+    def test_hedge_delay_only_when_enabled(self):
+        """Uji bahwa hedging hanya untuk service yang mengaktifkannya."""
+        registry = LatencyRegistry()
+        for latency in range(1, 101):
+            registry.record('svc', latency)
+            registry.record('other', latency)
+        self.assertAlmostEqual(registry.hedge_delay('svc'), 0.09505)
+        self.assertIsNone(registry.hedge_delay('other'))
+
+    def test_hedge_budget(self):
+        """Uji bahwa hedge budget membatasi hedging ke rasio request."""
+        budget = HedgeBudget(ratio=0.1)
+        allowed = 0
+        for _ in range(100):
+            budget.deposit()
+            allowed += budget.try_spend()
+        self.assertIn(allowed, (9, 10))
+
+
+@patch('services.utils.api_client.upstream_latency')
+@patch('requests.Session.get')
+class APIClientHedgingTests(TestCase):
+    def test_hedge_wins_when_primary_slow(self, mock_session_get, mock_latency):
+        """Uji bahwa hedge dikirim setelah p95 dan response tercepat dipakai."""
+        import threading
+        release = threading.Event()
+        fast = MagicMock(status_code=200, name='fast')
+        slow = MagicMock(status_code=200, name='slow')
+        calls = []
+
+        def get(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                release.wait(2)
+                return slow
+            return fast
+
+        mock_session_get.side_effect = get
+        mock_latency.hedge_delay.return_value = 0.01
+        mock_latency.budget.return_value = HedgeBudget(ratio=1)
+
+        response = APIClient()._send('http://api.example.com/x', timeout=5, service_name='coingecko')
+        release.set()
+
+        self.assertIs(response, fast)
+        self.assertEqual(len(calls), 2)
+
+    def test_no_hedge_without_budget(self, mock_session_get, mock_latency):
+        """Uji bahwa tanpa budget hanya attempt pertama yang dikirim."""
+        mock_session_get.side_effect = lambda url, **kwargs: time.sleep(0.05) or MagicMock(status_code=200)
+        mock_latency.hedge_delay.return_value = 0.01
+        mock_latency.budget.return_value = HedgeBudget(ratio=0)
+
+        APIClient()._send('http://api.example.com/x', timeout=5, service_name='coingecko')
+        mock_session_get.assert_called_once()
+
+    def test_fast_response_not_hedged(self, mock_session_get, mock_latency):
+        """Uji bahwa response sebelum p95 tidak memicu hedge."""
+        mock_session_get.return_value = MagicMock(status_code=200)
+        mock_latency.hedge_delay.return_value = 1
+        mock_latency.budget.return_value = HedgeBudget(ratio=1)
+
+        APIClient()._send('http://api.example.com/x', timeout=5, service_name='coingecko')
+        mock_session_get.assert_called_once()
+        self.assertEqual(mock_latency.budget.return_value.spent, 0)
+
+    @override_settings(ADMISSION_CONTROL={'default': {'max_limit': 50}})
+    def test_pool_sized_from_admission_limit(self, mock_session_get, mock_latency):
+        """Uji bahwa pool hedging per service muat primary + hedge untuk setiap slot admission."""
+        with patch('services.utils.api_client._hedge_pools', {}), \
+                patch('services.utils.api_client.admission_control', AdmissionControl()):
+            pool = _hedge_pool('coingecko')
+            self.assertIs(_hedge_pool('coingecko'), pool)
+            self.assertEqual(pool._max_workers, 100)
+            pool.shutdown()
+
+
+class CircuitBreakerTests(TestCase):
+    def test_opens_after_threshold_and_half_opens(self):
+        """Uji bahwa circuit terbuka setelah N kegagalan dan hanya satu percobaan saat half-open."""
+        breaker = CircuitBreaker('fx', failure_threshold=2, cooldown=30)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+
+        breaker.opened_at -= 31
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_failed_trial_reopens(self):
+        """Uji bahwa percobaan half-open yang gagal membuka circuit lagi."""
+        breaker = CircuitBreaker('fx', failure_threshold=1, cooldown=30)
+        breaker.record_failure()
+        breaker.opened_at -= 31
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+
+@patch('services.providers.upstream_latency')
+@patch('services.providers.circuit_breakers')
+@patch('services.providers.service_registry')
+class ProviderRouterTests(TestCase):
+    def setUp(self):
+        self.router = ProviderRouter({'a': ExchangeRateAPIAdapter(), 'b': ExchangeRateAPIAdapter()})
+        self.services = [
+            ServiceConfig(1, 'a', 'http://a', 'k', 100, capability='fx', priority=0),
+            ServiceConfig(2, 'b', 'http://b', 'k', 100, capability='fx', priority=0),
+        ]
+
+    def latency(self, mock_latency, p50):
+        mock_latency.tracker.side_effect = lambda name: MagicMock(percentile=MagicMock(return_value=p50[name]))
+
+    def test_faster_provider_first(self, mock_registry, mock_breakers, mock_latency):
+        """Uji bahwa provider dengan p50 lebih kecil dicoba lebih dulu pada priority yang sama."""
+        mock_registry.by_capability.return_value = self.services
+        mock_breakers.get.return_value = CircuitBreaker('x')
+        self.latency(mock_latency, {'a': 300.0, 'b': 80.0})
+
+        ranked = self.router.candidates('fx', 'latest', {'currency': 'USD'})
+        self.assertEqual([service.name for service in ranked], ['b', 'a'])
+
+    def test_open_circuit_and_exhausted_quota_last(self, mock_registry, mock_breakers, mock_latency):
+        """Uji bahwa provider dengan circuit terbuka atau kuota habis diurutkan paling belakang."""
+        self.services[1].rate_limit_per_hour = 1
+        mock_registry.by_capability.return_value = self.services
+        mock_breakers.get.return_value = CircuitBreaker('x')
+        self.latency(mock_latency, {'a': 300.0, 'b': 80.0})
+
+        self.router._record_call('b')
+        ranked = self.router.candidates('fx', 'latest', {'currency': 'USD'})
+        self.assertEqual([service.name for service in ranked], ['a', 'b'])
+
+    def test_no_providers_configured(self, mock_registry, mock_breakers, mock_latency):
+        """Uji bahwa router mengembalikan None jika capability tidak punya provider."""
+        mock_registry.by_capability.return_value = []
+        self.assertIsNone(self.router.call(MagicMock(), 'fx', 'latest', {'currency': 'USD'}))
+
+    def test_definitive_error_tries_next_provider(self, mock_registry, mock_breakers, mock_latency):
+        """Uji bahwa 404 dari satu provider tidak membuka circuit dan provider berikutnya dicoba."""
+        mock_registry.by_capability.return_value = self.services
+        mock_breakers.get.return_value = CircuitBreaker('x')
+        self.latency(mock_latency, {'a': 10.0, 'b': 20.0})
+        client = MagicMock()
+        client.get_cached.return_value = None
+        client.make_request.side_effect = [{'error': 'unsupported-code', 'status': 404}, {'result': 'success'}]
+
+        result = self.router.call(client, 'fx', 'latest', {'currency': 'XYZ'})
+
+        self.assertEqual(result, {'result': 'success'})
+        self.assertEqual(mock_breakers.get.return_value.failures, 0)
+
+
+class CoinCapAdapterTests(TestCase):
+    def test_normalize_to_simple_price(self):
+        """Uji bahwa response CoinCap dinormalisasi ke format /simple/price dan hanya untuk usd."""
+        adapter = CoinCapAdapter()
+        data = {'data': [{'id': 'bitcoin', 'priceUsd': '42000.5'}, {'id': 'binance-coin', 'priceUsd': '300'}]}
+        params = {'ids': 'binancecoin,bitcoin', 'vs_currencies': 'usd'}
+
+        self.assertEqual(adapter.request('simple_price', params), ('/v2/assets', {'ids': 'binance-coin,bitcoin'}))
+        self.assertEqual(adapter.normalize('simple_price', data, params),
+                         {'binancecoin': {'usd': 300.0}, 'bitcoin': {'usd': 42000.5}})
+        self.assertTrue(adapter.supports('simple_price', {'ids': 'bitcoin', 'vs_currencies': 'usd'}))
+        self.assertFalse(adapter.supports('simple_price', {'ids': 'bitcoin', 'vs_currencies': 'eur,usd'}))
+
+    def test_unknown_ids_reported(self):
+        """Uji bahwa coin tanpa harga di CoinCap dilaporkan sebagai error, bukan dibuang."""
+        data = {'data': [{'id': 'bitcoin', 'priceUsd': '42000.5'}, {'id': 'ethereum', 'priceUsd': None}]}
+        result = CoinCapAdapter().normalize('simple_price', data, {'ids': 'bitcoin,ethereum', 'vs_currencies': 'usd'})
+        self.assertEqual(result, {'error': 'No CoinCap price for: ethereum', 'status': 404})
+
+
+class SharedMemoryCacheTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+        self.segment = os.path.join(tmp.name, 'segment.cache')
+
+    def shared(self, **kwargs):
+        options = {'slots': 16, 'ways': 4, 'slot_size': 256, 'bloom_bytes': 1024, **kwargs}
+        return SharedMemoryCache(self.segment, self.cache_dir, **options)
+
+    def digest(self, key):
+        return hashlib.md5(key.encode()).digest()
+
+    def test_put_get_and_expiry(self):
+        """Uji bahwa entry bisa dibaca sampai expired dan payload terlalu besar ditolak."""
+        shared = self.shared()
+        self.assertTrue(shared.put(self.digest('a'), b'{"v": 1}', time.time() + 60))
+        self.assertEqual(shared.get(self.digest('a')), b'{"v": 1}')
+
+        self.assertTrue(shared.put(self.digest('b'), b'1', time.time() + 0.05))
+        time.sleep(0.06)
+        self.assertIsNone(shared.get(self.digest('b')))
+
+        self.assertFalse(shared.put(self.digest('c'), b'x' * 512, time.time() + 60))
+        self.assertIsNone(shared.get(self.digest('c')))
+
+    def test_full_set_evicts_earliest_expiry(self):
+        """Uji bahwa set yang penuh mengganti entry yang paling cepat expired."""
+        shared = self.shared(slots=2, ways=2)
+        now = time.time()
+        shared.put(self.digest('long'), b'1', now + 600)
+        shared.put(self.digest('short'), b'2', now + 60)
+        shared.put(self.digest('new'), b'3', now + 300)
+
+        self.assertEqual(shared.get(self.digest('long')), b'1')
+        self.assertIsNone(shared.get(self.digest('short')))
+        self.assertEqual(shared.get(self.digest('new')), b'3')
+
+    def test_visible_across_processes(self):
+        """Uji bahwa entry yang ditulis process lain langsung terbaca."""
+        shared = self.shared()
+        shared.get(self.digest('warm'))
+        pid = os.fork()
+        if pid == 0:
+            shared.put(self.digest('child'), b'"from child"', time.time() + 60)
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(shared.get(self.digest('child')), b'"from child"')
+
+    def test_filter_skips_disk_for_unknown_keys(self):
+        """Uji bahwa miss yang tidak ada di bloom filter tidak membuka file."""
+        with open(os.path.join(self.cache_dir, self.digest('on_disk').hex() + '.json'), 'w') as f:
+            json.dump({'data': {'v': 1}, 'expires': time.time() + 60}, f)
+
+        cache = FileCache(shared=self.shared())
+        cache.cache_dir = self.cache_dir
+
+        with patch('services.utils.cache_service.os.path.exists') as mock_exists:
+            self.assertIsNone(cache.get('missing'))
+            mock_exists.assert_not_called()
+        self.assertEqual(cache.shared.filtered, 1)
+
+        # File yang sudah ada saat attach masuk bloom, lalu dipromosikan ke shared memory
+        self.assertEqual(cache.get('on_disk'), {'v': 1})
+        self.assertEqual(cache.shared.get(self.digest('on_disk')), b'{"v": 1}')
+
+    def test_file_cache_write_through_and_delete(self):
+        """Uji bahwa set menulis ke shared memory dan delete menghapusnya."""
+        cache = FileCache(shared=self.shared())
+        cache.cache_dir = self.cache_dir
+        cache.set('key', {'v': 2}, timeout=60)
+
+        os.remove(cache._get_file_path('key'))
+        self.assertEqual(cache.get('key'), {'v': 2})
+
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+
+    def test_rebuild_during_set_keeps_key_in_filter(self):
+        """Uji bahwa rebuild_filter di antara add dan penulisan file tidak menyembunyikan entry."""
+        shared = self.shared()
+        cache = FileCache(shared=shared)
+        cache.cache_dir = self.cache_dir
+        add = shared.add
+        calls = []
+
+        def add_then_rebuild(digest):
+            add(digest)
+            calls.append(digest)
+            if len(calls) == 1:
+                shared.rebuild_filter()
+
+        with patch.object(shared, 'add', side_effect=add_then_rebuild):
+            cache.set('key', {'v': 1}, timeout=60)
+
+        self.assertTrue(shared.might_contain(self.digest('key')))
+
+
+class FakeRedis:
+    """Subset command Redis di memory untuk FakeRedisServer"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def _get(self, key):
+        entry = self.data.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            self.data.pop(key, None)
+            return None
+        return entry[0]
+
+    def execute(self, name, *args):
+        name = name.decode().upper()
+        with self.lock:
+            if name in ('PING', 'AUTH', 'SELECT'):
+                return 'OK'
+            if name == 'GET':
+                return self._get(args[0])
+            if name == 'MGET':
+                return [self._get(key) for key in args]
+            if name == 'EXISTS':
+                return sum(self._get(key) is not None for key in args)
+            if name == 'DEL':
+                return sum(self.data.pop(key, None) is not None for key in args)
+            if name == 'SET':
+                options = [arg.decode().upper() for arg in args[2:]]
+                if 'NX' in options and self._get(args[0]) is not None:
+                    return None
+                expires = time.time() + int(options[options.index('PX') + 1]) / 1000 if 'PX' in options else None
+                self.data[args[0]] = (args[1], expires)
+                return 'OK'
+            if name == 'INCRBY':
+                value = int(self._get(args[0]) or 0) + int(args[1])
+                expires = self.data[args[0]][1] if args[0] in self.data else None
+                self.data[args[0]] = (str(value).encode(), expires)
+                return value
+            if name == 'PEXPIRE':
+                if self._get(args[0]) is None:
+                    return 0
+                self.data[args[0]] = (self.data[args[0]][0], time.time() + int(args[1]) / 1000)
+                return 1
+            if name == 'EVAL' and args[0].decode() == UNLOCK_SCRIPT:
+                if self._get(args[2]) == args[3]:
+                    del self.data[args[2]]
+                    return 1
+                return 0
+            if name == 'EVAL' and args[0].decode() == APPEND_LOG_SCRIPT:
+                seq = int(self._get(args[2]) or 0) + 1
+                self.data[args[2]] = (str(seq).encode(), None)
+                entries = self._get(args[3]) or []
+                entries = (entries + [b'%d %s' % (seq, args[4])])[-int(args[5]):]
+                self.data[args[3]] = (entries, None)
+                return seq
+            if name == 'LRANGE':
+                entries = self._get(args[0]) or []
+                start, stop = int(args[1]), int(args[2])
+                return entries[max(len(entries) + start, 0) if start < 0 else start:len(entries) + stop + 1]
+            if name == 'EVAL' and args[0].decode() == TAG_ADD_SCRIPT:
+                members = set(self._get(args[2]) or ())
+                expires = self.data[args[2]][1] if args[2] in self.data else None
+                members.add(args[3])
+                ttl_expires = time.time() + int(args[4]) / 1000
+                if expires is not None and expires >= ttl_expires:
+                    ttl_expires = expires
+                self.data[args[2]] = (members, ttl_expires)
+                return 1
+            if name in ('SADD', 'SREM'):
+                members = set(self._get(args[0]) or ())
+                expires = self.data[args[0]][1] if args[0] in self.data else None
+                before = len(members)
+                if name == 'SADD':
+                    members.update(args[1:])
+                else:
+                    members.difference_update(args[1:])
+                self.data[args[0]] = (members, expires)
+                if not members:
+                    del self.data[args[0]]
+                return abs(len(members) - before)
+            if name == 'SMEMBERS':
+                return sorted(self._get(args[0]) or ())
+            if name == 'SINTER':
+                return sorted(set.intersection(*[set(self._get(key) or ()) for key in args]))
+            if name == 'SCAN':
+                pattern = args[args.index(b'MATCH') + 1].rstrip(b'*')
+                return [b'0', [key for key in self.data if key.startswith(pattern)]]
+        raise ValueError(f"unknown command {name}")
+
+
+class FakeRedisServer:
+    """Server RESP lokal di thread, dipakai untuk menguji RedisConnection dan CoordinationBackend"""
+
+    def __init__(self):
+        self.redis = FakeRedis()
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen()
+        self.url = f"redis://127.0.0.1:{self.sock.getsockname()[1]}/0"
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        stream = conn.makefile('rb')
+        try:
+            while True:
+                command = read_reply(stream)
+                conn.sendall(self._encode(self.redis.execute(*command)))
+        except (ConnectionError, OSError):
+            conn.close()
+
+    def _encode(self, value):
+        if value is None:
+            return b'$-1\r\n'
+        if isinstance(value, str):
+            return b'+%s\r\n' % value.encode()
+        if isinstance(value, int):
+            return b':%d\r\n' % value
+        if isinstance(value, list):
+            return b'*%d\r\n' % len(value) + b''.join(self._encode(item) for item in value)
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def close(self):
+        self.sock.close()
+
+
+class CoordinationBackendTests(TestCase):
+    def setUp(self):
+        self.server = FakeRedisServer()
+        self.addCleanup(self.server.close)
+
+    def backend(self):
+        return CoordinationBackend(RedisConnection(self.server.url), prefix='test:')
+
+    def test_resp_encoding(self):
+        """Uji encoding command RESP."""
+        self.assertEqual(encode_command(('SET', 'k', 1)), b'*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$1\r\n1\r\n')
+
+    def test_cache_roundtrip_and_expiry(self):
+        """Uji set, MGET dan TTL di backend."""
+        backend = self.backend()
+        backend.set('a', '{"v": 1}', 60)
+        backend.set('b', 'x', 0.05)
+        self.assertEqual(backend.get_many(['a', 'missing']), [b'{"v": 1}', None])
+        time.sleep(0.06)
+        self.assertEqual(backend.get_many(['b']), [None])
+        backend.delete('a')
+        self.assertEqual(backend.get_many(['a']), [None])
+
+    def test_rate_limit_shared_between_nodes(self):
+        """Uji bahwa dua node berbagi counter dan get+incr dikirim dalam satu round trip."""
+        node_a = SlidingWindowRateLimiter(BackendCounterStore(self.backend()))
+        node_b = SlidingWindowRateLimiter(BackendCounterStore(self.backend()))
+
+        with patch.object(RedisConnection, 'execute', autospec=True, side_effect=RedisConnection.execute) as spy:
+            results = [node.hit('key:1', 3, 60).allowed for node in (node_a, node_b, node_a, node_b)]
+        self.assertEqual(results, [True, True, True, False])
+        # Request yang ditolak butuh satu round trip lagi untuk mengembalikan counter
+        self.assertEqual(spy.call_count, 5)
+
+    def test_single_flight_fetches_once(self):
+        """Uji bahwa request bersamaan untuk key yang sama hanya fetch sekali."""
+        backend = self.backend()
+        flight = SingleFlight(backend, poll_interval=0.01)
+        cache = {}
+        fetches = []
+
+        def fetch():
+            fetches.append(1)
+            time.sleep(0.1)
+            cache['value'] = {'v': 1}
+            return cache['value']
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.run('k', fetch, lambda: cache.get('value'), 2)))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(results, [{'v': 1}] * 3)
+        self.assertFalse(backend.exists('sf:k'))
+
+    @override_settings(CIRCUIT_BREAKER={'failure_threshold': 2, 'cooldown': 30})
+    def test_circuit_state_shared_between_nodes(self):
+        """Uji bahwa circuit yang dibuka satu node juga terbuka di node lain, dengan satu trial."""
+        node_a = CircuitBreakerRegistry(self.backend()).get('coincap')
+        node_b = CircuitBreakerRegistry(self.backend()).get('coincap')
+
+        node_a.record_failure()
+        node_b.record_failure()
+        self.assertEqual(node_a.state, OPEN)
+        self.assertFalse(node_b.allow())
+
+        self.server.redis.data[b'test:cb:coincap:opened'] = (repr(time.time() - 31).encode(), None)
+        self.assertEqual(node_b.state, HALF_OPEN)
+        self.assertTrue(node_a.allow())
+        self.assertFalse(node_b.allow())
+
+        node_a.record_success()
+        self.assertEqual(node_b.state, CLOSED)
+
+    def test_remote_tier_shared_between_file_caches(self):
+        """Uji bahwa entry yang ditulis satu node terbaca node lain tanpa file lokal."""
+        dirs = [tempfile.TemporaryDirectory() for _ in range(2)]
+        for tmp in dirs:
+            self.addCleanup(tmp.cleanup)
+        node_a, node_b = FileCache(remote=self.backend()), FileCache(remote=self.backend())
+        node_a.cache_dir, node_b.cache_dir = dirs[0].name, dirs[1].name
+
+        node_a.set('key', {'v': 1}, timeout=60)
+        self.assertEqual(node_b.get_many(['key', 'other']), [{'v': 1}, None])
+        self.assertEqual(os.listdir(dirs[1].name), [])
+
+    def test_purge_reaches_other_nodes(self):
+        """Uji bahwa purge di satu node menghapus entry yang ditulis node lain, termasuk file lokalnya."""
+        dirs = [tempfile.TemporaryDirectory() for _ in range(2)]
+        for tmp in dirs:
+            self.addCleanup(tmp.cleanup)
+        node_a, node_b = FileCache(remote=self.backend()), FileCache(remote=self.backend())
+        node_a.cache_dir, node_b.cache_dir = dirs[0].name, dirs[1].name
+
+        node_a.set('btc', {'v': 1}, timeout=60, tags=['service:coingecko', 'param:id=bitcoin'])
+        node_a.set('eth', {'v': 2}, timeout=60, tags=['service:coingecko', 'param:id=ethereum'])
+        self.assertEqual(node_a.get('btc'), {'v': 1})
+
+        self.assertEqual(node_b.purge(['param:id=bitcoin']), 1)
+        self.assertIsNone(node_b.get('btc'))
+        # Node A membaca log purge pada lookup berikutnya dan menghapus file lokalnya
+        node_a._purges_checked = None
+        self.assertIsNone(node_a.get('btc'))
+        self.assertFalse(os.path.exists(node_a._get_file_path('btc')))
+        self.assertEqual(node_a.get('eth'), {'v': 2})
+
+    def test_remote_tag_sets_expire_with_entries(self):
+        """Uji bahwa set tag remote expired bersama entry terlama, dan TTL-nya tidak pernah dipendekkan."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = FileCache(remote=self.backend())
+        cache.cache_dir = tmp.name
+        cache.set('a', {'v': 1}, timeout=600, tags=['service:coingecko'])
+        cache.set('b', {'v': 1}, timeout=60, tags=['service:coingecko'])
+
+        expires = self.server.redis.data[b'test:tag:service:coingecko'][1]
+        self.assertAlmostEqual(expires, time.time() + 600, delta=5)
+
+    def test_compact_remote_tags(self):
+        """Uji bahwa compact membuang digest yang entry remote-nya sudah tidak ada."""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = FileCache(remote=self.backend())
+        cache.cache_dir = tmp.name
+        cache.set('a', {'v': 1}, timeout=60, tags=['service:coingecko'])
+        cache.set('b', {'v': 1}, timeout=60, tags=['service:coingecko'])
+        cache.remote.delete(cache._remote_key(cache._digest('b')))
+        os.remove(cache._get_file_path('b'))
+
+        self.assertEqual(cache.compact_tags(), 2)
+        self.assertEqual(cache.remote_tags.digests('service:coingecko'), {cache._digest('a')})
+
+    def test_unavailable_backend_fails_open(self):
+        """Uji bahwa backend yang mati tidak menggagalkan request."""
+        self.server.close()
+        backend = CoordinationBackend(RedisConnection('redis://127.0.0.1:1/0', timeout=0.1))
+
+        self.assertEqual(backend.get_many(['a']), [None])
+        self.assertEqual(backend.acquire('lock', 1), (True, None))
+        self.assertEqual(BackendCounterStore(backend).get_and_incr('a', 'b', 60), (0, 1))
+        self.assertFalse(backend.available)
+
+
+class APIClientSingleFlightTests(TestCase):
+    def test_lock_covers_retry_budget(self):
+        """Uji bahwa TTL lock single-flight mencakup semua attempt dan jeda backoff."""
+        flight = MagicMock()
+        with patch('services.utils.api_client.single_flight', flight), \
+                patch('services.utils.api_client.file_cache') as cache:
+            cache.get.return_value = None
+            APIClient().make_request('coingecko', '/exchanges', timeout=4)
+        # 3 attempt x 4 detik + backoff 2 + 3 detik
+        self.assertEqual(flight.run.call_args.kwargs['timeout'], 17)
+
+    def test_follower_logs_negative_cache_status(self):
+        """Uji bahwa follower yang membaca negative cache mencatat status aslinya."""
+        flight = MagicMock()
+        client = APIClient()
+        with patch('services.utils.api_client.single_flight', flight), \
+                patch('services.utils.api_client.file_cache') as cache, \
+                patch.object(client, '_log_request') as log:
+            cache.get.return_value = None
+            client.make_request('coingecko', '/coins/unknown', timeout=4)
+            cache.get.return_value = {'error': 'coin not found', 'status': 404}
+            flight.run.call_args.kwargs['lookup']()
+        self.assertEqual(log.call_args[0][2], 404)
+
+
+class CacheTagTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = FileCache()
+        self.cache.cache_dir = tmp.name
+
+    def test_tags_from_endpoint_template(self):
+        """Uji tag service, template endpoint dan param termasuk nilai path dan daftar ids."""
+        client = APIClient()
+        self.assertEqual(
+            client.cache_tags('coingecko', '/coins/bitcoin', {}, get_endpoint('coin-info')),
+            ['service:coingecko', 'endpoint:coingecko:/coins/{id}', 'param:id=bitcoin'],
+        )
+        tags = client.cache_tags('coingecko', '/simple/price', {'ids': 'bitcoin,ethereum', 'vs_currencies': 'usd'},
+                                 get_endpoint('simple-price'))
+        self.assertIn('param:ids=bitcoin', tags)
+        self.assertIn('param:ids=ethereum', tags)
+        self.assertEqual(client.cache_tags('frankfurter', '/latest', {'from': 'USD'})[1], 'endpoint:frankfurter:/latest')
+
+    def test_purge_matches_all_tags(self):
+        """Uji bahwa purge hanya menghapus entry yang punya semua tag."""
+        self.cache.set('btc', {'v': 1}, 60, tags=['service:coingecko', 'param:id=bitcoin'])
+        self.cache.set('eth', {'v': 2}, 60, tags=['service:coingecko', 'param:id=ethereum'])
+        self.cache.set('gh', {'v': 3}, 60, tags=['service:github', 'param:id=bitcoin'])
+
+        self.assertEqual(self.cache.purge(['service:coingecko', 'param:id=bitcoin']), 1)
+        self.assertIsNone(self.cache.get('btc'))
+        self.assertEqual(self.cache.get('eth'), {'v': 2})
+        self.assertEqual(self.cache.get('gh'), {'v': 3})
+        self.assertEqual(self.cache.purge(['service:unknown']), 0)
+
+    def test_refresh_does_not_grow_tag_file(self):
+        """Uji bahwa refresh key yang sama tidak menambah digest ke file tag."""
+        for _ in range(5):
+            self.cache.set('a', {'v': 1}, 60, tags=['service:coingecko'])
+        self.cache.set('b', {'v': 1}, 60, tags=['service:coingecko'])
+        self.assertEqual(os.path.getsize(self.cache.tags._path('service:coingecko')), 32)
+
+    def test_compact_drops_missing_and_duplicates(self):
+        """Uji bahwa compact membuang digest duplikat dan yang file-nya sudah dihapus."""
+        self.cache.set('a', {'v': 1}, 60, tags=['service:coingecko'])
+        self.cache.set('b', {'v': 1}, 60, tags=['service:coingecko'])
+        # File tag lama (sebelum add melewati digest yang sudah ada) bisa berisi duplikat
+        with open(self.cache.tags._path('service:coingecko'), 'ab') as f:
+            f.write(self.cache._digest('a') * 2)
+        os.remove(self.cache._get_file_path('b'))
+
+        self.assertEqual(self.cache.compact_tags(), 3)
+        self.assertEqual(self.cache.tags.digests('service:coingecko'), {self.cache._digest('a')})
+
+
+@override_settings(ADAPTIVE_TTL={'default': {'min_ttl': 60, 'max_ttl': 1000}})
+class AdaptiveTTLTests(TestCase):
+    def test_ttl_grows_while_unchanged_and_shrinks_on_change(self):
+        """Uji bahwa TTL naik selama body sama, turun saat berubah, dan tetap dalam batas."""
+        ttls = AdaptiveTTL()
+        self.assertEqual(ttls.observe('coingecko', 'exchanges', 'k', {'v': 1}, 600), 600)
+        self.assertEqual(ttls.observe('coingecko', 'exchanges', 'k', {'v': 1}, 600), 750)
+        for _ in range(10):
+            ttl = ttls.observe('coingecko', 'exchanges', 'k', {'v': 1}, 600)
+        self.assertEqual(ttl, 1000)
+
+        self.assertEqual(ttls.observe('coingecko', 'exchanges', 'k', {'v': 2}, 600), 500)
+        for i in range(10):
+            ttl = ttls.observe('coingecko', 'exchanges', 'k', {'v': i + 3}, 600)
+        self.assertEqual(ttl, 60)
+
+        stats = ttls.stats()['exchanges']
+        self.assertEqual(stats['refreshes'], 22)
+        self.assertEqual(stats['changes'], 11)
+
+    def test_changes_compared_per_cache_key(self):
+        """Uji bahwa body key lain di endpoint yang sama tidak dihitung sebagai perubahan."""
+        ttls = AdaptiveTTL()
+        ttls.observe('coingecko', 'coin-info', 'bitcoin', {'id': 'bitcoin'}, 600)
+        ttls.observe('coingecko', 'coin-info', 'ethereum', {'id': 'ethereum'}, 600)
+        self.assertEqual(ttls.observe('coingecko', 'coin-info', 'bitcoin', {'id': 'bitcoin'}, 600), 750)
+        self.assertEqual(ttls.stats()['coin-info']['changes'], 0)
+
+    @override_settings(ADAPTIVE_TTL={'default': {'max_ttl': 1000}})
+    def test_volatile_endpoint_shrinks_to_fraction_of_static_ttl(self):
+        """Uji bahwa tanpa min_ttl TTL endpoint yang sering berubah turun sampai min_ratio x TTL statis."""
+        ttls = AdaptiveTTL()
+        ttl = ttls.observe('coingecko', 'coin-info', 'bitcoin', {'v': 0}, 1800)
+        self.assertEqual(ttl, 1000)
+        ttl = ttls.observe('coingecko', 'coin-info', 'bitcoin', {'v': 1}, 1800)
+        self.assertEqual(ttl, 500)
+        for i in range(5):
+            ttl = ttls.observe('coingecko', 'coin-info', 'bitcoin', {'v': i + 2}, 1800)
+        self.assertEqual(ttl, 450)
+        self.assertEqual(ttls.stats()['coin-info']['min_ttl'], 450)
+
+    @override_settings(ADAPTIVE_TTL={'default': {'enabled': False}})
+    def test_disabled_returns_base_ttl(self):
+        """Uji bahwa ADAPTIVE_TTL enabled=False memakai TTL statis."""
+        ttls = AdaptiveTTL()
+        for _ in range(3):
+            self.assertEqual(ttls.observe('coingecko', 'exchanges', 'k', {'v': 1}, 600), 600)
+        self.assertEqual(ttls.stats(), {})
+
+    def test_api_client_uses_learned_ttl(self):
+        """Uji bahwa APIClient menyimpan cache dengan TTL adaptif, kecuali endpoint historis."""
+        adaptive_ttl.reset()
+        self.addCleanup(adaptive_ttl.reset)
+        client = APIClient()
+        exchanges = get_endpoint('exchanges')
+        client._refresh_timeout('coingecko', '/exchanges', {}, exchanges, 'k', [1])
+        self.assertEqual(client._refresh_timeout('coingecko', '/exchanges', {}, exchanges, 'k', [1]), 1000)
+
+        history = get_endpoint('coins-history')
+        params = {'date': '01-01-2020'}
+        for _ in range(2):
+            ttl = client._refresh_timeout('coingecko', '/coins/bitcoin/history', params, history, 'h', {'v': 1})
+        self.assertEqual(ttl, history.get_ttl(params))
+        self.assertNotIn('coins-history', adaptive_ttl.stats())
+
+
+class MetricsTests(TestCase):
+    def test_nested_phases_are_exclusive(self):
+        """Uji bahwa waktu fase anak tidak dihitung ulang di fase induk."""
+        token = start_request()
+        with patch('services.utils.metrics.perf_counter', side_effect=[0.0, 1.0, 3.0, 4.0]):
+            with phase('upstream'):
+                with phase('retry'):
+                    pass
+        timings = finish_request(token)
+        self.assertEqual(timings, {'retry': 2.0, 'upstream': 2.0})
+        self.assertEqual(server_timing(timings, 5.0), 'retry;dur=2000.00, upstream;dur=2000.00, total;dur=5000.00')
+
+    def test_middleware_async_path(self):
+        """Uji bahwa ServerTimingMiddleware tetap async di bawah ASGI dan mencatat fase."""
+        async def get_response(request):
+            with phase('cache'):
+                pass
+            return HttpResponse('ok')
+
+        middleware = ServerTimingMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = asyncio.run(middleware(RequestFactory().get('/')))
+        self.assertTrue(response['Server-Timing'].startswith('cache;dur='))
+
+    def test_phase_outside_request_is_noop(self):
+        """Uji bahwa phase di luar request tidak error dan tidak mencatat."""
+        with phase('cache'):
+            pass
+
+    def test_render_prometheus_format(self):
+        """Uji format text exposition untuk counter, histogram dan gauge."""
+        registry = MetricsRegistry()
+        counter = registry.counter('lookups_total', 'Lookups', ('service',))
+        histogram = registry.histogram('latency_seconds', 'Latency', ('service',), buckets=(0.1, 1.0))
+        registry.gauge('state', 'State', ('service',), lambda: {('a"b',): 2, ('c',): None})
+        counter.inc('coingecko', amount=2)
+        histogram.observe(0.05, 'coingecko')
+        histogram.observe(0.5, 'coingecko')
+        histogram.observe(5.0, 'coingecko')
+
+        lines = registry.render().splitlines()
+        self.assertIn('# TYPE lookups_total counter', lines)
+        self.assertIn('lookups_total{service="coingecko"} 2', lines)
+        self.assertIn('latency_seconds_bucket{service="coingecko",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{service="coingecko",le="1.0"} 2', lines)
+        self.assertIn('latency_seconds_bucket{service="coingecko",le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_sum{service="coingecko"} 5.55', lines)
+        self.assertIn('latency_seconds_count{service="coingecko"} 3', lines)
+        self.assertIn('state{service="a\\"b"} 2', lines)
+        self.assertEqual(len([line for line in lines if line.startswith('state{')]), 1)
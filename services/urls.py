@@ -0,0 +1,14 @@
+from django.urls import path
+from .endpoints import ENDPOINTS
+from .views import ENDPOINT_VIEWS, CachePurgeView, CacheTTLView, CoinHistoryRangeView, MetricsView, PriceStreamView
+
+urlpatterns = [
+    path(endpoint.route, ENDPOINT_VIEWS[endpoint.name].as_view(), name=endpoint.name)
+    for endpoint in ENDPOINTS
+] + [
+    path('api/coins/history/range/', CoinHistoryRangeView.as_view(), name='coins-history-range'),
+    path('api/simple/price/stream/', PriceStreamView.as_view(), name='simple-price-stream'),
+    path('api/cache/purge/', CachePurgeView.as_view(), name='cache-purge'),
+    path('api/cache/ttl/', CacheTTLView.as_view(), name='cache-ttl'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+]
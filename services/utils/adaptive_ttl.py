@@ -0,0 +1,134 @@
+# services/utils/adaptive_ttl.py
+"""
+TTL cache per endpoint yang dipelajari dari seberapa sering response upstream berubah.
+
+Setiap kali entry cache di-refresh dari upstream, body-nya di-hash dan dibandingkan dengan
+hash refresh sebelumnya untuk cache key yang sama. Body yang tidak berubah berarti TTL
+terlalu pendek: TTL endpoint dinaikkan (x increase). Body yang berubah berarti data mungkin
+sudah basi sebelum expired: TTL diturunkan (x decrease). TTL selalu dibatasi min_ttl/max_ttl.
+Tanpa min_ttl (default) batas bawahnya adalah min_ratio x TTL statis endpoint, sehingga data
+yang sering berubah mendapat TTL lebih pendek tanpa pernah jatuh jauh di bawah TTL yang
+dipilih untuk endpoint itu (dan kuota upstream-nya). min_ttl per service menggantikan batas ini.
+Dengan increase 1.25 dan decrease 0.5, TTL stabil di titik ~1 dari 4 refresh melihat
+perubahan.
+
+State disimpan per process (seperti latency dan admission control); TTL awal setiap
+endpoint adalah TTL statis-nya (Endpoint.ttl atau APIClient._get_cache_timeout).
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+DEFAULTS = {
+    'enabled': True,
+    # None: min_ratio x TTL statis endpoint
+    'min_ttl': None,
+    'min_ratio': 0.25,
+    'max_ttl': 86400,
+    'increase': 1.25,
+    'decrease': 0.5,
+}
+# Jumlah hash body terakhir (per cache key) yang disimpan
+MAX_KEYS = 10000
+# Bobot observasi terbaru untuk change_rate
+CHANGE_RATE_ALPHA = 0.1
+
+
+def body_hash(data):
+    return hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).digest()
+
+
+def service_config(service_name):
+    config = getattr(settings, 'ADAPTIVE_TTL', {})
+    return {**DEFAULTS, **config.get('default', {}), **config.get(service_name, {})}
+
+
+class EndpointTTL:
+    def __init__(self, ttl, min_ttl=None, max_ttl=86400, increase=1.25, decrease=0.5, min_ratio=0.25):
+        self.min_ttl = ttl * min_ratio if min_ttl is None else min_ttl
+        self.max_ttl = max_ttl
+        self.increase = increase
+        self.decrease = decrease
+        self.base_ttl = ttl
+        self.ttl = float(min(max_ttl, max(self.min_ttl, ttl)))
+        self.refreshes = 0
+        self.changes = 0
+        self.change_rate = None
+
+    def observe(self, changed):
+        self.refreshes += 1
+        self.changes += changed
+        self.change_rate = float(changed) if self.change_rate is None else (
+            (1 - CHANGE_RATE_ALPHA) * self.change_rate + CHANGE_RATE_ALPHA * changed
+        )
+        if changed:
+            self.ttl = max(self.min_ttl, self.ttl * self.decrease)
+        else:
+            self.ttl = min(self.max_ttl, self.ttl * self.increase)
+
+    def stats(self):
+        return {
+            'ttl': int(self.ttl),
+            'base_ttl': self.base_ttl,
+            'min_ttl': int(self.min_ttl),
+            'max_ttl': self.max_ttl,
+            'refreshes': self.refreshes,
+            'changes': self.changes,
+            'change_rate': None if self.change_rate is None else round(self.change_rate, 3),
+        }
+
+
+class AdaptiveTTL:
+    """Registry EndpointTTL, konfigurasi dari settings.ADAPTIVE_TTL ('default' + per service)"""
+
+    def __init__(self, max_keys=MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._hashes = OrderedDict()
+
+    def observe(self, service_name, name, cache_key, data, base_ttl):
+        """
+        Catat refresh `cache_key` milik endpoint `name` dan return TTL (detik) untuk entry ini.
+        Tanpa adaptasi (disabled) return `base_ttl`.
+        """
+        config = service_config(service_name)
+        if not config.pop('enabled'):
+            return base_ttl
+
+        digest = body_hash(data)
+        with self._lock:
+            endpoint = self._endpoints.get(name)
+            if endpoint is None:
+                endpoint = self._endpoints[name] = EndpointTTL(base_ttl, **config)
+
+            previous = self._hashes.pop(cache_key, None)
+            self._hashes[cache_key] = digest
+            if len(self._hashes) > self.max_keys:
+                self._hashes.popitem(last=False)
+
+            # Refresh pertama untuk key ini belum bisa dibandingkan
+            if previous is not None:
+                endpoint.observe(previous != digest)
+            return int(endpoint.ttl)
+
+    def ttl_for(self, name, base_ttl):
+        """TTL yang sudah dipelajari untuk endpoint, atau `base_ttl` jika belum ada"""
+        endpoint = self._endpoints.get(name)
+        return base_ttl if endpoint is None else int(endpoint.ttl)
+
+    def stats(self):
+        with self._lock:
+            return {name: endpoint.stats() for name, endpoint in sorted(self._endpoints.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self._hashes = OrderedDict()
+
+
+# Singleton instance
+adaptive_ttl = AdaptiveTTL()
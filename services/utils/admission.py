@@ -0,0 +1,143 @@
+# services/utils/admission.py
+"""
+Admission control per upstream service.
+
+Setiap service punya batas request upstream yang sedang berjalan (in-flight). Request di
+atas batas menunggu di antrian terbatas sampai deadline; jika antrian penuh atau deadline
+lewat, request langsung ditolak (Overloaded) sehingga worker tidak ikut menumpuk di belakang
+upstream yang lambat. Batasnya adaptif (AIMD): naik perlahan selama latency normal, turun
+multiplicative saat upstream lambat atau gagal.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULTS = {
+    'enabled': True,
+    'initial_limit': 10,
+    'min_limit': 1,
+    'max_limit': 50,
+    'queue_size': 20,
+    'queue_timeout': 2.0,
+    'retry_after': 5,
+    # Latency dianggap lambat jika melebihi slow_factor x baseline (minimal min_slow_ms)
+    'slow_factor': 2.0,
+    'min_slow_ms': 250,
+    'backoff': 0.75,
+}
+
+
+class Overloaded(Exception):
+    def __init__(self, service_name, retry_after):
+        super().__init__(f"{service_name} is overloaded, try again later")
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    def __init__(self, name, initial_limit=10, min_limit=1, max_limit=50, queue_size=20, queue_timeout=2.0,
+                 retry_after=5, slow_factor=2.0, min_slow_ms=250, backoff=0.75, enabled=True):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.slow_factor = slow_factor
+        self.min_slow_ms = min_slow_ms
+        self.backoff = backoff
+        self.enabled = enabled
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+        self.baseline_ms = None
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Ambil slot, menunggu di antrian jika perlu; raise Overloaded jika ditolak"""
+        if not self.enabled:
+            return
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+
+            if self.waiting >= self.queue_size:
+                self.shed += 1
+                raise Overloaded(self.name, self.retry_after)
+
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed += 1
+                        raise Overloaded(self.name, self.retry_after)
+                    self._condition.wait(remaining)
+                self.in_flight += 1
+            finally:
+                self.waiting -= 1
+
+    def release(self, latency_ms, ok=True):
+        """Kembalikan slot dan sesuaikan limit berdasarkan hasil request"""
+        if not self.enabled:
+            return
+        with self._condition:
+            self.in_flight -= 1
+            slow = self.baseline_ms is not None and latency_ms > max(self.min_slow_ms, self.slow_factor * self.baseline_ms)
+
+            if ok and not slow:
+                # Additive increase: kira-kira +1 per `limit` request yang sukses
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                self.baseline_ms = latency_ms if self.baseline_ms is None else 0.95 * self.baseline_ms + 0.05 * latency_ms
+            else:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._condition.notify()
+
+    def stats(self):
+        return {
+            'limit': math.floor(self.limit),
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'shed': self.shed,
+            'baseline_ms': None if self.baseline_ms is None else round(self.baseline_ms, 1),
+        }
+
+
+class AdmissionControl:
+    """Registry AdaptiveLimiter per service, konfigurasi dari settings.ADMISSION_CONTROL"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters = {}
+
+    def limiter(self, service_name):
+        limiter = self._limiters.get(service_name)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(service_name)
+                if limiter is None:
+                    config = getattr(settings, 'ADMISSION_CONTROL', {})
+                    options = {**DEFAULTS, **config.get('default', {}), **config.get(service_name, {})}
+                    limiter = self._limiters[service_name] = AdaptiveLimiter(service_name, **options)
+        return limiter
+
+    def acquire(self, service_name):
+        limiter = self.limiter(service_name)
+        limiter.acquire()
+        return limiter
+
+    def stats(self):
+        return {name: limiter.stats() for name, limiter in sorted(self._limiters.items())}
+
+    def reset(self):
+        with self._lock:
+            self._limiters = {}
+
+
+# Singleton instance
+admission_control = AdmissionControl()
@@ -1,48 +1,127 @@
 # services/api_client.py
 import requests
-from datetime import datetime
+import hashlib
+import json
 import time
 import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from django.conf import settings
 from .cache_service import file_cache
-from services.models import APIRequestLog, ThirdPartyService
+from .service_registry import service_registry
+from .admission import Overloaded, admission_control
+from .latency import upstream_latency
+from .adaptive_ttl import adaptive_ttl
+from .coordination import single_flight
+from .metrics import CACHE_LOOKUPS, UPSTREAM_LATENCY, UPSTREAM_RETRIES, phase
+from services.endpoints import SERVICE_AUTH
+from services.models import APIRequestLog
 
 logger = logging.getLogger(__name__)
 
+# Response 4xx yang definitif: request yang sama akan selalu gagal, jadi di-cache (negative cache)
+NEGATIVE_CACHE_STATUSES = (400, 404, 422)
+
+# Pool thread per service untuk attempt GET yang bisa di-hedge (lihat _hedge_pool)
+_hedge_pools = {}
+_hedge_pools_lock = threading.Lock()
+
+
+def _hedge_pool(service_name):
+    """
+    Setiap request yang lolos admission control bisa punya primary dan hedge yang berjalan
+    bersamaan, jadi pool berukuran 2 x max_limit service dan tidak membatasi konkurensi
+    upstream di bawah admission control.
+    """
+    pool = _hedge_pools.get(service_name)
+    if pool is None:
+        with _hedge_pools_lock:
+            pool = _hedge_pools.get(service_name)
+            if pool is None:
+                size = 2 * admission_control.limiter(service_name).max_limit
+                pool = _hedge_pools[service_name] = ThreadPoolExecutor(
+                    max_workers=size, thread_name_prefix=f'upstream-hedge-{service_name}'
+                )
+    return pool
+
+
 class APIClient:
     def __init__(self):
         self.session = requests.Session()
         # Setup retry strategy
         self.retry_status_codes = [429, 500, 502, 503, 504]
 
-    def make_request(self, service_name, endpoint, params=None, user=None, use_cache=True, timeout=15):
-        # Generate cache key yang lebih robust
-        cache_params = params.copy() if params else {}
-        # Remove sensitive data dari cache key
-        cache_params.pop('api_key', None)
-        cache_params.pop('token', None)
+    def make_request(self, service_name, endpoint, params=None, user=None, use_cache=True, timeout=None, spec=None,
+                     json_body=None):
+        """
+        Request ke upstream service dengan cache.
 
-        param_string = str(sorted(cache_params.items())) if cache_params else ""
-        cache_key = f"{service_name}_{endpoint}_{hash(param_string)}"
+        `spec` adalah services.endpoints.Endpoint; jika diberikan, TTL, cacheability
+        dan auth style diambil dari sana. Jika `json_body` diberikan request dikirim
+        sebagai POST (misalnya GraphQL) dan tidak di-cache. Tanpa `timeout` eksplisit,
+        timeout diturunkan dari latency service (services.utils.latency).
+        """
+        params = dict(params) if params else {}
+        cache_key = self._get_cache_key(service_name, endpoint, params)
+        use_cache = use_cache and json_body is None and (spec is None or spec.cacheable)
 
         # Check cache first
         if use_cache:
-            cached_data = file_cache.get(cache_key)
-            if cached_data:
-                self._log_request(service_name, endpoint, 200, 0, user, cached=True)
+            with phase('cache'):
+                cached_data = file_cache.get(cache_key)
+            CACHE_LOOKUPS.inc(service_name, 'miss' if cached_data is None else 'hit')
+            if cached_data is not None:
+                self._log_request(service_name, endpoint, self._cached_status(cached_data), 0, user, cached=True)
                 return cached_data
 
-        # Get service config dengan encrypted key
-        try:
-            service = ThirdPartyService.objects.get(name=service_name, is_active=True)
-            decrypted_api_key = service.get_api_key()
+        if use_cache and single_flight is not None:
+            # Satu node yang fetch key ini, node lain menunggu hasilnya masuk cache bersama
+            def lookup():
+                data = file_cache.get(cache_key)
+                if data is not None:
+                    self._log_request(service_name, endpoint, self._cached_status(data), 0, user, cached=True)
+                return data
+
+            return single_flight.run(
+                cache_key,
+                fetch=lambda: self._fetch(service_name, endpoint, params, user, timeout, spec, json_body,
+                                          cache_key, use_cache),
+                lookup=lookup,
+                # Lock harus bertahan selama leader masih retry, bukan hanya satu attempt
+                timeout=self._retry_budget(timeout or upstream_latency.timeout_for(service_name)),
+            )
+        return self._fetch(service_name, endpoint, params, user, timeout, spec, json_body, cache_key, use_cache)
 
-            if not decrypted_api_key:
-                return {"error": f"API key untuk {service_name} tidak valid atau tidak bisa didecrypt"}
+    def _cached_status(self, data):
+        """Status yang dicatat untuk cache hit: status negative cache, selain itu 200"""
+        return data.get('status', 200) if isinstance(data, dict) and 'error' in data else 200
 
-        except ThirdPartyService.DoesNotExist:
+    def _retry_budget(self, timeout, max_retries=3):
+        """Waktu terlama _make_request_with_retry: semua attempt plus jeda backoff di antaranya"""
+        return max_retries * timeout + sum((2 ** attempt) + 1 for attempt in range(max_retries - 1))
+
+    def _fetch(self, service_name, endpoint, params, user, timeout, spec, json_body, cache_key, use_cache):
+        """Request ke upstream (cache miss) dan isi cache dengan hasilnya"""
+        # Get service config dari registry (key sudah didecrypt, tanpa query DB)
+        service = service_registry.get(service_name)
+        if service is None:
             return {"error": f"Service {service_name} tidak ditemukan atau tidak aktif"}
 
+        decrypted_api_key = service.api_key
+        if not decrypted_api_key:
+            return {"error": f"API key untuk {service_name} tidak valid atau tidak bisa didecrypt"}
+
+        # Cache hit sudah dilayani di atas, hanya request upstream yang antri di sini
+        try:
+            limiter = admission_control.acquire(service_name)
+        except Overloaded as e:
+            return self._shed(service_name, endpoint, cache_key if use_cache else None, user, e)
+
+        if timeout is None:
+            timeout = upstream_latency.timeout_for(service_name)
+
         start_time = time.time()
+        upstream_ok = False
 
         try:
             # Prepare headers dengan decrypted API key
@@ -51,40 +130,49 @@ class APIClient:
                 'Accept': 'application/json'
             }
 
-            params = params or {}
-
-            if service_name == 'openweather':
-                params['appid'] = decrypted_api_key
-            elif service_name == 'newsapi':
-                headers['X-Api-Key'] = decrypted_api_key
-            elif service_name == 'coingecko':
-                params['x_cg_demo_api_key'] = decrypted_api_key
-            elif service_name == 'exchangeRate':
-                endpoint = f"/{decrypted_api_key}{endpoint}"
-            elif service_name == 'github':
-                if decrypted_api_key and decrypted_api_key != 'YOUR_GITHUB_TOKEN':
-                    headers['Authorization'] = f'token {decrypted_api_key}'
-
-            response = self._make_request_with_retry(
-                service.api_endpoint + endpoint,
-                params=params,
-                headers=headers,
-                timeout=timeout
-            )
+            # Tag dihitung sebelum auth.apply, supaya API key upstream tidak ikut jadi tag
+            tags = self.cache_tags(service_name, endpoint, params, spec)
+            auth = spec.auth if spec is not None else SERVICE_AUTH.get(service_name)
+            upstream_path = endpoint
+            if auth is not None:
+                upstream_path = auth.apply(decrypted_api_key, endpoint, params, headers)
+
+            with phase('upstream'):
+                response = self._make_request_with_retry(
+                    service.api_endpoint + upstream_path,
+                    params=params,
+                    headers=headers,
+                    timeout=timeout,
+                    json_body=json_body,
+                    service_name=service_name
+                )
 
             response_time_ms = int((time.time() - start_time) * 1000)
+            upstream_ok = response.status_code < 500 and response.status_code != 429
+            if response.status_code >= 400:
+                return self._upstream_error(
+                    service_name, endpoint, response, response_time_ms, user,
+                    cache_key=cache_key if use_cache else None,
+                    tags=tags
+                )
+
+            data = response.json()
 
-            # Transform response berdasarkan service
-            # transformed_data = self._transform_response(service_name, response.json())
+            # Transform sekali saat ingest, cache hit langsung dapat dokumen yang ringkas
+            if spec is not None and spec.transform is not None:
+                data = spec.transform(data)
 
             # Cache dengan timeout yang appropriate
-            cache_timeout = self._get_cache_timeout(service_name)
-            file_cache.set(cache_key, response, cache_timeout)
+            if use_cache:
+                with phase('cache'):
+                    cache_timeout = self._refresh_timeout(service_name, endpoint, params, spec, cache_key, data)
+                    file_cache.set(cache_key, data, cache_timeout, stale_ttl=getattr(settings, 'STALE_CACHE_TTL', 0),
+                                   tags=tags)
 
             # Log successful request
             self._log_request(service_name, endpoint, response.status_code, response_time_ms, user)
 
-            return response.json()
+            return data
 
         except requests.Timeout:
             response_time_ms = int((time.time() - start_time) * 1000)
@@ -99,6 +187,142 @@ class APIClient:
                 return {"error": f"API request failed: Client Error"}
             return {"error": f"API request failed: {str(e)}"}
 
+        finally:
+            limiter.release((time.time() - start_time) * 1000, upstream_ok)
+
+    def _shed(self, service_name, endpoint, cache_key, user, overloaded):
+        """Request ditolak admission control: layani data stale jika ada, selain itu 503"""
+        with phase('cache'):
+            stale = file_cache.get_stale(cache_key) if cache_key is not None else None
+        if stale is not None:
+            CACHE_LOOKUPS.inc(service_name, 'stale')
+            self._log_request(service_name, endpoint, 200, 0, user, cached=True)
+            return stale
+        self._log_request(service_name, endpoint, 503, 0, user)
+        return {"error": str(overloaded), "status": 503, "retry_after": overloaded.retry_after}
+
+    def make_derived_request(self, service_name, endpoint, params=None, user=None, spec=None, variant=None,
+                             source=None):
+        """
+        Varian turunan dari response (spec.derive), di-cache terpisah dari response penuh
+        sehingga varian yang sama tidak dihitung ulang dan tidak butuh request upstream lagi.
+        `source` (opsional) menggantikan make_request sebagai sumber response penuh.
+        """
+        params = dict(params) if params else {}
+        variant_key = self._get_cache_key(service_name, endpoint, {**params, '__variant__': variant})
+
+        with phase('cache'):
+            cached_data = file_cache.get(variant_key)
+        CACHE_LOOKUPS.inc(service_name, 'miss' if cached_data is None else 'hit')
+        if cached_data is not None:
+            self._log_request(service_name, endpoint, 200, 0, user, cached=True)
+            return cached_data
+
+        if source is not None:
+            data = source()
+        else:
+            data = self.make_request(service_name, endpoint, params=params, user=user, spec=spec)
+        if isinstance(data, dict) and 'error' in data:
+            return data
+
+        derived = spec.derive(data, variant)
+        if spec.cacheable:
+            file_cache.set(variant_key, derived, self._learned_timeout(service_name, endpoint, params, spec),
+                           tags=self.cache_tags(service_name, endpoint, params, spec))
+        return derived
+
+    def _upstream_error(self, service_name, endpoint, response, response_time_ms, user, cache_key=None, tags=None):
+        """
+        Response error dari upstream -> {'error', 'status'} dengan status untuk client.
+        4xx definitif diteruskan apa adanya dan di-cache singkat; 429/5xx setelah retry habis
+        dan masalah auth ke upstream menjadi 503/502 dan tidak di-cache.
+        """
+        upstream_status = response.status_code
+        error = {'error': self._upstream_message(service_name, response)}
+
+        if upstream_status in NEGATIVE_CACHE_STATUSES:
+            error['status'] = upstream_status
+        elif upstream_status == 429:
+            error['status'] = 503
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                error['retry_after'] = int(retry_after)
+        else:
+            error['status'] = 502
+
+        if cache_key is not None and upstream_status in NEGATIVE_CACHE_STATUSES:
+            file_cache.set(cache_key, error, self._get_negative_cache_timeout(service_name), tags=tags)
+
+        self._log_request(service_name, endpoint, upstream_status, response_time_ms, user)
+        return error
+
+    def _upstream_message(self, service_name, response):
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if isinstance(body, dict):
+            # GitHub/OpenWeather/NewsAPI: message, CoinGecko: error, ExchangeRate-API: error-type
+            for field in ('message', 'error', 'error-type'):
+                if isinstance(body.get(field), str) and body[field]:
+                    return body[field]
+        return f"{service_name} returned HTTP {response.status_code}"
+
+    def get_cached(self, service_name, endpoint, params, user=None, log=False):
+        """Cache entry yang sama dengan yang dibaca make_request, atau None"""
+        with phase('cache'):
+            cached_data = file_cache.get(self._get_cache_key(service_name, endpoint, params))
+        CACHE_LOOKUPS.inc(service_name, 'miss' if cached_data is None else 'hit')
+        if log and cached_data is not None:
+            self._log_request(service_name, endpoint, 200, 0, user, cached=True)
+        return cached_data
+
+    def log_cached(self, service_name, endpoint, user=None):
+        """Catat request yang dilayani dari store lokal (tanpa upstream) sebagai cache hit"""
+        self._log_request(service_name, endpoint, 200, 0, user, cached=True)
+
+    def get_cached_many(self, service_name, requests):
+        """get_cached untuk banyak (endpoint, params) sekaligus, tier remote dibaca sekali"""
+        with phase('cache'):
+            results = file_cache.get_many([self._get_cache_key(service_name, endpoint, params)
+                                           for endpoint, params in requests])
+        hits = sum(result is not None for result in results)
+        CACHE_LOOKUPS.inc(service_name, 'hit', amount=hits)
+        CACHE_LOOKUPS.inc(service_name, 'miss', amount=len(results) - hits)
+        return results
+
+    def set_cached(self, service_name, endpoint, params, data, timeout, spec=None):
+        """Isi cache entry make_request dari hasil request batch; `timeout` adalah TTL statis endpoint"""
+        cache_key = self._get_cache_key(service_name, endpoint, params)
+        if spec is not None and spec.adaptive_ttl:
+            timeout = adaptive_ttl.observe(service_name, spec.name, cache_key, data, timeout)
+        file_cache.set(cache_key, data, timeout, tags=self.cache_tags(service_name, endpoint, params, spec))
+
+    def cache_tags(self, service_name, endpoint, params, spec=None):
+        """
+        Tag service, template endpoint dan param untuk purge (services/utils/cache_tags.py).
+        Nilai param daftar (ids=bitcoin,ethereum) di-tag per item.
+        """
+        values = spec.path_values(endpoint) if spec is not None else None
+        template = spec.path if values is not None else endpoint
+        fixed = spec.fixed_params if spec is not None else {}
+        list_params = spec.list_params() if spec is not None else set()
+
+        tags = [f"service:{service_name}", f"endpoint:{service_name}:{template}"]
+        for name, value in sorted({**(values or {}), **params}.items()):
+            if name in fixed or name in ('api_key', 'token') or value in (None, ''):
+                continue
+            items = str(value).split(',') if name in list_params else [str(value)]
+            tags.extend(f"param:{name}={item}" for item in items)
+        return tags
+
+    def _get_cache_key(self, service_name, endpoint, params):
+        """Cache key yang stabil antar process (hash() bawaan Python di-random per process)"""
+        cache_params = {k: v for k, v in params.items() if k not in ('api_key', 'token')}
+        param_string = json.dumps(cache_params, sort_keys=True, default=str)
+        digest = hashlib.md5(f"{endpoint}?{param_string}".encode()).hexdigest()
+        return f"{service_name}:{digest}"
+
     def _get_cache_timeout(self, service_name):
         """Return cache timeout berdasarkan jenis service"""
         timeouts = {
@@ -109,36 +333,129 @@ class APIClient:
         }
         return timeouts.get(service_name, 300)
 
-    def _make_request_with_retry(self, url, params=None, headers=None, timeout=15, max_retries=3):
+    def _refresh_timeout(self, service_name, endpoint, params, spec, cache_key, data):
+        """TTL untuk response yang baru diambil dari upstream, sekaligus dicatat ke adaptive_ttl"""
+        if spec is not None and not spec.adaptive_ttl:
+            return spec.get_ttl(params)
+        base = spec.get_ttl(params) if spec is not None else self._get_cache_timeout(service_name)
+        return adaptive_ttl.observe(service_name, self._ttl_name(service_name, endpoint, spec), cache_key, data, base)
+
+    def _learned_timeout(self, service_name, endpoint, params, spec):
+        """TTL endpoint saat ini tanpa observasi baru (misalnya untuk varian turunan)"""
+        if not spec.adaptive_ttl:
+            return spec.get_ttl(params)
+        return adaptive_ttl.ttl_for(self._ttl_name(service_name, endpoint, spec), spec.get_ttl(params))
+
+    def _ttl_name(self, service_name, endpoint, spec):
+        # Request tanpa spec (provider failover, batch) dipelajari per service + path
+        return spec.name if spec is not None else f"{service_name}:{endpoint}"
+
+    def _get_negative_cache_timeout(self, service_name):
+        """TTL negative cache per service (settings.NEGATIVE_CACHE_TTL)"""
+        timeouts = getattr(settings, 'NEGATIVE_CACHE_TTL', {})
+        return timeouts.get(service_name, timeouts.get('default', 60))
+
+    def _make_request_with_retry(self, url, params=None, headers=None, timeout=15, max_retries=3, json_body=None,
+                                 service_name=None):
         for attempt in range(max_retries):
             try:
-                response = self.session.get(
-                    url,
-                    params=params,
-                    headers=headers,
-                    timeout=timeout
-                )
+                response = self._send(url, params=params, headers=headers, timeout=timeout,
+                                      json_body=json_body, service_name=service_name)
 
-                if response.status_code in self.retry_status_codes:
+                if response.status_code in self.retry_status_codes and attempt < max_retries - 1:
                     wait_time = (2 ** attempt) + 1  # Exponential backoff
-                    time.sleep(wait_time)
+                    UPSTREAM_RETRIES.inc(service_name or '')
+                    with phase('retry'):
+                        time.sleep(wait_time)
                     continue
 
-                response.raise_for_status()
+                # Sukses, 4xx definitif (tidak di-retry) atau retry sudah habis
                 return response
 
             except requests.RequestException as e:
                 if attempt == max_retries - 1:
                     raise
                 wait_time = (2 ** attempt) + 1
-                time.sleep(wait_time)
+                UPSTREAM_RETRIES.inc(service_name or '')
+                with phase('retry'):
+                    time.sleep(wait_time)
+
+    def _send(self, url, params=None, headers=None, timeout=15, json_body=None, service_name=None):
+        """
+        Satu attempt HTTP. GET ke service dengan hedging aktif mengirim attempt kedua jika
+        attempt pertama belum selesai setelah p95 latency service (selama hedge budget cukup),
+        lalu memakai yang selesai lebih dulu.
+        """
+        if json_body is not None:
+            return self.session.post(url, params=params, json=json_body, headers=headers, timeout=timeout)
+
+        delay = upstream_latency.hedge_delay(service_name) if service_name else None
+        if delay is None or delay >= timeout:
+            return self._timed_get(service_name, url, params, headers, timeout)
+
+        budget = upstream_latency.budget(service_name)
+        budget.deposit()
+        pool = _hedge_pool(service_name)
+        started = threading.Event()
+
+        def attempt():
+            started.set()
+            return self._timed_get(service_name, url, params, headers, timeout)
+
+        primary = pool.submit(attempt)
+        # Delay dihitung sejak primary benar-benar berjalan, bukan sejak masuk antrian pool
+        started.wait()
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+
+        if not budget.try_spend():
+            return primary.result()
 
+        logger.info(f"Hedging request to {service_name} after {delay * 1000:.0f} ms")
+        pending = {primary, pool.submit(self._timed_get, service_name, url, params, headers, timeout)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except requests.RequestException as e:
+                    error = e
+        raise error
+
+    def _timed_get(self, service_name, url, params, headers, timeout):
+        started = time.monotonic()
+        try:
+            response = self.session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=timeout
+            )
+        except requests.Timeout:
+            if service_name:
+                upstream_latency.record(service_name, timeout * 1000)
+                UPSTREAM_LATENCY.observe(timeout, service_name)
+            raise
+        if service_name:
+            elapsed = time.monotonic() - started
+            upstream_latency.record(service_name, elapsed * 1000)
+            UPSTREAM_LATENCY.observe(elapsed, service_name)
+        return response
 
     def _log_request(self, service_name, endpoint, status_code, response_time, user, cached=False):
+        with phase('log'):
+            self._insert_log(service_name, endpoint, status_code, response_time, user, cached)
+
+    def _insert_log(self, service_name, endpoint, status_code, response_time, user, cached):
         try:
-            service = ThirdPartyService.objects.get(name=service_name)
+            service = service_registry.get(service_name)
+            if service is None:
+                return
             APIRequestLog.objects.create(
-                service=service,
+                service_id=service.id,
                 user=user,
                 endpoint_called=endpoint,
                 response_status=status_code,
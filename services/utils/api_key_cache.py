@@ -0,0 +1,117 @@
+# services/utils/api_key_cache.py
+import hashlib
+import logging
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'services:api_key_cache_version'
+
+
+class VerifiedKey:
+    """Hasil verifikasi UserAPIKey yang disimpan di memory"""
+    __slots__ = ('key_id', 'user_id', 'plan', 'revoked', 'expiry_date', 'cached_until')
+
+    def __init__(self, key_id, user_id, plan, revoked, expiry_date, cached_until):
+        self.key_id = key_id
+        self.user_id = user_id
+        self.plan = plan
+        self.revoked = revoked
+        self.expiry_date = expiry_date
+        self.cached_until = cached_until
+
+    def is_usable(self):
+        if self.revoked:
+            return False
+        if self.expiry_date is not None and self.expiry_date < timezone.now():
+            return False
+        return True
+
+
+class VerifiedKeyCache:
+    """
+    Cache TTL pendek untuk API key yang sudah lolos verifikasi hash.
+
+    Key disimpan sebagai digest SHA-256, bukan plain text. Revoke/delete di worker ini
+    langsung membuang entry-nya; worker lain membuang seluruh cache saat version stamp
+    di shared cache berubah (dicek paling sering sekali per `check_interval` detik).
+    """
+
+    def __init__(self, ttl=60, check_interval=5):
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._digests_by_id = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    @staticmethod
+    def digest(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._sync_version(now)
+
+        entry = self._entries.get(self.digest(key))
+        if entry is None or entry.cached_until < now:
+            return None
+        return entry
+
+    def set(self, key, api_key):
+        entry = VerifiedKey(
+            key_id=api_key.id,
+            user_id=api_key.user_id,
+            plan=api_key.plan,
+            revoked=api_key.revoked,
+            expiry_date=api_key.expiry_date,
+            cached_until=time.monotonic() + self.ttl,
+        )
+        digest = self.digest(key)
+        with self._lock:
+            self._entries[digest] = entry
+            self._digests_by_id[api_key.id] = digest
+        return entry
+
+    def invalidate(self, key_id):
+        """Buang entry untuk satu UserAPIKey di worker ini"""
+        with self._lock:
+            digest = self._digests_by_id.pop(key_id, None)
+            if digest is not None:
+                self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._digests_by_id = {}
+
+    def bump_version(self):
+        """Beritahu worker lain untuk membuang cache mereka"""
+        try:
+            cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        except Exception as e:
+            logger.error(f"Failed to bump API key cache version: {str(e)}")
+
+    def _sync_version(self, now):
+        try:
+            version = cache.get(VERSION_CACHE_KEY)
+        except Exception:
+            version = self._version
+
+        with self._lock:
+            if version != self._version:
+                self._entries = {}
+                self._digests_by_id = {}
+                self._version = version
+            self._checked_at = now
+
+
+# Singleton instance
+verified_key_cache = VerifiedKeyCache()
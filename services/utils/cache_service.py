@@ -1,36 +1,141 @@
 import os
 import json
+import time
 from datetime import datetime, timedelta
 from django.conf import settings
 import hashlib
+from .shared_cache import SharedMemoryCache
+from .coordination import coordination_backend
+from .cache_tags import RemoteTagIndex, TagIndex
+
+# Log di tier remote berisi digest yang di-purge, dibaca node lain untuk menghapus salinan lokalnya
+PURGE_LOG = 'purges'
+PURGE_POLL_INTERVAL = 1.0
 
 class FileCache:
-    def __init__(self):
+    def __init__(self, shared=None, remote=None):
         self.cache_dir = os.path.join(settings.BASE_DIR, 'api_cache')
         os.makedirs(self.cache_dir, exist_ok=True)
+        # Tier shared-memory opsional di depan disk (services/utils/shared_cache.py)
+        self.shared = shared
+        # Tier bersama antar node (services/utils/coordination.py), dicek sebelum disk
+        self.remote = remote
+        self._purges_seen = 0
+        self._purges_checked = None
+
+    def _digest(self, key):
+        # Hash key untuk nama file yang aman, dipakai juga sebagai key tier shared-memory
+        return hashlib.md5(key.encode()).digest()
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest.hex()}.json")
 
     def _get_file_path(self, key):
-        # Hash key untuk nama file yang aman
-        key_hash = hashlib.md5(key.encode()).hexdigest()
-        return os.path.join(self.cache_dir, f"{key_hash}.json")
+        return self._path(self._digest(key))
+
+    @property
+    def tags(self):
+        return TagIndex(os.path.join(self.cache_dir, 'tags'))
+
+    @property
+    def remote_tags(self):
+        """Index tag bersama di tier remote, atau None"""
+        if self.remote is None:
+            return None
+        return RemoteTagIndex(self.remote, self._remote_key)
+
+    def add_tags(self, digest, tags, ttl=None):
+        """`ttl`: sisa umur entry (detik), set tag di tier remote bertahan minimal selama itu"""
+        self.tags.add(digest, tags)
+        if self.remote is not None:
+            self.remote_tags.add(digest, tags, ttl)
 
-    def set(self, key, data, timeout=3600):
-        file_path = self._get_file_path(key)
+    def match(self, tags):
+        """Digest entry yang punya semua `tags`, dari index lokal dan index remote"""
+        digests = self.tags.match(tags)
+        if self.remote is not None:
+            digests |= self.remote_tags.match(tags)
+        return digests
+
+    def set(self, key, data, timeout=3600, stale_ttl=0, tags=None):
+        """
+        `stale_ttl`: berapa lama setelah expired data masih boleh dibaca lewat get_stale.
+        `tags`: tag untuk purge (services/utils/cache_tags.py).
+        """
+        digest = self._digest(key)
+        file_path = self._path(digest)
+        expires = (datetime.now() + timedelta(seconds=timeout)).timestamp()
         cache_data = {
             'data': data,
-            'expires': (datetime.now() + timedelta(seconds=timeout)).timestamp()
+            'expires': expires,
+            'stale_until': expires + stale_ttl
         }
+        if tags:
+            # Ikut disimpan supaya dump_cache/load_cache bisa membangun ulang index tag
+            cache_data['tags'] = list(tags)
+
+        if self.shared is not None:
+            # Bloom diisi sebelum file ditulis supaya worker lain tidak pernah melewatkan file ini
+            self.shared.add(digest)
 
         try:
             with open(file_path, 'w') as f:
                 json.dump(cache_data, f)
-            return True
+            if tags:
+                self.add_tags(digest, tags, cache_data['stale_until'] - datetime.now().timestamp())
         except Exception:
             return False
 
+        if self.shared is not None:
+            # Bisa saja rebuild_filter mereset bloom setelah add di atas tapi sebelum file ada
+            self.shared.add(digest)
+            self.shared.put(digest, json.dumps(data).encode(), expires)
+        if self.remote is not None:
+            remaining = cache_data['stale_until'] - datetime.now().timestamp()
+            self.remote.set(self._remote_key(digest), json.dumps(cache_data), remaining)
+        return True
+
+    def _remote_key(self, digest):
+        return f"cache:{digest.hex()}"
+
     def get(self, key):
-        file_path = self._get_file_path(key)
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        """Nilai untuk setiap key (None jika miss); tier remote dibaca dengan satu MGET"""
+        self._sync_purges()
+        digests = [self._digest(key) for key in keys]
+        results = [None] * len(keys)
+        pending = []
+        for index, digest in enumerate(digests):
+            payload = self.shared.get(digest) if self.shared is not None else None
+            if payload is not None:
+                results[index] = json.loads(payload)
+            else:
+                pending.append(index)
+
+        if self.remote is not None and pending:
+            documents = self.remote.get_many([self._remote_key(digests[index]) for index in pending])
+            still_pending = []
+            for index, document in zip(pending, documents):
+                cache_data = json.loads(document) if document is not None else None
+                if cache_data is not None and datetime.now().timestamp() <= cache_data['expires']:
+                    results[index] = cache_data['data']
+                    if self.shared is not None:
+                        self.shared.put(digests[index], json.dumps(cache_data['data']).encode(), cache_data['expires'])
+                else:
+                    still_pending.append(index)
+            pending = still_pending
 
+        for index in pending:
+            results[index] = self._get_file(digests[index])
+        return results
+
+    def _get_file(self, digest):
+        if self.shared is not None and not self.shared.might_contain(digest):
+            return None
+
+        file_path = self._path(digest)
         if not os.path.exists(file_path):
             return None
 
@@ -39,16 +144,50 @@ class FileCache:
                 cache_data = json.load(f)
 
             # Check expiration
-            if datetime.now().timestamp() > cache_data['expires']:
-                os.remove(file_path)
+            now = datetime.now().timestamp()
+            if now > cache_data['expires']:
+                if now > cache_data.get('stale_until', cache_data['expires']):
+                    os.remove(file_path)
                 return None
 
+            if self.shared is not None:
+                self.shared.put(digest, json.dumps(cache_data['data']).encode(), cache_data['expires'])
             return cache_data['data']
         except Exception:
             return None
 
+    def get_stale(self, key):
+        """Data yang mungkin sudah expired tapi masih dalam stale_ttl, atau None"""
+        self._sync_purges()
+        digest = self._digest(key)
+        cache_data = None
+        if self.remote is not None:
+            document = self.remote.get_many([self._remote_key(digest)])[0]
+            cache_data = json.loads(document) if document is not None else None
+        if cache_data is None:
+            if self.shared is not None and not self.shared.might_contain(digest):
+                return None
+            try:
+                with open(self._path(digest), 'r') as f:
+                    cache_data = json.load(f)
+            except Exception:
+                return None
+        if datetime.now().timestamp() > cache_data.get('stale_until', cache_data['expires']):
+            return None
+        return cache_data['data']
+
     def delete(self, key):
-        file_path = self._get_file_path(key)
+        return self._delete(self._digest(key))
+
+    def _delete(self, digest):
+        if self.remote is not None:
+            self.remote.delete(self._remote_key(digest))
+        return self._delete_local(digest)
+
+    def _delete_local(self, digest):
+        file_path = self._path(digest)
+        if self.shared is not None:
+            self.shared.delete(digest)
         try:
             if os.path.exists(file_path):
                 os.remove(file_path)
@@ -56,5 +195,57 @@ class FileCache:
         except Exception:
             return False
 
-# Singleton instance
-file_cache = FileCache()
+    def purge(self, tags):
+        """
+        Hapus semua entry yang punya semua `tags`; return jumlah entry yang dihapus. Dengan
+        tier remote, digest-nya juga dicatat di log purge supaya node lain menghapus file dan
+        slot shared-memory miliknya (lihat _sync_purges).
+        """
+        digests = self.match(tags)
+        if self.remote is not None:
+            live = self.remote.get_many([self._remote_key(digest) for digest in digests])
+        else:
+            live = [None] * len(digests)
+        purged = 0
+        for digest, document in zip(digests, live):
+            purged += document is not None or os.path.exists(self._path(digest))
+            self._delete(digest)
+        self.tags.discard(tags, digests)
+        if self.remote is not None and digests:
+            self.remote_tags.discard(tags, digests)
+            self.remote.append_log(PURGE_LOG, ' '.join(digest.hex() for digest in digests))
+        return purged
+
+    def _sync_purges(self):
+        """Hapus salinan lokal dari entry yang di-purge node lain, paling sering sekali per PURGE_POLL_INTERVAL"""
+        if self.remote is None:
+            return
+        now = time.monotonic()
+        if self._purges_checked is not None and now < self._purges_checked + PURGE_POLL_INTERVAL:
+            return
+        self._purges_checked = now
+        result = self.remote.read_log(PURGE_LOG, self._purges_seen)
+        if result is None:
+            return
+        self._purges_seen, entries = result
+        for entry in entries:
+            for digest in entry.split():
+                self._delete_local(bytes.fromhex(digest.decode()))
+
+    def compact_tags(self):
+        """Buang digest yang file-nya (atau entry remote-nya) sudah tidak ada dari index tag"""
+        removed = self.tags.compact(lambda digest: os.path.exists(self._path(digest)))
+        if self.remote is not None:
+            removed += self.remote_tags.compact()
+        return removed
+
+    def rebuild_filter(self):
+        """Bangun ulang bloom filter tier shared-memory dari isi cache dir"""
+        if self.shared is None:
+            return 0
+        return self.shared.rebuild_filter()
+
+# Singleton instance, dengan tier shared-memory (settings.SHARED_CACHE) dan tier
+# remote (settings.COORDINATION_BACKEND) jika aktif
+file_cache = FileCache(remote=coordination_backend)
+file_cache.shared = SharedMemoryCache.from_settings(file_cache.cache_dir)
@@ -0,0 +1,150 @@
+# services/utils/cache_snapshot.py
+"""
+Snapshot isi FileCache untuk warm start node baru (dump_cache / load_cache).
+
+Format: gzip, baris pertama header JSON, lalu satu baris per entry:
+    <digest hex>\t<expires>\t<tags (JSON list)>\t<dokumen cache apa adanya>
+Dokumen ditulis ulang byte-per-byte saat load (tanpa parse ulang), dan `expires` absolut
+dipertahankan sehingga sisa TTL sama dengan di node asal. Tag setiap entry dimasukkan ke
+index tag node tujuan sehingga entry hasil load tetap bisa di-purge. Entry yang sudah
+expired saat dump atau saat load dilewati. Snapshot versi 1 (tanpa kolom tags) masih bisa
+di-load.
+"""
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+FORMAT = 'api-cache-snapshot'
+VERSION = 2
+CHUNK_SIZE = 500
+
+
+class SnapshotError(ValueError):
+    """File snapshot tidak valid"""
+
+
+def _open(path, mode):
+    if path == '-':
+        stream = sys.stdout.buffer if 'w' in mode else sys.stdin.buffer
+        return gzip.GzipFile(fileobj=stream, mode=mode)
+    return gzip.open(path, mode)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _bounded_map(pool, fn, chunks, workers):
+    """Seperti pool.map, tapi hanya ~2x workers chunk di memory sehingga snapshot besar tetap streaming"""
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(fn, chunk))
+        if len(pending) >= workers * 2:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _read_entries(cache_dir, names, now):
+    lines = []
+    for name in names:
+        try:
+            with open(os.path.join(cache_dir, name), 'rb') as f:
+                raw = f.read()
+            document = json.loads(raw)
+            expires = document['expires']
+            tags = json.dumps(document.get('tags', [])).encode()
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+        if expires > now:
+            lines.append(b'%s\t%r\t%s\t%s\n' % (name[:-5].encode(), expires, tags, raw.strip()))
+    return lines
+
+
+def dump_snapshot(cache, path, workers=8):
+    """Tulis semua entry FileCache yang belum expired ke `path`; return jumlah entry"""
+    now = time.time()
+    names = [name for name in os.listdir(cache.cache_dir) if name.endswith('.json') and len(name) == 37]
+    count = 0
+    with _open(path, 'wb') as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        out.write(json.dumps({'format': FORMAT, 'version': VERSION, 'created': now}).encode() + b'\n')
+        read = lambda chunk: _read_entries(cache.cache_dir, chunk, now)
+        for lines in _bounded_map(pool, read, _chunks(names, CHUNK_SIZE), workers):
+            out.writelines(lines)
+            count += len(lines)
+    return count
+
+
+def _parse_line(line, version):
+    try:
+        if version == 1:
+            digest, expires, document = line.rstrip(b'\n').split(b'\t', 2)
+            tags = []
+        else:
+            digest, expires, tags, document = line.rstrip(b'\n').split(b'\t', 3)
+            tags = json.loads(tags)
+        raw_digest = bytes.fromhex(digest.decode())
+        expires = float(expires)
+    except ValueError:
+        raise SnapshotError(f"Invalid snapshot entry: {line[:80]!r}")
+    if len(raw_digest) != 16 or not isinstance(tags, list):
+        raise SnapshotError(f"Invalid snapshot entry: {line[:80]!r}")
+    return raw_digest, expires, tags, document
+
+
+def _write_entries(cache, lines, now, overwrite, version=VERSION):
+    loaded = skipped = 0
+    for line in lines:
+        digest, expires, tags, document = _parse_line(line, version)
+        file_path = os.path.join(cache.cache_dir, f"{digest.hex()}.json")
+        if expires <= now or (not overwrite and os.path.exists(file_path)):
+            skipped += 1
+            continue
+
+        # Tulis ke file sementara lalu rename, reader tidak pernah melihat file setengah jadi
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(document)
+        os.replace(tmp_path, file_path)
+        if tags:
+            cache.add_tags(digest, tags, expires - now)
+        loaded += 1
+    return loaded, skipped
+
+
+def load_snapshot(cache, path, workers=8, overwrite=False):
+    """
+    Muat snapshot ke cache dir secara paralel; return (loaded, skipped).
+    Entry yang sudah ada di node ini dilewati kecuali `overwrite`.
+    """
+    now = time.time()
+    loaded = skipped = 0
+    with _open(path, 'rb') as stream:
+        try:
+            header = json.loads(stream.readline())
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get('format') != FORMAT or header.get('version') not in (1, VERSION):
+            raise SnapshotError('Not a cache snapshot file')
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            chunks = _chunks((line for line in stream if line.strip()), CHUNK_SIZE)
+            write = lambda chunk: _write_entries(cache, chunk, now, overwrite, header['version'])
+            for chunk_loaded, chunk_skipped in _bounded_map(pool, write, chunks, workers):
+                loaded += chunk_loaded
+                skipped += chunk_skipped
+
+    # Entry baru harus terlihat oleh bloom filter tier shared-memory
+    cache.rebuild_filter()
+    return loaded, skipped
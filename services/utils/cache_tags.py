@@ -0,0 +1,190 @@
+# services/utils/cache_tags.py
+"""
+Index tag -> entry cache untuk invalidasi terarah.
+
+Setiap tag punya satu file di <cache_dir>/tags/ berisi digest 16 byte dari entry yang
+memakai tag itu (append dengan lock, sehingga aman antar process). Digest yang sudah ada
+di file tidak ditulis lagi, jadi refresh key yang sama tidak membuat file tumbuh. Purge
+hanya membaca file tag yang diminta, jadi biayanya sebanding dengan jumlah entry yang
+memakai tag itu, bukan jumlah seluruh file cache. Digest yang file-nya sudah tidak ada
+dibuang oleh `compact` (dipanggil cleanup_cache).
+
+Jika coordination backend dikonfigurasi, index yang sama juga disimpan di sana
+(RemoteTagIndex, satu Redis set per tag) sehingga purge di satu node menemukan entry yang
+ditulis node lain. Set tag expired bersama entry terlama di dalamnya.
+
+Tag yang dipakai APIClient:
+    service:<service>                  service:coingecko
+    endpoint:<service>:<path template> endpoint:coingecko:/coins/{id}
+    param:<name>=<value>               param:id=bitcoin
+"""
+import hashlib
+import os
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+DIGEST_SIZE = 16
+TAG_PREFIXES = ('service:', 'endpoint:', 'param:')
+# SADD, lalu perpanjang TTL set (tidak pernah memendekkan) sampai entry ini expired
+TAG_ADD_SCRIPT = (
+    "redis.call('sadd', KEYS[1], ARGV[1]) "
+    "if redis.call('pttl', KEYS[1]) < tonumber(ARGV[2]) then redis.call('pexpire', KEYS[1], ARGV[2]) end "
+    "return 1"
+)
+
+
+def _contains(raw, digest):
+    """Apakah `digest` ada di `raw` pada posisi kelipatan DIGEST_SIZE"""
+    index = raw.find(digest)
+    while index != -1:
+        if index % DIGEST_SIZE == 0:
+            return True
+        index = raw.find(digest, index + 1)
+    return False
+
+
+class TagIndex:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, tag):
+        return os.path.join(self.directory, f"{hashlib.md5(tag.encode()).hexdigest()}.tag")
+
+    def add(self, digest, tags, ttl=None):
+        """Tambah `digest` ke setiap tag (`ttl` hanya dipakai RemoteTagIndex)"""
+        os.makedirs(self.directory, exist_ok=True)
+        for tag in tags:
+            with open(self._path(tag), 'a+b') as f:
+                if fcntl is not None:
+                    # compact menulis ulang file di tempat dengan lock yang sama
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                f.seek(0)
+                if not _contains(f.read(), digest):
+                    f.write(digest)
+
+    def digests(self, tag):
+        try:
+            with open(self._path(tag), 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return set()
+        return {raw[i:i + DIGEST_SIZE] for i in range(0, len(raw) - DIGEST_SIZE + 1, DIGEST_SIZE)}
+
+    def match(self, tags):
+        """Digest entry yang punya semua `tags`"""
+        result = None
+        # Mulai dari tag dengan file terkecil supaya irisan tetap kecil
+        for tag in sorted(tags, key=self._size):
+            digests = self.digests(tag)
+            result = digests if result is None else result & digests
+            if not result:
+                return set()
+        return result or set()
+
+    def _size(self, tag):
+        try:
+            return os.path.getsize(self._path(tag))
+        except OSError:
+            return 0
+
+    def discard(self, tags, digests):
+        """Buang `digests` dari file tag (setelah purge)"""
+        for tag in tags:
+            self._rewrite(self._path(tag), lambda digest: digest not in digests)
+
+    def compact(self, exists):
+        """Tulis ulang setiap file tag tanpa duplikat dan tanpa digest yang exists(digest) False"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        return sum(
+            self._rewrite(os.path.join(self.directory, name), exists)
+            for name in names
+            if name.endswith('.tag')
+        )
+
+    def _rewrite(self, path, keep):
+        try:
+            f = open(path, 'r+b')
+        except FileNotFoundError:
+            return 0
+        with f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            raw = f.read()
+            entries = [raw[i:i + DIGEST_SIZE] for i in range(0, len(raw) - DIGEST_SIZE + 1, DIGEST_SIZE)]
+            kept = [digest for digest in dict.fromkeys(entries) if keep(digest)]
+            # Ditulis ulang di tempat (bukan rename) supaya append yang menunggu lock tidak hilang
+            f.seek(0)
+            f.write(b''.join(kept))
+            f.truncate()
+        return len(entries) - len(kept)
+
+
+class RemoteTagIndex:
+    """Index tag di coordination backend; `entry_name(digest)` adalah nama entry di tier remote"""
+
+    def __init__(self, backend, entry_name):
+        self.backend = backend
+        self.entry_name = entry_name
+
+    def _key(self, tag):
+        return self.backend.key(f"tag:{tag}")
+
+    def add(self, digest, tags, ttl=None):
+        """Tambah `digest` ke setiap tag; set tag bertahan minimal `ttl` detik (default tanpa expiry)"""
+        if not tags:
+            return
+        if ttl is None:
+            self.backend.execute(*[('SADD', self._key(tag), digest.hex()) for tag in tags])
+            return
+        ttl_ms = max(1, int(ttl * 1000))
+        self.backend.execute(*[('EVAL', TAG_ADD_SCRIPT, 1, self._key(tag), digest.hex(), ttl_ms) for tag in tags])
+
+    def digests(self, tag):
+        return self.match([tag])
+
+    def match(self, tags):
+        """Digest entry yang punya semua `tags` (set kosong jika backend tidak tersedia)"""
+        replies = self.backend.execute(('SINTER', *[self._key(tag) for tag in tags]))
+        if replies is None:
+            return set()
+        return {bytes.fromhex(member.decode()) for member in replies[0]}
+
+    def discard(self, tags, digests):
+        if digests:
+            members = [digest.hex() for digest in digests]
+            self.backend.execute(*[('SREM', self._key(tag), *members) for tag in tags])
+
+    def compact(self):
+        """Buang digest yang entry-nya sudah tidak ada di tier remote (expired atau dihapus)"""
+        removed = 0
+        cursor = b'0'
+        while True:
+            replies = self.backend.execute(('SCAN', cursor, 'MATCH', self._key('*'), 'COUNT', 500))
+            if replies is None:
+                return removed
+            cursor, keys = replies[0]
+            for key in keys:
+                removed += self._compact_set(key)
+            if cursor == b'0':
+                return removed
+
+    def _compact_set(self, key):
+        replies = self.backend.execute(('SMEMBERS', key))
+        members = replies[0] if replies is not None else []
+        if not members:
+            return 0
+        replies = self.backend.execute(*[
+            ('EXISTS', self.backend.key(self.entry_name(bytes.fromhex(member.decode())))) for member in members
+        ])
+        if replies is None:
+            return 0
+        missing = [member for member, exists in zip(members, replies) if not exists]
+        if missing:
+            self.backend.execute(('SREM', key, *missing))
+        return len(missing)
@@ -0,0 +1,153 @@
+# services/utils/circuit_breaker.py
+"""
+Circuit breaker per provider.
+
+Setelah `failure_threshold` kegagalan berturut-turut circuit terbuka (open) dan provider
+dilewati selama `cooldown` detik. Setelah itu satu request percobaan diizinkan (half-open);
+jika sukses circuit tertutup lagi, jika gagal terbuka lagi.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from .coordination import coordination_backend
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, cooldown=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return CLOSED
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self):
+        """True jika request boleh dikirim ke provider ini"""
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class SharedCircuitBreaker:
+    """
+    Circuit breaker dengan state di backend koordinasi, sehingga provider yang dibuka
+    satu node juga dilewati node lain. Waktu memakai wall clock karena dibagi antar host.
+    """
+
+    def __init__(self, name, backend, failure_threshold=5, cooldown=30):
+        self.name = name
+        self.backend = backend
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        # State dibuang jika tidak ada aktivitas selama beberapa cooldown
+        self.state_ttl = cooldown * 10
+        self._failures_key = f"cb:{name}:failures"
+        self._opened_key = f"cb:{name}:opened"
+        self._trial_key = f"cb:{name}:trial"
+
+    @property
+    def failures(self):
+        value = self.backend.get_many([self._failures_key])[0]
+        return int(value or 0)
+
+    @property
+    def state(self):
+        opened_at = self.backend.get_many([self._opened_key])[0]
+        if opened_at is None:
+            return CLOSED
+        if time.time() - float(opened_at) >= self.cooldown:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self):
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            # Satu percobaan untuk seluruh cluster
+            acquired, _ = self.backend.acquire(self._trial_key, self.cooldown)
+            return acquired
+        return False
+
+    def record_success(self):
+        self.backend.delete(self._failures_key, self._opened_key, self._trial_key)
+
+    def record_failure(self):
+        replies = self.backend.execute(
+            ('INCRBY', self.backend.key(self._failures_key), 1),
+            ('PEXPIRE', self.backend.key(self._failures_key), self.state_ttl * 1000),
+            ('GET', self.backend.key(self._opened_key)),
+            ('DEL', self.backend.key(self._trial_key)),
+        )
+        if replies is None:
+            return
+        failures, _, opened_at, _ = replies
+        if opened_at is not None or failures >= self.failure_threshold:
+            self.backend.set(self._opened_key, repr(time.time()), self.state_ttl)
+
+
+class CircuitBreakerRegistry:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def get(self, name):
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    config = getattr(settings, 'CIRCUIT_BREAKER', {})
+                    options = {
+                        'failure_threshold': config.get('failure_threshold', 5),
+                        'cooldown': config.get('cooldown', 30),
+                    }
+                    if self.backend is not None:
+                        breaker = SharedCircuitBreaker(name, self.backend, **options)
+                    else:
+                        breaker = CircuitBreaker(name, **options)
+                    self._breakers[name] = breaker
+        return breaker
+
+    def states(self):
+        return {name: breaker.state for name, breaker in sorted(self._breakers.items())}
+
+    def reset(self):
+        with self._lock:
+            self._breakers = {}
+
+
+# Singleton instance, state dibagi antar node jika COORDINATION_BACKEND dikonfigurasi
+circuit_breakers = CircuitBreakerRegistry(coordination_backend)
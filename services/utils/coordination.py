@@ -0,0 +1,292 @@
+# services/utils/coordination.py
+"""
+Backend koordinasi antar node (Redis) yang opsional.
+
+Tanpa settings.COORDINATION_BACKEND['url'] semua koordinasi tetap node-local. Jika diisi,
+backend ini dipakai untuk:
+- tier cache API bersama (FileCache.remote),
+- counter rate limit (rate_limiter.BackendCounterStore),
+- single-flight lock, sehingga satu key hanya di-fetch satu node pada satu waktu,
+- state circuit breaker (circuit_breaker.SharedCircuitBreaker),
+- index tag dan log purge, sehingga purge di satu node juga berlaku di node lain.
+
+Client RESP2 di sini minimal dan tanpa dependency: setiap `execute` mengirim semua command
+sekaligus (pipelining) dan membaca reply-nya berurutan. Backend fail-open: jika Redis tidak
+bisa dihubungi, operasi mengembalikan default dan backend dilewati selama `retry_interval`
+detik, sehingga node tetap jalan dengan koordinasi lokal.
+"""
+import logging
+import socket
+import threading
+import time
+import uuid
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Hapus lock hanya jika masih milik token yang sama
+UNLOCK_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+# Tambah entry "<nomor urut> <value>" ke log dan simpan hanya `keep` entry terakhir
+APPEND_LOG_SCRIPT = (
+    "local seq = redis.call('incr', KEYS[1]) "
+    "redis.call('rpush', KEYS[2], seq .. ' ' .. ARGV[1]) "
+    "redis.call('ltrim', KEYS[2], -tonumber(ARGV[2]), -1) "
+    "return seq"
+)
+
+
+class RedisError(Exception):
+    """Error reply dari Redis"""
+
+
+def encode_command(args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            value = arg
+        elif isinstance(arg, str):
+            value = arg.encode()
+        else:
+            value = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(value), value))
+    return b''.join(parts)
+
+
+def read_reply(stream):
+    line = stream.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError('Connection closed by Redis')
+    kind, body = line[:1], line[1:-2]
+    if kind == b'+':
+        return body.decode()
+    if kind == b'-':
+        return RedisError(body.decode())
+    if kind == b':':
+        return int(body)
+    if kind == b'$':
+        length = int(body)
+        if length < 0:
+            return None
+        data = stream.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        length = int(body)
+        if length < 0:
+            return None
+        return [read_reply(stream) for _ in range(length)]
+    raise ConnectionError(f"Unexpected Redis reply: {line!r}")
+
+
+class RedisConnection:
+    """Satu socket per thread; `execute(*commands)` adalah satu round trip"""
+
+    def __init__(self, url, timeout=0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock, self._local.stream = sock, sock.makefile('rb')
+
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            self._roundtrip(setup)
+
+    def _roundtrip(self, commands):
+        self._local.sock.sendall(b''.join(encode_command(command) for command in commands))
+        replies = [read_reply(self._local.stream) for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def execute(self, *commands):
+        if getattr(self._local, 'sock', None) is None:
+            self._connect()
+        try:
+            return self._roundtrip(commands)
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+
+    def close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = self._local.stream = None
+
+
+class CoordinationBackend:
+    def __init__(self, connection, prefix='api-aggregator:', retry_interval=5):
+        self.connection = connection
+        self.prefix = prefix
+        self.retry_interval = retry_interval
+        self._down_until = 0.0
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, 'COORDINATION_BACKEND', {})
+        if not config.get('url'):
+            return None
+        return cls(
+            RedisConnection(config['url'], timeout=config.get('timeout', 0.5)),
+            prefix=config.get('prefix', 'api-aggregator:'),
+            retry_interval=config.get('retry_interval', 5),
+        )
+
+    @property
+    def available(self):
+        return time.monotonic() >= self._down_until
+
+    def key(self, name):
+        return self.prefix + name
+
+    def execute(self, *commands):
+        """Reply untuk setiap command dalam satu pipeline, atau None jika backend tidak tersedia"""
+        if not self.available:
+            return None
+        try:
+            return self.connection.execute(*commands)
+        except (OSError, ConnectionError, RedisError) as e:
+            logger.warning(f"Coordination backend tidak tersedia: {str(e)}")
+            self._down_until = time.monotonic() + self.retry_interval
+            return None
+
+    # Cache
+
+    def get_many(self, names):
+        if not names:
+            return []
+        replies = self.execute(('MGET', *[self.key(name) for name in names]))
+        return replies[0] if replies is not None else [None] * len(names)
+
+    def set(self, name, value, ttl):
+        if ttl > 0:
+            self.execute(('SET', self.key(name), value, 'PX', int(ttl * 1000)))
+
+    def delete(self, *names):
+        if names:
+            self.execute(('DEL', *[self.key(name) for name in names]))
+
+    # Counters
+
+    def get_and_incr(self, get_name, incr_name, ttl, amount=1):
+        """(nilai get_name, nilai incr_name setelah increment) dalam satu round trip, atau None"""
+        replies = self.execute(
+            ('GET', self.key(get_name)),
+            ('INCRBY', self.key(incr_name), amount),
+            ('PEXPIRE', self.key(incr_name), int(ttl * 1000)),
+        )
+        if replies is None:
+            return None
+        return int(replies[0] or 0), replies[1]
+
+    def incr(self, name, ttl, amount=1):
+        replies = self.execute(
+            ('INCRBY', self.key(name), amount),
+            ('PEXPIRE', self.key(name), int(ttl * 1000)),
+        )
+        return None if replies is None else replies[0]
+
+    # Locks
+
+    def acquire(self, name, ttl):
+        """
+        (acquired, token). Jika backend tidak tersedia request tetap jalan tanpa lock:
+        (True, None).
+        """
+        token = uuid.uuid4().hex
+        replies = self.execute(('SET', self.key(name), token, 'NX', 'PX', int(ttl * 1000)))
+        if replies is None:
+            return True, None
+        return replies[0] is not None, token
+
+    def release(self, name, token):
+        if token is not None:
+            self.execute(('EVAL', UNLOCK_SCRIPT, 1, self.key(name), token))
+
+    def exists(self, name):
+        replies = self.execute(('EXISTS', self.key(name)))
+        return bool(replies and replies[0])
+
+    # Log
+
+    def append_log(self, name, value, keep=100):
+        """Tambah `value` ke log `name`; return nomor urut entry, atau None"""
+        replies = self.execute(('EVAL', APPEND_LOG_SCRIPT, 2, self.key(f"{name}:seq"), self.key(name), value, keep))
+        return None if replies is None else replies[0]
+
+    def read_log(self, name, after, keep=100):
+        """
+        (nomor urut terakhir, [value entry dengan nomor > after]), atau None jika backend tidak
+        tersedia. Log yang lebih pendek dari `after` (Redis di-reset) dibaca dari awal.
+        """
+        replies = self.execute(('GET', self.key(f"{name}:seq")))
+        if replies is None:
+            return None
+        seq = int(replies[0] or 0)
+        if seq == after:
+            return seq, []
+        if seq < after:
+            after = 0
+        replies = self.execute(('LRANGE', self.key(name), -keep, -1))
+        if replies is None:
+            return None
+        values = []
+        for entry in replies[0]:
+            number, _, value = entry.partition(b' ')
+            if int(number) > after:
+                seq = max(seq, int(number))
+                values.append(value)
+        return seq, values
+
+
+class SingleFlight:
+    """
+    Satu fetch per key di seluruh cluster. Node yang tidak mendapat lock menunggu
+    `lookup()` (cache) terisi oleh leader; jika leader selesai tanpa mengisi cache
+    (misalnya error) atau menunggu terlalu lama, node itu fetch sendiri.
+    """
+
+    def __init__(self, backend, poll_interval=0.05):
+        self.backend = backend
+        self.poll_interval = poll_interval
+
+    def run(self, key, fetch, lookup, timeout):
+        name = f"sf:{key}"
+        acquired, token = self.backend.acquire(name, timeout)
+        if acquired:
+            try:
+                return fetch()
+            finally:
+                self.backend.release(name, token)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            value = lookup()
+            if value is not None:
+                return value
+            if not self.backend.exists(name):
+                break
+        return fetch()
+
+
+# Singleton instance (None jika COORDINATION_BACKEND tidak dikonfigurasi)
+coordination_backend = CoordinationBackend.from_settings()
+single_flight = SingleFlight(coordination_backend) if coordination_backend is not None else None
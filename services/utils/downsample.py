@@ -0,0 +1,99 @@
+# services/utils/downsample.py
+"""
+Downsampling series [[timestamp, value], ...] untuk chart.
+
+lttb   - Largest-Triangle-Three-Buckets, mempertahankan bentuk visual series
+minmax - nilai minimum dan maksimum per bucket, mempertahankan puncak dan lembah
+"""
+import numpy as np
+
+METHODS = ('lttb', 'minmax')
+
+
+def _as_array(series):
+    data = np.asarray(series, dtype=np.float64)
+    if data.ndim != 2 or data.shape[1] < 2:
+        raise ValueError("series harus berbentuk [[timestamp, value], ...]")
+    return data[:, :2]
+
+
+def _to_list(data):
+    return [[int(ts), None if np.isnan(value) else float(value)] for ts, value in data]
+
+
+def lttb(series, points):
+    data = _as_array(series)
+    n = len(data)
+    if points >= n or points < 3:
+        return series
+
+    x = data[:, 0]
+    y = np.nan_to_num(data[:, 1])
+
+    # Titik pertama dan terakhir selalu dipertahankan, sisanya dibagi rata ke (points - 2) bucket
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    # Rata-rata bucket berikutnya untuk semua bucket sekaligus; bucket terakhir memakai titik terakhir
+    starts = edges[1:-1]
+    if len(starts):
+        counts = np.diff(np.append(starts, n - 1))
+        avg_x = np.append(np.add.reduceat(x[:n - 1], starts) / counts, x[-1])
+        avg_y = np.append(np.add.reduceat(y[:n - 1], starts) / counts, y[-1])
+    else:
+        avg_x, avg_y = x[-1:], y[-1:]
+
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        bx = x[start:end]
+        by = y[start:end]
+        # Luas segitiga (dikali 2) antara titik terpilih sebelumnya, kandidat, dan rata-rata bucket berikutnya
+        area = np.abs(
+            (x[previous] - avg_x[bucket]) * (by - y[previous])
+            - (x[previous] - bx) * (avg_y[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+
+    return _to_list(data[selected])
+
+
+def minmax(series, points):
+    data = _as_array(series)
+    n = len(data)
+    if points >= n or points < 2:
+        return series
+
+    buckets = max(1, points // 2)
+    bucket_ids = np.minimum((np.arange(n) * buckets) // n, buckets - 1)
+    y = data[:, 1]
+
+    # lexsort: urutkan per bucket lalu per nilai; elemen pertama/terakhir tiap bucket = min/max
+    order = np.lexsort((y, bucket_ids))
+    sorted_buckets = bucket_ids[order]
+    first = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+
+    selected = np.unique(np.concatenate([order[first], order[last]]))
+    return _to_list(data[selected])
+
+
+def downsample(series, points, method='lttb'):
+    if not series:
+        return series
+    if method == 'minmax':
+        return minmax(series, points)
+    return lttb(series, points)
+
+
+def downsample_chart(chart, points, method='lttb'):
+    """Downsample setiap series di response market_chart (prices, market_caps, total_volumes)"""
+    if not isinstance(chart, dict):
+        return chart
+    return {
+        key: downsample(value, points, method) if isinstance(value, list) else value
+        for key, value in chart.items()
+    }
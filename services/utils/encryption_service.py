@@ -2,24 +2,70 @@
 # cryptography==3.4.8
 
 # services/encryption_service.py
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from functools import lru_cache
 import base64
-import os
+import threading
 from django.conf import settings
 
+
+@lru_cache(maxsize=None)
+def derive_key(secret_key):
+    """Derive Fernet key dari secret (PBKDF2, mahal - hanya dihitung sekali per secret)"""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=secret_key.encode()[:16].ljust(16, b'0'),
+        iterations=100000,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(secret_key.encode()))
+
+
 class EncryptionService:
+    """
+    Key Fernet baru dibuat saat pertama kali dipakai, bukan saat import.
+
+    Jika settings.ENCRYPTION_KEY diisi, key tersebut dipakai langsung tanpa PBKDF2.
+    Kalau tidak, key diderive dari SECRET_KEY. Key di settings.ENCRYPTION_OLD_KEYS
+    tetap bisa decrypt data lama sampai semua data di-rotate ke key utama.
+    """
+
     def __init__(self):
-        # Generate key dari Django SECRET_KEY
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=settings.SECRET_KEY.encode()[:16].ljust(16, b'0'),
-            iterations=100000,
-        )
-        self.key = base64.urlsafe_b64encode(kdf.derive(settings.SECRET_KEY.encode()))
-        self.fernet = Fernet(self.key)
+        self._fernet = None
+        self._lock = threading.Lock()
+
+    @property
+    def key(self):
+        """Key utama yang dipakai untuk encrypt"""
+        return self._get_keys()[0]
+
+    @property
+    def fernet(self):
+        if self._fernet is None:
+            with self._lock:
+                if self._fernet is None:
+                    self._fernet = MultiFernet([Fernet(key) for key in self._get_keys()])
+        return self._fernet
+
+    def reset(self):
+        """Buang key yang sudah dimuat, misalnya setelah settings berubah"""
+        with self._lock:
+            self._fernet = None
+
+    def _get_keys(self):
+        primary = getattr(settings, 'ENCRYPTION_KEY', None)
+        if primary:
+            primary = primary.encode() if isinstance(primary, str) else primary
+        else:
+            primary = derive_key(settings.SECRET_KEY)
+
+        old_keys = [
+            key.encode() if isinstance(key, str) else key
+            for key in getattr(settings, 'ENCRYPTION_OLD_KEYS', [])
+        ]
+        return [primary] + [key for key in old_keys if key != primary]
 
     def encrypt(self, text):
         """Encrypt text dan return base64 string"""
@@ -39,5 +85,16 @@ class EncryptionService:
         except Exception:
             return None
 
+    def rotate(self, encrypted_text):
+        """Re-encrypt data lama dengan key utama, return None jika tidak bisa didecrypt"""
+        if not encrypted_text:
+            return None
+        try:
+            encrypted_bytes = base64.urlsafe_b64decode(encrypted_text.encode())
+            rotated = self.fernet.rotate(encrypted_bytes)
+            return base64.urlsafe_b64encode(rotated).decode()
+        except Exception:
+            return None
+
 # Singleton instance
 encryption_service = EncryptionService()
@@ -0,0 +1,138 @@
+# services/utils/github_batch.py
+"""
+Lookup banyak user GitHub sekaligus.
+
+Username yang belum di-cache di-resolve lewat GraphQL (satu query beralias per chunk),
+hasilnya diubah ke bentuk response REST /users/{username} dan ditulis ke cache entry
+yang sama dengan /api/github/user/. GraphQL butuh token; tanpa token setiap user
+di-request lewat REST seperti biasa.
+"""
+CHUNK_SIZE = 50
+
+OWNER_FIELDS = """
+__typename
+login
+avatarUrl
+url
+... on User {
+  databaseId name company websiteUrl location email bio twitterUsername createdAt updatedAt
+  repositories(privacy: PUBLIC) { totalCount }
+  gists(privacy: PUBLIC) { totalCount }
+  followers { totalCount }
+  following { totalCount }
+}
+... on Organization {
+  databaseId name websiteUrl location email description twitterUsername createdAt updatedAt
+  repositories(privacy: PUBLIC) { totalCount }
+}
+"""
+
+
+def build_query(logins):
+    """Query beralias (u0, u1, ...) dengan login sebagai variable, bukan interpolasi string"""
+    variables = ', '.join(f'$l{i}: String!' for i in range(len(logins)))
+    fields = '\n'.join(f'u{i}: repositoryOwner(login: $l{i}) {{ {OWNER_FIELDS} }}' for i in range(len(logins)))
+    return {
+        'query': f'query({variables}) {{\n{fields}\n}}',
+        'variables': {f'l{i}': login for i, login in enumerate(logins)},
+    }
+
+
+def _count(node, field):
+    value = node.get(field)
+    return value.get('totalCount', 0) if isinstance(value, dict) else 0
+
+
+def to_rest_user(node):
+    """Node GraphQL -> bentuk response REST /users/{username}"""
+    is_user = node.get('__typename') == 'User'
+    return {
+        'login': node.get('login'),
+        'id': node.get('databaseId'),
+        'avatar_url': node.get('avatarUrl'),
+        'html_url': node.get('url'),
+        'type': node.get('__typename'),
+        'name': node.get('name'),
+        'company': node.get('company'),
+        'blog': node.get('websiteUrl') or '',
+        'location': node.get('location'),
+        # GraphQL memberi '' untuk email yang tidak publik, REST memberi null
+        'email': node.get('email') or None,
+        'bio': node.get('bio') if is_user else node.get('description'),
+        'twitter_username': node.get('twitterUsername'),
+        'public_repos': _count(node, 'repositories'),
+        'public_gists': _count(node, 'gists'),
+        'followers': _count(node, 'followers'),
+        'following': _count(node, 'following'),
+        'created_at': node.get('createdAt'),
+        'updated_at': node.get('updatedAt'),
+    }
+
+
+class GitHubUserBatch:
+    def __init__(self, client, spec, user=None, chunk_size=CHUNK_SIZE):
+        # spec adalah Endpoint single-user (github-user)
+        self.client = client
+        self.spec = spec
+        self.user = user
+        self.chunk_size = chunk_size
+
+    def _user_path(self, login):
+        return self.spec.path.format(username=login)
+
+    def fetch(self, logins, graphql=True):
+        """logins: username lowercase -> {'users': [...], 'errors': {login: message}}"""
+        results = {}
+        errors = {}
+        missing = []
+
+        cached_documents = self.client.get_cached_many(
+            self.spec.service, [(self._user_path(login), {}) for login in logins]
+        )
+        for login, cached in zip(logins, cached_documents):
+            if isinstance(cached, dict) and 'error' in cached:
+                # Negative cache (misalnya user 404) tetap dilaporkan sebagai error
+                errors[login] = cached['error']
+            elif cached is not None:
+                results[login] = cached
+            else:
+                missing.append(login)
+
+        if graphql:
+            for start in range(0, len(missing), self.chunk_size):
+                self._fetch_chunk(missing[start:start + self.chunk_size], results, errors)
+        else:
+            for login in missing:
+                data = self.client.make_request(
+                    self.spec.service, self._user_path(login), params={}, user=self.user, spec=self.spec
+                )
+                if isinstance(data, dict) and 'error' in data:
+                    errors[login] = data['error']
+                else:
+                    results[login] = data
+
+        return {
+            'users': [results[login] for login in logins if login in results],
+            'errors': errors,
+        }
+
+    def _fetch_chunk(self, logins, results, errors):
+        data = self.client.make_request(
+            self.spec.service, '/graphql', user=self.user, json_body=build_query(logins)
+        )
+        if not isinstance(data, dict) or 'error' in data or not isinstance(data.get('data'), dict):
+            message = data.get('error') if isinstance(data, dict) and 'error' in data else 'Invalid response from upstream'
+            errors.update((login, message) for login in logins)
+            return
+
+        for i, login in enumerate(logins):
+            node = data['data'].get(f'u{i}')
+            if not node:
+                errors[login] = 'Not Found'
+                continue
+            document = to_rest_user(node)
+            if self.spec.transform is not None:
+                document = self.spec.transform(document)
+            path = self._user_path(login)
+            self.client.set_cached(self.spec.service, path, {}, document, self.spec.get_ttl({}), spec=self.spec)
+            results[login] = document
@@ -0,0 +1,65 @@
+# services/utils/history_store.py
+from datetime import datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from services.models import CoinHistorySnapshot
+
+DATE_FORMAT = "%d-%m-%Y"
+
+
+def parse_date(value):
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+
+def is_immutable(date):
+    """Data tanggal yang sudah lewat (UTC) tidak berubah lagi"""
+    return date < timezone.now().date()
+
+
+class HistoryStore:
+    """Penyimpanan permanen snapshot history coin per (coin, tanggal)"""
+
+    def get(self, coin_id, date):
+        return CoinHistorySnapshot.objects.filter(coin_id=coin_id, date=date).values_list('data', flat=True).first()
+
+    def save(self, coin_id, date, data):
+        if not is_immutable(date):
+            return False
+        try:
+            with transaction.atomic():
+                CoinHistorySnapshot.objects.create(coin_id=coin_id, date=date, data=data)
+        except IntegrityError:
+            # Sudah disimpan oleh request lain
+            return False
+        return True
+
+    def get_range(self, coin_id, start, end):
+        """Return ({'dd-mm-yyyy': data}, [tanggal yang belum ada di store])"""
+        rows = CoinHistorySnapshot.objects.filter(
+            coin_id=coin_id, date__gte=start, date__lte=end
+        ).order_by('date').values_list('date', 'data')
+
+        snapshots = {date.strftime(DATE_FORMAT): data for date, data in rows}
+        missing = []
+        day = start
+        while day <= end:
+            key = day.strftime(DATE_FORMAT)
+            if key not in snapshots:
+                missing.append(key)
+            day += timedelta(days=1)
+        return snapshots, missing
+
+    def bulk_load(self, records, batch_size=1000):
+        """Load banyak (coin_id, date, data) sekaligus, snapshot yang sudah ada dilewati"""
+        objects = [
+            CoinHistorySnapshot(coin_id=coin_id, date=date, data=data)
+            for coin_id, date, data in records
+            if is_immutable(date)
+        ]
+        CoinHistorySnapshot.objects.bulk_create(objects, batch_size=batch_size, ignore_conflicts=True)
+        return len(objects)
+
+
+# Singleton instance
+history_store = HistoryStore()
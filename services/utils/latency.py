@@ -0,0 +1,142 @@
+# services/utils/latency.py
+"""
+Latency upstream per service.
+
+Setiap service menyimpan sampel latency terakhir (rolling window) untuk menghitung
+percentile. Dari situ diturunkan timeout adaptif (kelipatan p99, dibatasi min/max) dan
+ambang hedging (p95). HedgeBudget membatasi tambahan beban upstream dari hedging.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+from django.conf import settings
+
+DEFAULTS = {
+    'window': 256,
+    'min_samples': 20,
+    'timeout_multiplier': 3.0,
+    'min_timeout': 2.0,
+    'max_timeout': 15.0,
+    'hedge': False,
+    'hedge_percentile': 95,
+}
+
+
+def service_config(service_name):
+    config = getattr(settings, 'UPSTREAM_LATENCY', {})
+    return {**DEFAULTS, **config.get('default', {}), **config.get(service_name, {})}
+
+
+class LatencyTracker:
+    def __init__(self, window=256):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, latency_ms):
+        with self._lock:
+            self._samples.append(latency_ms)
+            self.count += 1
+
+    def percentile(self, p):
+        with self._lock:
+            samples = list(self._samples)
+        if not samples:
+            return None
+        return float(np.percentile(samples, p))
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class HedgeBudget:
+    """
+    Token bucket: setiap request menambah `ratio` token, setiap hedge memakai satu token.
+    Dengan ratio 0.1 hedging menambah paling banyak ~10% request upstream.
+    """
+
+    def __init__(self, ratio=0.1, burst=10):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+        self.spent = 0
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.spent += 1
+            return True
+
+
+class LatencyRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trackers = {}
+        self._budgets = {}
+
+    def tracker(self, service_name):
+        tracker = self._trackers.get(service_name)
+        if tracker is None:
+            with self._lock:
+                tracker = self._trackers.setdefault(
+                    service_name, LatencyTracker(service_config(service_name)['window'])
+                )
+        return tracker
+
+    def budget(self, service_name):
+        budget = self._budgets.get(service_name)
+        if budget is None:
+            with self._lock:
+                budget = self._budgets.setdefault(
+                    service_name, HedgeBudget(getattr(settings, 'HEDGE_BUDGET', 0.1))
+                )
+        return budget
+
+    def record(self, service_name, latency_ms):
+        self.tracker(service_name).record(latency_ms)
+
+    def timeout_for(self, service_name, default=15):
+        """Timeout (detik): timeout_multiplier x p99, atau `default` jika sampel belum cukup"""
+        config = service_config(service_name)
+        tracker = self.tracker(service_name)
+        if len(tracker) < config['min_samples']:
+            return default
+        timeout = config['timeout_multiplier'] * tracker.percentile(99) / 1000
+        return min(config['max_timeout'], max(config['min_timeout'], timeout))
+
+    def hedge_delay(self, service_name):
+        """Detik sebelum hedge dikirim, atau None jika hedging tidak aktif/sampel belum cukup"""
+        config = service_config(service_name)
+        tracker = self.tracker(service_name)
+        if not config['hedge'] or len(tracker) < config['min_samples']:
+            return None
+        return tracker.percentile(config['hedge_percentile']) / 1000
+
+    def stats(self):
+        return {
+            name: {
+                'samples': len(tracker),
+                'p50_ms': tracker.percentile(50),
+                'p95_ms': tracker.percentile(95),
+                'p99_ms': tracker.percentile(99),
+                'hedges': self._budgets[name].spent if name in self._budgets else 0,
+            }
+            for name, tracker in sorted(self._trackers.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._trackers = {}
+            self._budgets = {}
+
+
+# Singleton instance
+upstream_latency = LatencyRegistry()
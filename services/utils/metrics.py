@@ -0,0 +1,262 @@
+# services/utils/metrics.py
+"""
+Instrumentasi hot path: durasi per fase request (Server-Timing) dan metrics format
+Prometheus tanpa dependency.
+
+`phase(name)` mengukur satu fase (auth, ratelimit, cache, upstream, retry, log) untuk
+request yang sedang berjalan. Fase boleh bersarang; waktu fase anak tidak dihitung lagi di
+fase induknya, sehingga jumlah semua fase <= total. Di luar request (command, thread
+hedging) `phase` tidak mencatat apa-apa.
+
+Counter dan histogram disimpan per process (seperti latency dan admission control), gauge
+seperti state circuit breaker dibaca dari singleton masing-masing saat di-scrape.
+"""
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from .adaptive_ttl import adaptive_ttl
+from .admission import admission_control
+from .cache_service import file_cache
+from .circuit_breaker import CLOSED, HALF_OPEN, OPEN, circuit_breakers
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CIRCUIT_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# {'timings': {fase: detik}, 'stack': [[fase, mulai, waktu anak]]} untuk request saat ini
+_request = ContextVar('server_timing', default=None)
+
+
+def start_request():
+    return _request.set({'timings': {}, 'stack': []})
+
+
+def finish_request(token):
+    """Durasi per fase (detik) dari request yang dimulai dengan start_request"""
+    timings = _request.get()['timings']
+    _request.reset(token)
+    return timings
+
+
+@contextmanager
+def phase(name):
+    state = _request.get()
+    if state is None:
+        yield
+        return
+    frame = [name, perf_counter(), 0.0]
+    state['stack'].append(frame)
+    try:
+        yield
+    finally:
+        state['stack'].pop()
+        elapsed = perf_counter() - frame[1]
+        timings = state['timings']
+        timings[name] = timings.get(name, 0.0) + elapsed - frame[2]
+        if state['stack']:
+            state['stack'][-1][2] += elapsed
+
+
+def server_timing(timings, total):
+    """Nilai header Server-Timing (milidetik)"""
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ', '.join(entries)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label: [jumlah per bucket (non-kumulatif, + satu untuk +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return sum(series[0]) if series is not None else 0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+
+class Gauge:
+    """
+    Nilai yang dibaca dari `collect()` -> {label values: nilai} saat scrape. `type` 'counter'
+    untuk counter yang sudah dihitung di tempat lain (misalnya SharedMemoryCache.stats).
+    """
+
+    def __init__(self, name, help, labels, collect, type='gauge'):
+        self.type = type
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def samples(self):
+        return [
+            f"{self.name}{_labels(self.labels, key)} {_number(value)}"
+            for key, value in sorted(self.collect().items())
+            if value is not None
+        ]
+
+    def reset(self):
+        pass
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, labels, collect, type='gauge'):
+        return self.register(Gauge(name, help, labels, collect, type))
+
+    def render(self):
+        """Semua metrics dalam text exposition format Prometheus"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+def _shared_cache_stats():
+    shared = file_cache.shared
+    if shared is None:
+        return {}
+    return {(result,): value for result, value in shared.stats().items()}
+
+
+def _limiter_stat(field):
+    return lambda: {(name,): stats[field] for name, stats in admission_control.stats().items()}
+
+
+def _ttl_stat(field):
+    return lambda: {(name,): stats[field] for name, stats in adaptive_ttl.stats().items()}
+
+
+# Singleton instance
+metrics = MetricsRegistry()
+
+REQUEST_DURATION = metrics.histogram(
+    'api_request_duration_seconds', 'Request duration by route, method and status',
+    ('route', 'method', 'status'),
+)
+PHASE_DURATION = metrics.histogram(
+    'api_request_phase_seconds', 'Time spent in each request phase (auth, ratelimit, cache, upstream, retry, log)',
+    ('phase',),
+)
+UPSTREAM_LATENCY = metrics.histogram(
+    'api_upstream_latency_seconds', 'Latency of single upstream HTTP attempts', ('service',),
+)
+CACHE_LOOKUPS = metrics.counter(
+    'api_cache_lookups_total', 'API cache lookups by service and result (hit, miss, stale)', ('service', 'result'),
+)
+UPSTREAM_RETRIES = metrics.counter(
+    'api_upstream_retries_total', 'Upstream attempts retried after 429/5xx or a connection error', ('service',),
+)
+metrics.gauge(
+    'api_circuit_breaker_state', 'Provider circuit state (0 closed, 1 half-open, 2 open)', ('service',),
+    lambda: {(name,): CIRCUIT_STATE_VALUES[state] for name, state in circuit_breakers.states().items()},
+)
+metrics.gauge('api_admission_limit', 'Adaptive in-flight limit per service', ('service',), _limiter_stat('limit'))
+metrics.gauge('api_admission_in_flight', 'Upstream requests in flight', ('service',), _limiter_stat('in_flight'))
+metrics.gauge(
+    'api_admission_shed_total', 'Requests shed by admission control', ('service',), _limiter_stat('shed'), 'counter',
+)
+metrics.gauge('api_cache_ttl_seconds', 'Learned cache TTL per endpoint', ('endpoint',), _ttl_stat('ttl'))
+metrics.gauge(
+    'api_cache_change_rate', 'Share of refreshes whose body changed (EWMA)', ('endpoint',), _ttl_stat('change_rate'),
+)
+metrics.gauge(
+    'api_shared_cache_lookups_total', 'Shared-memory cache tier lookups (hits, misses, filtered)', ('result',),
+    _shared_cache_stats, 'counter',
+)
@@ -0,0 +1,115 @@
+# services/utils/price_batcher.py
+"""
+Micro-batching untuk CoinGecko /simple/price.
+
+Request yang datang bersamaan dalam window beberapa milidetik digabung: request pertama
+menjadi leader, menunggu selama window, lalu mengirim satu request upstream dengan gabungan
+ids dan vs_currencies. Hasilnya dipecah lagi untuk setiap request yang menunggu.
+Batching terjadi antar thread dalam satu process (worker gthread/ASGI), jadi nonaktif secara
+default (SIMPLE_PRICE_BATCH_WINDOW_MS = 0). Jika aktif, leader hanya menunggu window saat ada
+request /simple/price lain yang sedang berjalan di process ini; request tunggal (misalnya di
+worker sync) langsung diteruskan tanpa jeda.
+"""
+import threading
+
+from django.conf import settings
+from services.providers import provider_router
+
+MAX_IDS = 250
+WAIT_TIMEOUT = 60
+
+
+def split_prices(data, ids, vs_currencies):
+    """Ambil bagian response gabungan yang diminta satu request"""
+    return {
+        coin_id: {key: value for key, value in data[coin_id].items() if key.split('_')[0] in vs_currencies}
+        for coin_id in ids
+        if isinstance(data.get(coin_id), dict)
+    }
+
+
+class _Batch:
+    def __init__(self):
+        self.ids = set()
+        self.vs_currencies = set()
+        self.done = threading.Event()
+        self.result = None
+
+
+class PriceBatcher:
+    def __init__(self, window_ms=None, max_ids=MAX_IDS):
+        self._window_ms = window_ms
+        self.max_ids = max_ids
+        self._lock = threading.Lock()
+        self._pending = None
+        self._in_flight = 0
+
+    @property
+    def window(self):
+        window_ms = self._window_ms
+        if window_ms is None:
+            window_ms = getattr(settings, 'SIMPLE_PRICE_BATCH_WINDOW_MS', 0)
+        return window_ms / 1000
+
+    def get(self, client, ids, vs_currencies, user=None, spec=None):
+        """
+        Harga untuk `ids` x `vs_currencies` (list), lewat batch bersama request lain
+        yang datang dalam window yang sama.
+        """
+        if self.window <= 0:
+            return self._fetch(client, ids, vs_currencies, user, spec)
+
+        with self._lock:
+            self._in_flight += 1
+            batch = self._pending
+            leader = batch is None or len(batch.ids | set(ids)) > self.max_ids
+            if leader:
+                batch = self._pending = _Batch()
+            batch.ids.update(ids)
+            batch.vs_currencies.update(vs_currencies)
+
+        try:
+            if leader:
+                self._flush(batch, client, user, spec)
+            elif not batch.done.wait(WAIT_TIMEOUT):
+                return {'error': 'Request timeout untuk coingecko'}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        data = batch.result
+        if isinstance(data, dict) and 'error' in data:
+            return data
+        return split_prices(data, ids, set(vs_currencies))
+
+    def _flush(self, batch, client, user, spec):
+        # Beri waktu request lain untuk bergabung, hanya jika memang ada request bersamaan
+        if self._in_flight > 1:
+            batch.done.wait(self.window)
+        with self._lock:
+            if self._pending is batch:
+                self._pending = None
+        try:
+            batch.result = self._fetch(client, sorted(batch.ids), sorted(batch.vs_currencies), user, spec)
+        except Exception as e:
+            batch.result = {'error': f"API request failed: {str(e)}"}
+            raise
+        finally:
+            batch.done.set()
+
+    def _fetch(self, client, ids, vs_currencies, user, spec):
+        params = {'ids': ','.join(ids), 'vs_currencies': ','.join(vs_currencies)}
+        data = provider_router.call(client, 'crypto_price', 'simple_price', params, user=user, spec=spec)
+        if data is not None:
+            return data
+        return client.make_request(
+            'coingecko',
+            '/simple/price',
+            params=params,
+            user=user,
+            spec=spec
+        )
+
+
+# Singleton instance
+price_batcher = PriceBatcher()
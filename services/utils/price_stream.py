@@ -0,0 +1,159 @@
+# services/utils/price_stream.py
+"""
+Hub untuk stream harga (SSE).
+
+Satu poller thread per process mengambil /simple/price untuk gabungan ids dan
+vs_currencies dari semua subscriber dengan interval PRICE_STREAM_INTERVAL, lalu hanya
+mengirim nilai yang berubah ke setiap subscriber. Poller berhenti sendiri saat tidak ada
+subscriber. Pengiriman ke subscriber lewat loop.call_soon_threadsafe sehingga hub bisa
+dipakai dari event loop mana pun (ASGI maupun runserver).
+"""
+import asyncio
+import itertools
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self, subscription_id, ids, vs_currencies, loop):
+        self.id = subscription_id
+        self.ids = set(ids)
+        self.vs_currencies = set(vs_currencies)
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def select(self, prices, pairs=None):
+        """Bagian `prices` yang di-subscribe, opsional dibatasi ke pasangan (coin, currency) tertentu"""
+        selected = {}
+        for coin_id in self.ids:
+            for currency, value in (prices.get(coin_id) or {}).items():
+                if currency in self.vs_currencies and (pairs is None or (coin_id, currency) in pairs):
+                    selected.setdefault(coin_id, {})[currency] = value
+        return selected
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+        except RuntimeError:
+            # Event loop subscriber sudah ditutup
+            pass
+
+
+class PriceStreamHub:
+    def __init__(self, interval=None, client_factory=None):
+        self._interval = interval
+        self._client_factory = client_factory
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+        self._prices = {}
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._wakeup = threading.Event()
+
+    @property
+    def interval(self):
+        if self._interval is not None:
+            return self._interval
+        return getattr(settings, 'PRICE_STREAM_INTERVAL', 10)
+
+    def subscribe(self, ids, vs_currencies, loop=None):
+        subscription = Subscription(next(self._ids), ids, vs_currencies, loop or asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[subscription.id] = subscription
+            snapshot = subscription.select(self._prices)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='price-stream-poller', daemon=True)
+                self._thread.start()
+            else:
+                # Ids baru sebaiknya tidak menunggu satu interval penuh
+                self._wakeup.set()
+
+        if snapshot:
+            subscription.deliver(snapshot)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.pop(subscription.id, None)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+    def wanted(self):
+        """Gabungan (ids, vs_currencies) semua subscriber"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        ids = set().union(*(s.ids for s in subscriptions)) if subscriptions else set()
+        vs_currencies = set().union(*(s.vs_currencies for s in subscriptions)) if subscriptions else set()
+        return ids, vs_currencies
+
+    def poll_once(self, client):
+        """Satu putaran poll: ambil harga gabungan, kirim perubahan; return jumlah pasangan yang berubah"""
+        ids, vs_currencies = self.wanted()
+        if not ids:
+            return 0
+
+        data = client.make_request(
+            'coingecko',
+            '/simple/price',
+            params={'ids': ','.join(sorted(ids)), 'vs_currencies': ','.join(sorted(vs_currencies))},
+            use_cache=False
+        )
+        if not isinstance(data, dict) or 'error' in data:
+            logger.warning(f"Price stream poll failed: {data}")
+            return 0
+
+        changed = set()
+        with self._lock:
+            for coin_id, values in data.items():
+                if not isinstance(values, dict):
+                    continue
+                current = self._prices.setdefault(coin_id, {})
+                for currency, value in values.items():
+                    if current.get(currency) != value:
+                        current[currency] = value
+                        changed.add((coin_id, currency))
+            # Coin yang sudah tidak di-subscribe tidak ikut di snapshot berikutnya
+            for coin_id in list(self._prices):
+                if coin_id not in ids:
+                    del self._prices[coin_id]
+            subscriptions = list(self._subscriptions.values())
+
+        if changed:
+            for subscription in subscriptions:
+                update = subscription.select(data, changed)
+                if update:
+                    subscription.deliver(update)
+        return len(changed)
+
+    def _run(self):
+        if self._client_factory is not None:
+            client = self._client_factory()
+        else:
+            from .api_client import APIClient
+            client = APIClient()
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscriptions:
+                        self._thread = None
+                        return
+                try:
+                    self.poll_once(client)
+                except Exception as e:
+                    logger.error(f"Price stream poll failed: {str(e)}")
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+        finally:
+            close_old_connections()
+
+
+# Singleton instance
+price_stream_hub = PriceStreamHub()
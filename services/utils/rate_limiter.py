@@ -0,0 +1,316 @@
+# services/utils/rate_limiter.py
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from rest_framework.response import Response
+
+from .coordination import coordination_backend
+from .metrics import phase
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+COUNTER_MAGIC = b'APIRATE1'
+# magic, slots
+COUNTER_HEADER = struct.Struct('<8sI')
+COUNTER_HEADER_SIZE = 64
+# key hash (0 = kosong), expires (epoch), nilai
+COUNTER_SLOT = struct.Struct('<Qdq')
+COUNTER_PROBES = 8
+COUNTER_DEFAULTS = {
+    'path': None,
+    'slots': 65536,
+}
+
+
+def parse_rate(rate):
+    """Parse '10/m' menjadi (10, 60)"""
+    count, _, unit = rate.partition('/')
+    return int(count), PERIODS[unit.strip().lower()[0]]
+
+
+class InMemoryCounterStore:
+    """Counter dengan expiry di memory process, increment atomic lewat lock"""
+
+    def __init__(self, sweep_every=1000):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._ops = 0
+        self.sweep_every = sweep_every
+
+    def get(self, key):
+        entry = self._counters.get(key)
+        if entry is None or entry[1] < time.monotonic():
+            return 0
+        return entry[0]
+
+    def incr(self, key, ttl, amount=1):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[1] < now:
+                entry = [0, now + ttl]
+                self._counters[key] = entry
+            entry[0] += amount
+
+            self._ops += 1
+            if self._ops >= self.sweep_every:
+                self._ops = 0
+                self._counters = {k: v for k, v in self._counters.items() if v[1] >= now}
+            return entry[0]
+
+    def get_and_incr(self, get_key, incr_key, ttl, amount=1):
+        return self.get(get_key), self.incr(incr_key, ttl, amount)
+
+    def clear(self):
+        with self._lock:
+            self._counters = {}
+
+
+class SharedCounterStore:
+    """
+    Counter di file mmap (di /dev/shm jika ada) yang dibagi semua worker di satu host, jadi
+    limit tidak berlipat dengan jumlah worker gunicorn/uwsgi. Tabel hash berukuran tetap
+    dengan linear probing sejauh COUNTER_PROBES slot; jika semuanya terisi, counter yang
+    paling cepat expired diganti. Setiap operasi diserialisasi dengan flock (antar process)
+    dan lock thread (flock tidak mengunci antar thread yang berbagi file descriptor).
+    """
+
+    def __init__(self, path, slots=65536):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        size = COUNTER_HEADER_SIZE + slots * COUNTER_SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            header = os.pread(self._fd, COUNTER_HEADER.size, 0)
+            if len(header) < COUNTER_HEADER.size or COUNTER_HEADER.unpack(header) != (COUNTER_MAGIC, slots):
+                # File baru atau ukuran tabel berubah: mulai dari tabel kosong
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, COUNTER_HEADER.pack(COUNTER_MAGIC, slots), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    @classmethod
+    def from_settings(cls):
+        """SharedCounterStore dari settings.RATE_LIMIT_STORE, atau InMemoryCounterStore jika tidak bisa"""
+        config = {**COUNTER_DEFAULTS, **getattr(settings, 'RATE_LIMIT_STORE', {})}
+        if fcntl is not None:
+            path = config['path'] or default_counter_path()
+            try:
+                return cls(path, config['slots'])
+            except OSError as e:
+                logger.warning(f"Shared rate limit store {path} tidak bisa dibuka: {str(e)}")
+        logger.warning(
+            "Rate limit counters are per worker process: with N workers every API key gets N times its "
+            "plan limit. Configure REDIS_URL or a writable RATE_LIMIT_STORE path."
+        )
+        return InMemoryCounterStore()
+
+    def _hash(self, key):
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+
+    def _offset(self, index):
+        return COUNTER_HEADER_SIZE + index * COUNTER_SLOT.size
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _find(self, key, now):
+        """(index, expires, nilai) counter `key`; untuk key baru slot pengganti dengan expires None"""
+        key_hash = self._hash(key)
+        start = key_hash % self.slots
+        candidate = None
+        for probe in range(COUNTER_PROBES):
+            index = (start + probe) % self.slots
+            slot_key, expires, value = COUNTER_SLOT.unpack_from(self._map, self._offset(index))
+            if slot_key == key_hash and expires >= now:
+                return index, expires, value
+            # Slot kosong atau expired dipakai lebih dulu, selain itu yang paling cepat expired
+            rank = -1 if slot_key == 0 or expires < now else expires
+            if candidate is None or rank < candidate[1]:
+                candidate = (index, rank)
+        return candidate[0], None, 0
+
+    def _get(self, key, now):
+        return self._find(key, now)[2]
+
+    def _incr(self, key, ttl, amount, now):
+        index, expires, value = self._find(key, now)
+        value += amount
+        COUNTER_SLOT.pack_into(self._map, self._offset(index), self._hash(key),
+                               now + ttl if expires is None else expires, value)
+        return value
+
+    def get(self, key):
+        with self._locked():
+            return self._get(key, time.time())
+
+    def incr(self, key, ttl, amount=1):
+        with self._locked():
+            return self._incr(key, ttl, amount, time.time())
+
+    def get_and_incr(self, get_key, incr_key, ttl, amount=1):
+        now = time.time()
+        with self._locked():
+            return self._get(get_key, now), self._incr(incr_key, ttl, amount, now)
+
+    def clear(self):
+        with self._locked():
+            self._map[COUNTER_HEADER_SIZE:] = bytes(len(self._map) - COUNTER_HEADER_SIZE)
+
+
+def default_counter_path():
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    suffix = hashlib.md5(os.path.abspath(str(settings.BASE_DIR)).encode()).hexdigest()[:8]
+    return os.path.join(base, f"api-aggregator-{suffix}.ratelimit")
+
+
+class BackendCounterStore:
+    """
+    Counter di backend koordinasi (services/utils/coordination.py), dibagi semua node.
+    Jika backend tidak tersedia, counter sementara dihitung per node di `fallback`.
+    """
+
+    def __init__(self, backend, fallback=None):
+        self.backend = backend
+        self.fallback = fallback or InMemoryCounterStore()
+
+    def get_and_incr(self, get_key, incr_key, ttl, amount=1):
+        result = self.backend.get_and_incr(get_key, incr_key, ttl, amount)
+        if result is None:
+            return self.fallback.get_and_incr(get_key, incr_key, ttl, amount)
+        return result
+
+    def incr(self, key, ttl, amount=1):
+        result = self.backend.incr(key, ttl, amount)
+        if result is None:
+            return self.fallback.incr(key, ttl, amount)
+        return result
+
+
+class RateLimitResult:
+    __slots__ = ('allowed', 'limit', 'remaining', 'reset')
+
+    def __init__(self, allowed, limit, remaining, reset):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+
+    def headers(self):
+        headers = {
+            'RateLimit-Limit': str(self.limit),
+            'RateLimit-Remaining': str(self.remaining),
+            'RateLimit-Reset': str(self.reset),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(self.reset)
+        return headers
+
+
+class SlidingWindowRateLimiter:
+    """
+    Sliding window counter: jumlah request di window sebelumnya diberi bobot
+    sesuai sisa overlap-nya dengan window sekarang, lalu ditambah window sekarang.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or InMemoryCounterStore()
+
+    def hit(self, identity, limit, period):
+        now = time.time()
+        window = int(now // period)
+        elapsed = now - window * period
+
+        current_key = f"rl:{identity}:{period}:{window}"
+        previous_key = f"rl:{identity}:{period}:{window - 1}"
+
+        # Satu round trip untuk store jaringan
+        previous, current = self.store.get_and_incr(previous_key, current_key, period * 2)
+        weight = (period - elapsed) / period
+        estimated = previous * weight + current
+
+        if estimated > limit:
+            # Request yang ditolak tidak ikut dihitung
+            current = self.store.incr(current_key, period * 2, amount=-1)
+            wait = period - elapsed
+            if previous and current < limit:
+                # Kapan bobot window sebelumnya cukup turun untuk satu request lagi
+                wait -= (limit - current - 1) * period / previous
+            return RateLimitResult(False, limit, 0, max(1, math.ceil(wait)))
+
+        remaining = max(0, int(limit - estimated))
+        return RateLimitResult(True, limit, remaining, max(1, math.ceil(period - elapsed)))
+
+
+def get_plan_rate(plan):
+    plans = getattr(settings, 'API_RATE_LIMIT_PLANS', {})
+    return parse_rate(plans.get(plan) or plans.get('free', '10/m'))
+
+
+def api_key_ratelimit(view_func):
+    """
+    Rate limit per UserAPIKey sesuai plan-nya, dipakai setelah HasAPIKey
+    (yang mengisi request.api_key_id dan request.api_key_plan).
+    Request tanpa API key dihitung per IP dengan limit plan 'free'.
+    """
+    @wraps(view_func)
+    def wrapped(request, *args, **kwargs):
+        key_id = getattr(request, 'api_key_id', None)
+        if key_id is not None:
+            identity = f"key:{key_id}"
+            limit, period = get_plan_rate(getattr(request, 'api_key_plan', 'free'))
+        else:
+            identity = f"ip:{request.META.get('REMOTE_ADDR', '')}"
+            limit, period = get_plan_rate('free')
+
+        with phase('ratelimit'):
+            result = rate_limiter.hit(identity, limit, period)
+        if not result.allowed:
+            response = Response({'error': 'Rate limit exceeded'}, status=429)
+        else:
+            response = view_func(request, *args, **kwargs)
+
+        for header, value in result.headers().items():
+            response[header] = value
+        return response
+
+    return wrapped
+
+
+def default_counter_store():
+    """Counter dibagi antar node lewat COORDINATION_BACKEND jika ada, selain itu antar worker di host ini"""
+    shared = SharedCounterStore.from_settings()
+    if coordination_backend is not None:
+        return BackendCounterStore(coordination_backend, fallback=shared)
+    return shared
+
+
+# Singleton instance
+rate_limiter = SlidingWindowRateLimiter(store=default_counter_store())
@@ -0,0 +1,208 @@
+# services/utils/search_index.py
+"""
+Index pencarian coin lokal untuk /api/search/.
+
+Dibangun dari /coins/list (plus market_cap_rank dari beberapa halaman /coins/markets)
+dan di-refresh di background thread. Prefix lookup memakai sorted list + bisect, substring
+memakai inverted index trigram; prefix 1-2 karakter (keystroke pertama autocomplete)
+sudah dihitung sebelumnya.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = 25
+NGRAM = 3
+SHORT_PREFIX = 2
+UNRANKED = float('inf')
+
+EXACT, PREFIX, SUBSTRING = 0, 1, 2
+
+
+def _grams(term):
+    return {term[i:i + NGRAM] for i in range(len(term) - NGRAM + 1)}
+
+
+class _Snapshot:
+    """Index immutable, diganti utuh saat refresh sehingga reader tidak butuh lock"""
+
+    def __init__(self, coins, ranks):
+        self.built_at = time.time()
+        self.coins = [
+            {
+                'id': coin['id'],
+                'name': coin.get('name') or coin['id'],
+                'api_symbol': coin['id'],
+                'symbol': (coin.get('symbol') or '').upper(),
+                'market_cap_rank': ranks.get(coin['id']),
+            }
+            for coin in coins
+            if coin.get('id')
+        ]
+
+        entries = set()
+        for index, coin in enumerate(self.coins):
+            for term in (coin['id'], coin['symbol'].lower(), coin['name'].lower()):
+                if term:
+                    entries.add((term, index))
+        entries = sorted(entries)
+        self.terms = [term for term, _ in entries]
+        self.term_coins = [index for _, index in entries]
+
+        self.grams = {}
+        for position, term in enumerate(self.terms):
+            for gram in _grams(term):
+                self.grams.setdefault(gram, []).append(position)
+
+        # Prefix pendek cocok dengan ribuan term: simpan langsung hasil teratasnya
+        short = {}
+        for term, index in entries:
+            for length in range(1, min(SHORT_PREFIX, len(term)) + 1):
+                tier = EXACT if length == len(term) else PREFIX
+                bucket = short.setdefault(term[:length], {})
+                bucket[index] = min(tier, bucket.get(index, tier))
+        self.short = {prefix: self._top(matches) for prefix, matches in short.items()}
+
+    def _sort_key(self, index, tier):
+        coin = self.coins[index]
+        rank = coin['market_cap_rank']
+        return (tier, UNRANKED if rank is None else rank, len(coin['name']), coin['id'])
+
+    def _top(self, matches, limit=MAX_RESULTS):
+        ordered = sorted(matches.items(), key=lambda item: self._sort_key(item[0], item[1]))
+        return [self.coins[index] for index, _ in ordered[:limit]]
+
+    def search(self, query, limit=MAX_RESULTS):
+        if len(query) <= SHORT_PREFIX:
+            return self.short.get(query, [])[:limit]
+
+        matches = {}
+        start = bisect_left(self.terms, query)
+        end = bisect_left(self.terms, query + '\uffff', lo=start)
+        for position in range(start, end):
+            tier = EXACT if self.terms[position] == query else PREFIX
+            index = self.term_coins[position]
+            matches[index] = min(tier, matches.get(index, tier))
+
+        postings = [self.grams.get(gram) for gram in _grams(query)]
+        if postings and all(postings):
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            for position in candidates:
+                index = self.term_coins[position]
+                if index not in matches and query in self.terms[position]:
+                    matches[index] = SUBSTRING
+
+        return self._top(matches, limit)
+
+
+class CoinSearchIndex:
+    def __init__(self, refresh_interval=None, rank_pages=None, retry_interval=None):
+        self._refresh_interval = refresh_interval
+        self._rank_pages = rank_pages
+        self._retry_interval = retry_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._attempted_at = None
+
+    @property
+    def refresh_interval(self):
+        if self._refresh_interval is not None:
+            return self._refresh_interval
+        return getattr(settings, 'COIN_SEARCH_REFRESH_INTERVAL', 6 * 3600)
+
+    @property
+    def retry_interval(self):
+        """Jeda minimal antar refresh_async, supaya refresh yang gagal tidak diulang setiap request"""
+        if self._retry_interval is not None:
+            return self._retry_interval
+        return getattr(settings, 'COIN_SEARCH_RETRY_INTERVAL', 60)
+
+    @property
+    def rank_pages(self):
+        if self._rank_pages is not None:
+            return self._rank_pages
+        return getattr(settings, 'COIN_SEARCH_RANK_PAGES', 4)
+
+    @property
+    def ready(self):
+        return self._snapshot is not None
+
+    @property
+    def stale(self):
+        snapshot = self._snapshot
+        return snapshot is None or time.time() - snapshot.built_at >= self.refresh_interval
+
+    def search(self, query, limit=MAX_RESULTS):
+        """Return list coin seperti field `coins` di response /search, atau None jika index belum siap"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return snapshot.search(query.strip().lower(), limit)
+
+    def build(self, coins, ranks=None):
+        self._snapshot = _Snapshot(coins, ranks or {})
+        return len(self._snapshot.coins)
+
+    def clear(self):
+        self._snapshot = None
+
+    def refresh(self, client=None):
+        """Ambil coin list terbaru dari CoinGecko dan bangun ulang index"""
+        if client is None:
+            from .api_client import APIClient
+            client = APIClient()
+
+        coins = client.make_request('coingecko', '/coins/list')
+        if not isinstance(coins, list):
+            logger.warning(f"Coin search index refresh failed: {coins}")
+            return False
+
+        ranks = {}
+        for page in range(1, self.rank_pages + 1):
+            markets = client.make_request('coingecko', '/coins/markets', params={
+                'vs_currency': 'usd', 'order': 'market_cap_desc', 'per_page': 250, 'page': page
+            })
+            if not isinstance(markets, list):
+                break
+            ranks.update((coin['id'], coin.get('market_cap_rank')) for coin in markets if coin.get('id'))
+
+        self.build(coins, ranks)
+        return True
+
+    def refresh_async(self):
+        """
+        Refresh di background thread; tidak melakukan apa-apa jika refresh sedang berjalan
+        atau percobaan terakhir belum lewat retry_interval detik.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._refreshing:
+                return False
+            if self._attempted_at is not None and now - self._attempted_at < self.retry_interval:
+                return False
+            self._refreshing = True
+            self._attempted_at = now
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Coin search index refresh failed: {str(e)}")
+            finally:
+                self._refreshing = False
+                close_old_connections()
+
+        threading.Thread(target=run, name='coin-search-index', daemon=True).start()
+        return True
+
+
+# Singleton instance
+coin_search_index = CoinSearchIndex()
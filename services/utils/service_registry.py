@@ -0,0 +1,111 @@
+# services/utils/service_registry.py
+import logging
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+from services.models import ThirdPartyService
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = 'services:registry_version'
+
+
+class ServiceConfig:
+    """Snapshot ringan dari ThirdPartyService dengan API key yang sudah didecrypt"""
+    __slots__ = ('id', 'name', 'api_endpoint', 'api_key', 'rate_limit_per_hour', 'capability', 'priority')
+
+    def __init__(self, id, name, api_endpoint, api_key, rate_limit_per_hour, capability='', priority=0):
+        self.id = id
+        self.name = name
+        self.api_endpoint = api_endpoint
+        self.api_key = api_key
+        self.rate_limit_per_hour = rate_limit_per_hour
+        self.capability = capability
+        self.priority = priority
+
+    @classmethod
+    def from_model(cls, service):
+        return cls(
+            id=service.id,
+            name=service.name,
+            api_endpoint=service.api_endpoint,
+            api_key=service.get_api_key(),
+            rate_limit_per_hour=service.rate_limit_per_hour,
+            capability=service.capability,
+            priority=service.priority,
+        )
+
+
+class ServiceRegistry:
+    """
+    Registry process-local untuk service yang aktif.
+
+    Semua service aktif dimuat dalam satu query dan API key-nya didecrypt sekali.
+    Worker lain tahu kapan harus reload lewat version stamp di shared cache,
+    yang dicek paling sering sekali per `check_interval` detik.
+    """
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._services = None
+        self._version = None
+        self._checked_at = 0.0
+
+    def get(self, name):
+        """Return ServiceConfig untuk service aktif, atau None"""
+        return self._current().get(name)
+
+    def all(self):
+        return list(self._current().values())
+
+    def by_capability(self, capability):
+        """Semua service aktif untuk satu capability (provider failover)"""
+        return [service for service in self._current().values() if service.capability == capability]
+
+    def invalidate(self):
+        """Buang snapshot lokal, reload terjadi di akses berikutnya"""
+        with self._lock:
+            self._services = None
+
+    def bump_version(self):
+        """Beritahu worker lain bahwa konfigurasi service berubah"""
+        try:
+            cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        except Exception as e:
+            logger.error(f"Failed to bump service registry version: {str(e)}")
+
+    def _current(self):
+        now = time.monotonic()
+        services = self._services
+        if services is not None and now - self._checked_at < self.check_interval:
+            return services
+
+        with self._lock:
+            if self._services is not None and now - self._checked_at < self.check_interval:
+                return self._services
+
+            version = self._shared_version()
+            if self._services is None or version != self._version:
+                self._services = self._load()
+                self._version = version
+            self._checked_at = now
+            return self._services
+
+    def _shared_version(self):
+        try:
+            return cache.get(VERSION_CACHE_KEY)
+        except Exception:
+            return None
+
+    def _load(self):
+        return {
+            service.name: ServiceConfig.from_model(service)
+            for service in ThirdPartyService.objects.filter(is_active=True)
+        }
+
+
+# Singleton instance
+service_registry = ServiceRegistry()
@@ -0,0 +1,316 @@
+# services/utils/shared_cache.py
+"""
+Tier cache shared-memory untuk semua worker di satu host, di depan FileCache.
+
+Satu file mmap (di /dev/shm jika ada) berisi:
+- bloom filter berisi digest semua key yang punya file di FileCache, sehingga miss
+  tidak perlu menyentuh disk;
+- hash table set-associative dengan slot berukuran tetap. Setiap key dipetakan ke satu
+  set berisi `ways` slot; jika set penuh, entry yang sudah expired atau paling cepat
+  expired yang diganti, jadi ukuran tier selalu tetap.
+
+Pembacaan tanpa lock: setiap slot punya sequence number (seqlock). Writer membuat
+sequence ganjil selama menulis dan genap setelah selesai; reader mengulang jika sequence
+ganjil atau berubah selama membaca. Penulisan (jarang, hanya setelah request upstream)
+diserialisasi dengan flock pada file segment.
+
+Bloom filter hanya benar jika semua penulisan ke cache dir lewat FileCache di host ini;
+matikan tier (SHARED_CACHE['enabled']) jika cache dir dibagi antar host.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'APICACH1'
+# magic, slots, ways, slot_size, bloom_bytes
+HEADER = struct.Struct('<8sIIIQ')
+HEADER_SIZE = 4096
+# seq, key, expires, length
+SLOT = struct.Struct('<QQdI')
+SLOT_HEADER_SIZE = 32
+BLOOM_HASHES = 7
+READ_RETRIES = 4
+# Bloom dibangun ulang dari isi cache dir saat attach jika lebih dari separuh bit terisi
+BLOOM_MAX_FILL = 0.5
+
+DEFAULTS = {
+    'enabled': True,
+    'path': None,
+    'slots': 2048,
+    'ways': 8,
+    'slot_size': 16384,
+    'bloom_bytes': 1 << 20,
+}
+
+
+def default_path(cache_dir):
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    suffix = hashlib.md5(os.path.abspath(cache_dir).encode()).hexdigest()[:8]
+    return os.path.join(base, f"api-aggregator-{suffix}.cache")
+
+
+class SharedMemoryCache:
+    """
+    Key adalah digest md5 (16 byte) yang sama dengan nama file FileCache,
+    value adalah bytes (JSON) dengan waktu expired absolut.
+    """
+
+    def __init__(self, path, cache_dir, slots=2048, ways=8, slot_size=16384, bloom_bytes=1 << 20):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.ways = ways
+        self.sets = max(1, slots // ways)
+        self.slots = self.sets * ways
+        self.slot_size = slot_size
+        self.bloom_bytes = bloom_bytes
+        self.bloom_bits = bloom_bytes * 8
+        self.size = HEADER_SIZE + bloom_bytes + self.slots * slot_size
+
+        self.hits = 0
+        self.misses = 0
+        self.filtered = 0
+
+        self._pid = None
+        self._fd = None
+        self._mm = None
+        self._disabled = False
+        self._attach_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, cache_dir):
+        """Tier untuk `cache_dir` sesuai settings.SHARED_CACHE, atau None jika tidak aktif"""
+        config = {**DEFAULTS, **getattr(settings, 'SHARED_CACHE', {})}
+        if not config['enabled'] or fcntl is None:
+            return None
+        return cls(
+            config['path'] or default_path(cache_dir),
+            cache_dir,
+            slots=config['slots'],
+            ways=config['ways'],
+            slot_size=config['slot_size'],
+            bloom_bytes=config['bloom_bytes'],
+        )
+
+    # Segment
+
+    def _map(self):
+        """mmap milik process ini; attach ulang setelah fork supaya flock tidak dibagi"""
+        if self._pid == os.getpid() or self._disabled:
+            return self._mm
+        with self._attach_lock:
+            if self._pid != os.getpid() and not self._disabled:
+                try:
+                    self._attach()
+                except OSError as e:
+                    logger.warning(f"Shared cache {self.path} tidak tersedia: {str(e)}")
+                    self._disabled = True
+                    self._mm = None
+        return self._mm
+
+    def _attach(self):
+        if self._mm is not None:
+            # Mapping warisan dari parent (fork), flock-nya tidak boleh dipakai bersama
+            self._mm.close()
+            os.close(self._fd)
+            self._fd = self._mm = None
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                expected = HEADER.pack(MAGIC, self.slots, self.ways, self.slot_size, self.bloom_bytes)
+                fresh = os.fstat(fd).st_size != self.size or os.pread(fd, HEADER.size, 0) != expected
+                if fresh:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, self.size)
+                    os.pwrite(fd, expected, 0)
+                mm = mmap.mmap(fd, self.size)
+                self._fd, self._mm, self._pid = fd, mm, os.getpid()
+                self._load_filter(reset=fresh or self.filter_fill() > BLOOM_MAX_FILL)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except BaseException:
+            if self._fd != fd:
+                os.close(fd)
+            raise
+
+    @contextmanager
+    def _locked(self):
+        with self._write_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    # Bloom filter (key yang punya file di disk)
+
+    def _bloom_positions(self, digest):
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        return [(h1 + i * h2) % self.bloom_bits for i in range(BLOOM_HASHES)]
+
+    def _bloom_set(self, mm, digest):
+        for position in self._bloom_positions(digest):
+            offset = HEADER_SIZE + (position >> 3)
+            mm[offset] |= 1 << (position & 7)
+
+    def might_contain(self, digest):
+        """False jika key pasti tidak punya file di cache dir"""
+        mm = self._map()
+        if mm is None:
+            return True
+        for position in self._bloom_positions(digest):
+            if not mm[HEADER_SIZE + (position >> 3)] & (1 << (position & 7)):
+                self.filtered += 1
+                return False
+        return True
+
+    def add(self, digest):
+        mm = self._map()
+        if mm is None:
+            return
+        with self._locked():
+            self._bloom_set(mm, digest)
+
+    def filter_fill(self):
+        """Bagian bit bloom yang sudah terisi (0..1)"""
+        bloom = np.frombuffer(self._mm, dtype=np.uint8, count=self.bloom_bytes, offset=HEADER_SIZE)
+        return int(np.unpackbits(bloom).sum()) / self.bloom_bits
+
+    def rebuild_filter(self):
+        """Bangun ulang bloom dari isi cache dir (misalnya setelah cleanup_cache)"""
+        if self._map() is None:
+            return 0
+        with self._locked():
+            return self._load_filter(reset=True)
+
+    def _load_filter(self, reset=False):
+        mm = self._mm
+        if reset:
+            mm[HEADER_SIZE:HEADER_SIZE + self.bloom_bytes] = bytes(self.bloom_bytes)
+        count = 0
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            names = []
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext != '.json' or len(stem) != 32:
+                continue
+            try:
+                self._bloom_set(mm, bytes.fromhex(stem))
+            except ValueError:
+                continue
+            count += 1
+        return count
+
+    # Slots
+
+    def _key(self, digest):
+        # 0 menandai slot kosong
+        return int.from_bytes(digest[:8], 'little') or 1
+
+    def _offsets(self, digest):
+        first = (int.from_bytes(digest[8:12], 'little') % self.sets) * self.ways
+        base = HEADER_SIZE + self.bloom_bytes
+        return [base + (first + way) * self.slot_size for way in range(self.ways)]
+
+    def _read(self, mm, offset, key):
+        """(expires, payload) snapshot konsisten dari slot milik `key`, atau None"""
+        capacity = self.slot_size - SLOT_HEADER_SIZE
+        for _ in range(READ_RETRIES):
+            seq, slot_key, expires, length = SLOT.unpack_from(mm, offset)
+            if seq & 1:
+                continue
+            if slot_key != key:
+                return None
+            start = offset + SLOT_HEADER_SIZE
+            payload = mm[start:start + min(length, capacity)]
+            if SLOT.unpack_from(mm, offset)[0] == seq:
+                return expires, payload
+        return None
+
+    def get(self, digest):
+        """Payload untuk key jika ada dan belum expired, atau None"""
+        mm = self._map()
+        if mm is None:
+            return None
+        key = self._key(digest)
+        for offset in self._offsets(digest):
+            entry = self._read(mm, offset, key)
+            if entry is not None:
+                expires, payload = entry
+                if expires > time.time():
+                    self.hits += 1
+                    return payload
+                break
+        self.misses += 1
+        return None
+
+    def put(self, digest, payload, expires):
+        """Simpan payload; False jika tidak muat di satu slot atau sudah expired"""
+        mm = self._map()
+        if mm is None:
+            return False
+        if len(payload) > self.slot_size - SLOT_HEADER_SIZE or expires <= time.time():
+            self.delete(digest)
+            return False
+
+        key = self._key(digest)
+        with self._locked():
+            offset = self._victim(mm, self._offsets(digest), key)
+            self._write(mm, offset, key, expires, payload)
+        return True
+
+    def delete(self, digest):
+        mm = self._map()
+        if mm is None:
+            return
+        key = self._key(digest)
+        with self._locked():
+            for offset in self._offsets(digest):
+                if SLOT.unpack_from(mm, offset)[1] == key:
+                    self._write(mm, offset, 0, 0.0, b'')
+
+    def _victim(self, mm, offsets, key):
+        """Slot untuk key: slot miliknya, slot kosong/expired, atau yang paling cepat expired"""
+        now = time.time()
+        victim, victim_expires = None, None
+        for offset in offsets:
+            _, slot_key, expires, _ = SLOT.unpack_from(mm, offset)
+            if slot_key == key:
+                return offset
+            if slot_key == 0 or expires <= now:
+                expires = float('-inf')
+            if victim is None or expires < victim_expires:
+                victim, victim_expires = offset, expires
+        return victim
+
+    def _write(self, mm, offset, key, expires, payload):
+        seq = SLOT.unpack_from(mm, offset)[0]
+        # Sequence ganjil: reader tahu slot sedang ditulis
+        struct.pack_into('<Q', mm, offset, seq + 1)
+        start = offset + SLOT_HEADER_SIZE
+        mm[start:start + len(payload)] = payload
+        struct.pack_into('<QdI', mm, offset + 8, key, expires, len(payload))
+        struct.pack_into('<Q', mm, offset, seq + 2)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'filtered': self.filtered}
@@ -0,0 +1,290 @@
+# services/utils/timeseries_store.py
+"""
+Store time-series market_chart lokal per (coin, vs_currency).
+
+Setiap series disimpan sebagai file biner kolom tetap (timestamp ms, price, market_cap,
+volume) yang dibaca lewat numpy.memmap. Refresh hanya mengambil ekor data sejak timestamp
+terakhir lewat /coins/{id}/market_chart/range lalu di-append, sehingga window `days`
+berapa pun dilayani dengan slicing.
+
+Granularity CoinGecko bergantung pada `days` (5 menit untuk 1 hari, per jam sampai 90
+hari, harian di atasnya), jadi setiap resolusi punya series sendiri dan window hanya
+di-slice dari series dengan resolusi yang sama dengan jawaban upstream. /market_chart/range
+untuk rentang pendek selalu mengembalikan titik 5 menit, jadi ekor di-bucket ke resolusi
+series sebelum di-append: satu titik per bucket (yang paling awal) ditambah titik terbaru,
+yang ditimpa setiap refresh selama bucket-nya belum selesai.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DTYPE = np.dtype([('ts', '<i8'), ('price', '<f8'), ('market_cap', '<f8'), ('volume', '<f8')])
+SERIES_COLUMNS = (('prices', 'price'), ('market_caps', 'market_cap'), ('total_volumes', 'volume'))
+DAY_MS = 86400 * 1000
+# Jarak antar titik per resolusi, juga toleransi awal window yang dianggap sudah tersimpan
+RESOLUTION_MS = {'5m': 5 * 60 * 1000, 'hourly': 3600 * 1000, 'daily': DAY_MS}
+
+
+def resolution_for(days):
+    """Granularity response /market_chart CoinGecko untuk `days`"""
+    if days == 'max' or float(days) > 90:
+        return 'daily'
+    return 'hourly' if float(days) > 1 else '5m'
+
+
+def chart_to_rows(chart):
+    """Response market_chart -> structured array terurut per timestamp"""
+    columns = {}
+    for series, column in SERIES_COLUMNS:
+        for ts, value in chart.get(series) or []:
+            row = columns.setdefault(int(ts), {})
+            row[column] = value
+
+    rows = np.empty(len(columns), dtype=DTYPE)
+    for i, ts in enumerate(sorted(columns)):
+        row = columns[ts]
+        rows[i] = (
+            ts,
+            np.nan if row.get('price') is None else row['price'],
+            np.nan if row.get('market_cap') is None else row['market_cap'],
+            np.nan if row.get('volume') is None else row['volume'],
+        )
+    return rows
+
+
+def bucket_rows(rows, step):
+    """Baris paling awal di setiap bucket `step` ms, ditambah baris terakhir (bucket yang masih berjalan)"""
+    if not len(rows):
+        return rows
+    buckets = rows['ts'] // step
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = buckets[1:] != buckets[:-1]
+    keep[-1] = True
+    return rows[keep]
+
+
+def rows_to_chart(rows):
+    timestamps = rows['ts'].tolist()
+    chart = {}
+    for series, column in SERIES_COLUMNS:
+        values = [None if v != v else v for v in rows[column].tolist()]
+        chart[series] = [list(pair) for pair in zip(timestamps, values)]
+    return chart
+
+
+class TimeSeriesStore:
+    def __init__(self, base_dir=None, refresh_interval=None):
+        self._base_dir = base_dir
+        self._refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._maps = {}
+
+    @property
+    def base_dir(self):
+        base_dir = self._base_dir or getattr(
+            settings, 'MARKET_CHART_STORE_DIR', os.path.join(settings.BASE_DIR, 'timeseries')
+        )
+        os.makedirs(base_dir, exist_ok=True)
+        return base_dir
+
+    @property
+    def refresh_interval(self):
+        if self._refresh_interval is not None:
+            return self._refresh_interval
+        return getattr(settings, 'MARKET_CHART_REFRESH_INTERVAL', 300)
+
+    def _paths(self, coin_id, vs_currency, resolution='daily'):
+        name = re.sub(r'[^a-z0-9_-]', '_', f"{coin_id}__{vs_currency}__{resolution}".lower())
+        base = os.path.join(self.base_dir, name)
+        return base + '.bin', base + '.json'
+
+    # --- Akses data ---
+
+    def read(self, coin_id, vs_currency, resolution='daily'):
+        """Semua baris sebagai memmap read-only (dibuka ulang hanya jika file berubah)"""
+        data_path, _ = self._paths(coin_id, vs_currency, resolution)
+        try:
+            size = os.path.getsize(data_path)
+        except OSError:
+            return np.empty(0, dtype=DTYPE)
+        if size < DTYPE.itemsize:
+            return np.empty(0, dtype=DTYPE)
+
+        stat = os.stat(data_path)
+        signature = (stat.st_ino, stat.st_mtime_ns, size)
+        cached = self._maps.get(data_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        rows = np.memmap(data_path, dtype=DTYPE, mode='r', shape=(size // DTYPE.itemsize,))
+        with self._lock:
+            self._maps[data_path] = (signature, rows)
+        return rows
+
+    def window(self, coin_id, vs_currency, since_ms=None, resolution='daily'):
+        rows = self.read(coin_id, vs_currency, resolution)
+        if since_ms is None or not len(rows):
+            return rows
+        return rows[np.searchsorted(rows['ts'], since_ms, side='left'):]
+
+    def read_meta(self, coin_id, vs_currency, resolution='daily'):
+        _, meta_path = self._paths(coin_id, vs_currency, resolution)
+        try:
+            with open(meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self, coin_id, vs_currency, resolution='daily', **changes):
+        _, meta_path = self._paths(coin_id, vs_currency, resolution)
+        meta = self.read_meta(coin_id, vs_currency, resolution)
+        meta.update(changes, resolution=resolution)
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    # --- Penulisan ---
+
+    @contextmanager
+    def _file_lock(self, coin_id, vs_currency, resolution='daily'):
+        data_path, _ = self._paths(coin_id, vs_currency, resolution)
+        with open(data_path + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, coin_id, vs_currency, rows, resolution='daily'):
+        """
+        Tambahkan baris yang lebih baru dari timestamp terakhir, di-bucket ke resolusi series
+        (lihat bucket_rows); return jumlah baris baru. Baris di bucket terakhir yang tersimpan
+        dihitung ulang dan ditimpa di tempat, file tidak pernah dipendekkan sehingga memmap
+        yang sedang dibaca tetap valid.
+        """
+        existing = self.read(coin_id, vs_currency, resolution)
+        step = RESOLUTION_MS[resolution]
+        start = 0
+        if len(existing):
+            rows = rows[rows['ts'] > existing['ts'][-1]]
+            if not len(rows):
+                return 0
+            start = int(np.searchsorted(existing['ts'], existing['ts'][-1] // step * step, side='left'))
+            rows = np.concatenate([np.array(existing[start:]), rows])
+        rows = bucket_rows(rows, step)
+
+        data_path, _ = self._paths(coin_id, vs_currency, resolution)
+        fd = os.open(data_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, np.ascontiguousarray(rows, dtype=DTYPE).tobytes(), start * DTYPE.itemsize)
+        finally:
+            os.close(fd)
+        return start + len(rows) - len(existing)
+
+    def merge(self, coin_id, vs_currency, rows, resolution='daily'):
+        """Gabungkan baris (termasuk yang lebih lama dari data tersimpan) lalu tulis ulang file"""
+        existing = np.array(self.read(coin_id, vs_currency, resolution))
+        combined = np.concatenate([rows, existing]) if len(existing) else rows
+        # np.unique mempertahankan kemunculan pertama: data baru menang untuk timestamp yang sama
+        _, index = np.unique(combined['ts'], return_index=True)
+        combined = combined[index]
+
+        data_path, _ = self._paths(coin_id, vs_currency, resolution)
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(combined, dtype=DTYPE).tobytes())
+        os.replace(tmp_path, data_path)
+        return len(combined)
+
+    # --- Sinkronisasi dengan upstream ---
+
+    def get_chart(self, client, coin_id, vs_currency, days, user=None):
+        """
+        Return response market_chart untuk window `days` ('max' atau angka),
+        mengambil dari upstream hanya bagian yang belum ada di store.
+        """
+        now_ms = int(time.time() * 1000)
+        complete = days == 'max'
+        since_ms = None if complete else now_ms - int(float(days) * DAY_MS)
+        resolution = resolution_for(days)
+
+        error, fetched = self._sync(client, coin_id, vs_currency, days, since_ms, now_ms, user, resolution)
+        rows = self.window(coin_id, vs_currency, since_ms, resolution)
+        if error is not None and not len(rows):
+            return error
+        if not fetched:
+            # Request upstream sudah dicatat make_request; yang dilayani store dicatat sebagai cache hit
+            client.log_cached('coingecko', f'/coins/{quote(coin_id, safe="")}/market_chart', user)
+        return rows_to_chart(rows)
+
+    def _covered(self, meta, rows, since_ms, resolution):
+        return bool(len(rows)) and bool(
+            meta.get('complete')
+            or (since_ms is not None and rows['ts'][0] <= since_ms + RESOLUTION_MS[resolution])
+        )
+
+    def _sync(self, client, coin_id, vs_currency, days, since_ms, now_ms, user, resolution='daily'):
+        """(error atau None, True jika upstream dipanggil)"""
+        meta = self.read_meta(coin_id, vs_currency, resolution)
+        rows = self.read(coin_id, vs_currency, resolution)
+
+        covered = self._covered(meta, rows, since_ms, resolution)
+        fresh = time.time() - meta.get('refreshed_at', 0) < self.refresh_interval
+        if covered and fresh:
+            return None, False
+
+        with self._file_lock(coin_id, vs_currency, resolution):
+            # Bisa saja process lain sudah refresh selama kita menunggu lock
+            meta = self.read_meta(coin_id, vs_currency, resolution)
+            rows = self.read(coin_id, vs_currency, resolution)
+            covered = self._covered(meta, rows, since_ms, resolution)
+
+            if not covered:
+                chart = client.make_request(
+                    'coingecko', f'/coins/{quote(coin_id, safe="")}/market_chart',
+                    params={'vs_currency': vs_currency, 'days': days}, user=user, use_cache=False
+                )
+                if not isinstance(chart, dict) or 'error' in chart:
+                    return chart, True
+                self.merge(coin_id, vs_currency, chart_to_rows(chart), resolution)
+                self._write_meta(coin_id, vs_currency, resolution, refreshed_at=time.time(),
+                                 complete=bool(meta.get('complete')) or days == 'max')
+                return None, True
+
+            if time.time() - meta.get('refreshed_at', 0) < self.refresh_interval:
+                return None, False
+
+            last_ts = int(rows['ts'][-1])
+            chart = client.make_request(
+                'coingecko', f'/coins/{quote(coin_id, safe="")}/market_chart/range',
+                params={'vs_currency': vs_currency, 'from': last_ts // 1000, 'to': now_ms // 1000},
+                user=user, use_cache=False
+            )
+            if not isinstance(chart, dict) or 'error' in chart:
+                logger.warning(f"Market chart tail refresh failed for {coin_id}/{vs_currency}: {chart}")
+                return chart, True
+            self.append(coin_id, vs_currency, chart_to_rows(chart), resolution)
+            self._write_meta(coin_id, vs_currency, resolution, refreshed_at=time.time())
+            return None, True
+
+
+# Singleton instance
+market_chart_store = TimeSeriesStore()
@@ -0,0 +1,138 @@
+# services/utils/transform.py
+"""
+Transformasi response upstream sebelum di-cache.
+
+Path memakai notasi titik ('market_data.current_price.usd'). Ketika path melewati list,
+aturan diterapkan ke setiap elemen list ('articles.title' -> title di setiap artikel).
+"""
+
+from functools import lru_cache
+
+_MISSING = object()
+
+
+def compile_paths(paths):
+    """
+    Compile list path menjadi tree dict: None berarti ambil seluruh subtree.
+    ['a.b', 'a.c', 'd'] -> {'a': {'b': None, 'c': None}, 'd': None}
+    """
+    tree = {}
+    for path in paths:
+        node = tree
+        parts = [part for part in path.strip().split('.') if part]
+        if not parts:
+            continue
+        for part in parts[:-1]:
+            child = node.get(part, _MISSING)
+            if child is None:
+                # Parent sudah diambil utuh, path yang lebih dalam tidak perlu
+                break
+            if child is _MISSING:
+                child = node[part] = {}
+            node = child
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def project(data, tree):
+    """Ambil hanya bagian data yang ada di tree hasil compile_paths"""
+    if tree is None:
+        return data
+    if isinstance(data, list):
+        return [project(item, tree) for item in data]
+    if isinstance(data, dict):
+        return {key: project(data[key], subtree) for key, subtree in tree.items() if key in data}
+    return data
+
+
+@lru_cache(maxsize=512)
+def compile_projection(fields):
+    """Plan projection untuk parameter fields= ('name,market_data.current_price.usd'), di-memoize per string"""
+    return compile_paths(fields.split(','))
+
+
+def _pop_path(data, parts):
+    if isinstance(data, list):
+        return [_pop_path(item, parts) for item in data]
+    if not isinstance(data, dict) or parts[0] not in data:
+        return _MISSING
+    if len(parts) == 1:
+        return data.pop(parts[0])
+    return _pop_path(data[parts[0]], parts[1:])
+
+
+def _set_path(data, parts, value):
+    if isinstance(data, list):
+        for item, item_value in zip(data, value):
+            if item_value is not _MISSING:
+                _set_path(item, parts, item_value)
+        return
+    if not isinstance(data, dict):
+        return
+    if len(parts) == 1:
+        data[parts[0]] = value
+    else:
+        _set_path(data.setdefault(parts[0], {}), parts[1:], value)
+
+
+def _apply(data, parts, func):
+    if isinstance(data, list):
+        for item in data:
+            _apply(item, parts, func)
+        return
+    if not isinstance(data, dict) or parts[0] not in data:
+        return
+    if len(parts) == 1:
+        data[parts[0]] = func(data[parts[0]])
+    else:
+        _apply(data[parts[0]], parts[1:], func)
+
+
+def _coercer(type_):
+    def coerce(value):
+        if value is None:
+            return None
+        try:
+            return type_(value)
+        except (TypeError, ValueError):
+            return value
+    return coerce
+
+
+class Transform:
+    """
+    Pipeline keep -> rename -> coerce yang dideklarasikan per endpoint.
+
+    keep:   list path yang dipertahankan, sisanya dibuang
+    rename: {'path.lama': 'path.baru'}, path dihitung dari root (atau elemen list)
+    coerce: {'path': type}, nilai yang gagal dikonversi dibiarkan apa adanya
+    """
+
+    def __init__(self, keep=None, rename=None, coerce=None):
+        self.keep = compile_paths(keep) if keep else None
+        self.rename = [
+            (source.split('.'), target.split('.'))
+            for source, target in (rename or {}).items()
+        ]
+        self.coerce = [
+            (path.split('.'), _coercer(type_))
+            for path, type_ in (coerce or {}).items()
+        ]
+
+    def __call__(self, data):
+        if not isinstance(data, (dict, list)):
+            return data
+
+        if self.keep is not None:
+            data = project(data, self.keep)
+
+        for source, target in self.rename:
+            value = _pop_path(data, source)
+            if value is not _MISSING:
+                _set_path(data, target, value)
+
+        for path, func in self.coerce:
+            _apply(data, path, func)
+
+        return data
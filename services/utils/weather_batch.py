@@ -0,0 +1,95 @@
+# services/utils/weather_batch.py
+"""
+Cuaca banyak lokasi dalam satu request.
+
+City id di-resolve lewat OpenWeather /group (maksimal 20 id per request); nama kota dan
+koordinat tidak punya endpoint bulk sehingga di-request paralel. Setiap lokasi dibaca
+dan ditulis ke cache entry yang sama dengan /api/weather/.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+
+GROUP_SIZE = 20
+
+
+class WeatherBatch:
+    def __init__(self, client, spec, user=None, max_workers=8):
+        # spec adalah Endpoint single-location (unified-weather)
+        self.client = client
+        self.spec = spec
+        self.user = user
+        self.max_workers = max_workers
+
+    def fetch(self, locations):
+        """locations: [(label, query)] dari weather_batch_locations -> {'cnt', 'list', 'errors'}"""
+        results = {}
+        errors = {}
+        by_id = []
+        single = []
+
+        requests = [(label, query, {**query, **self.spec.fixed_params}) for label, query in locations]
+        cached_documents = self.client.get_cached_many(
+            self.spec.service, [(self.spec.path, params) for _, _, params in requests]
+        )
+        for (label, query, params), cached in zip(requests, cached_documents):
+            if isinstance(cached, dict) and 'error' in cached:
+                # Negative cache (misalnya kota 404) tetap dilaporkan sebagai error
+                errors[label] = cached['error']
+            elif cached is not None:
+                results[label] = cached
+            elif 'id' in query:
+                by_id.append(label)
+            else:
+                single.append((label, params))
+
+        for start in range(0, len(by_id), GROUP_SIZE):
+            self._fetch_group(by_id[start:start + GROUP_SIZE], results, errors)
+
+        if single:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(single))) as pool:
+                for (label, _), data in zip(single, pool.map(self._fetch_one, single)):
+                    if isinstance(data, dict) and 'error' in data:
+                        errors[label] = data['error']
+                    else:
+                        results[label] = data
+
+        ordered = [results[label] for label, _ in locations if label in results]
+        return {'cnt': len(ordered), 'list': ordered, 'errors': errors}
+
+    def _fetch_group(self, ids, results, errors):
+        data = self.client.make_request(
+            self.spec.service,
+            '/group',
+            params={'id': ','.join(ids), **self.spec.fixed_params},
+            user=self.user,
+            use_cache=False
+        )
+        if not isinstance(data, dict) or 'error' in data:
+            message = data.get('error') if isinstance(data, dict) else 'Invalid response from upstream'
+            errors.update((city_id, message) for city_id in ids)
+            return
+
+        for item in data.get('list') or []:
+            city_id = str(item.get('id'))
+            if city_id not in ids:
+                continue
+            document = self.spec.transform(item) if self.spec.transform is not None else item
+            params = {'id': city_id, **self.spec.fixed_params}
+            self.client.set_cached(self.spec.service, self.spec.path, params, document, self.spec.get_ttl(params),
+                                   spec=self.spec)
+            results[city_id] = document
+
+        for city_id in ids:
+            if city_id not in results:
+                errors[city_id] = 'city not found'
+
+    def _fetch_one(self, location):
+        _, params = location
+        try:
+            return self.client.make_request(
+                self.spec.service, self.spec.path, params=params, user=self.user, spec=self.spec
+            )
+        finally:
+            # Koneksi DB (log request) milik worker thread ini
+            connections.close_all()
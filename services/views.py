@@ -1,295 +1,368 @@
+import asyncio
+import hmac
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
 from .utils.api_client import APIClient
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser
 from .permissions import HasAPIKey
-from rest_framework.permissions import IsAuthenticated
-from datetime import datetime, timedelta
 from django.utils.decorators import method_decorator
-from django_ratelimit.decorators import ratelimit
-
-class UnifiedWeatherView(APIView):
+from .utils.rate_limiter import api_key_ratelimit, get_plan_rate, rate_limiter
+from .endpoints import ENDPOINTS, ParamError, get_endpoint, weather_batch_locations, within_public_history_range
+from .utils.history_store import history_store, parse_date
+from .utils.timeseries_store import market_chart_store
+from .utils.search_index import coin_search_index
+from .utils.transform import compile_projection, project
+from .utils.weather_batch import WeatherBatch
+from .utils.github_batch import GitHubUserBatch
+from .utils.service_registry import service_registry
+from .utils.price_batcher import price_batcher
+from .utils.price_stream import price_stream_hub
+from .utils.cache_service import file_cache
+from .utils.cache_tags import TAG_PREFIXES
+from .utils.adaptive_ttl import adaptive_ttl
+from .utils.metrics import metrics
+from .providers import provider_router
+
+
+def error_response(error):
+    """Dict error dari APIClient -> Response dengan status HTTP dan Retry-After bila ada"""
+    response = Response({'error': error['error']}, status=error.get('status', 200))
+    if 'retry_after' in error:
+        response['Retry-After'] = str(error['retry_after'])
+    return response
+
+
+class EndpointView(APIView):
+    """View generik untuk satu Endpoint di services.endpoints"""
     permission_classes = [HasAPIKey]
+    endpoint = None
 
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
+    @method_decorator(api_key_ratelimit)
     def get(self, request, format=None):
-        city = request.GET.get('city', 'London')
-        country = request.GET.get('country', 'UK')
-
-        client = APIClient()
-        results = client.make_request(
-            'openweather',
-            '/weather',
-            params={'q': f"{city},{country}", 'units': 'metric'},
-            user=request.user
-        )
-
-        return Response(results)
-
+        try:
+            cleaned = self.endpoint.clean(request.GET)
+            results = self.fetch(APIClient(), request, cleaned)
+        except ParamError as e:
+            return Response({'error': str(e)}, status=400)
 
-class UnifiedNewsView(APIView):
-    permission_classes = [HasAPIKey]
+        if isinstance(results, dict) and 'error' in results:
+            return error_response(results)
 
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        category = request.GET.get('category', 'general')
-
-        client = APIClient()
-        results = client.make_request(
-            'newsapi',
-            '/v2/top-headlines',
-            params={'category': category, 'pageSize': 10},
-            user=request.user
-        )
+        fields = request.GET.get('fields')
+        if fields:
+            results = project(results, compile_projection(fields))
 
         return Response(results)
 
-
-class GitHubUserInfoView(APIView):
-    permission_classes = [HasAPIKey]
-
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        username = request.GET.get('username')
-
-        if not username:
-            return Response({'error': 'Username parameter required'}, status=400)
-
-        client = APIClient()
-        results = client.make_request(
-            'github',
-            f'/users/{username}',
-            user=request.user
+    def fetch(self, client, request, cleaned):
+        path, params = self.endpoint.build(cleaned)
+
+        variant = self.endpoint.local_values(cleaned)
+        if self.endpoint.derive is not None and variant:
+            return client.make_derived_request(
+                self.endpoint.service,
+                path,
+                params=params,
+                user=request.user,
+                spec=self.endpoint,
+                variant=variant
+            )
+
+        return client.make_request(
+            self.endpoint.service,
+            path,
+            params=params,
+            user=request.user,
+            spec=self.endpoint
         )
 
-        return Response(results)
+    @classmethod
+    def for_endpoint(cls, endpoint):
+        view_name = ''.join(part.capitalize() for part in endpoint.name.split('-')) + 'View'
+        return type(view_name, (cls,), {'endpoint': endpoint})
 
 
-class CGSimplePriceView(APIView):
-    permission_classes = [HasAPIKey]
+class CoinHistoryView(EndpointView):
+    """
+    History untuk tanggal yang sudah lewat tidak pernah berubah: dilayani dari
+    history_store, dan upstream hanya dipanggil sekali per (coin, tanggal).
+    """
 
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        crypto_ids = request.GET.get('ids')
-        vs_currencies = request.GET.get('vs_currencies')
-
-        missing = False
-        if not crypto_ids and not vs_currencies:
-            missing = "ids and vs_currencies"
-        elif not crypto_ids:
-            missing = "ids"
-        elif not vs_currencies:
-            missing = "vs_currencies"
-
-        if missing:
-            return Response({'error': f'{missing} parameter required'}, status=400)
-
-        client = APIClient()
-        results = client.make_request(
-            'coingecko',
-            '/simple/price',
-            params={'ids': crypto_ids, 'vs_currencies': vs_currencies},
-            user=request.user
-        )
+    def fetch(self, client, request, cleaned):
+        date = parse_date(cleaned['date'])
 
-        return Response(results)
+        snapshot = history_store.get(cleaned['id'], date)
+        if snapshot is not None:
+            return snapshot
 
+        if not within_public_history_range(date):
+            raise ParamError('Your request exceeds the allowed time range. Public API users are limited to querying historical data within the past 365 days.')
 
-class CGCoinDetailView(APIView):
-    permission_classes = [HasAPIKey]
-
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        crypto_id = request.GET.get('id')
-
-        if not crypto_id:
-            return Response({'error': 'id parameter required'}, status=400)
-
-        client = APIClient()
-        results = client.make_request(
-            'coingecko',
-            f'/coins/{crypto_id}',
-            user=request.user
-        )
+        results = super().fetch(client, request, cleaned)
+        if isinstance(results, dict) and 'error' not in results:
+            history_store.save(cleaned['id'], date, results)
+        return results
 
-        return Response(results)
 
+class SimplePriceView(EndpointView):
+    """Cache miss digabung dengan request lain yang bersamaan lewat price_batcher"""
 
-class CGCoinMarketChartView(APIView):
-    permission_classes = [HasAPIKey]
+    def fetch(self, client, request, cleaned):
+        path, params = self.endpoint.build(cleaned)
+        cached = client.get_cached(self.endpoint.service, path, params, user=request.user, log=True)
+        if cached is not None:
+            return cached
 
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        vs_currency = request.GET.get('vs_currency')
-        days = request.GET.get('days')
-        crypto_id = request.GET.get('id')
-
-        if not vs_currency or not days or not crypto_id:
-            return Response({'error': 'parameters vs_currency, days and id required'}, status=400)
-
-        client = APIClient()
-        results = client.make_request(
-            'coingecko',
-            f'/coins/{crypto_id}/market_chart',
-            params={"vs_currency": vs_currency, "days": days},
-            user=request.user
+        data = price_batcher.get(
+            client,
+            params['ids'].split(','),
+            params['vs_currencies'].split(','),
+            user=request.user,
+            spec=self.endpoint
         )
+        if not (isinstance(data, dict) and 'error' in data):
+            client.set_cached(self.endpoint.service, path, params, data, self.endpoint.get_ttl(params),
+                              spec=self.endpoint)
+        return data
+
+
+class ProviderView(EndpointView):
+    """
+    Endpoint yang bisa dilayani beberapa provider (ThirdPartyService.capability);
+    tanpa provider yang dikonfigurasi, request langsung ke endpoint.service.
+    """
+    capability = None
+    operation = None
+
+    def fetch(self, client, request, cleaned):
+        results = provider_router.call(
+            client, self.capability, self.operation, cleaned, user=request.user, spec=self.endpoint
+        )
+        if results is None:
+            return super().fetch(client, request, cleaned)
+        return results
 
-        return Response(results)
-
-
-class CGHistoryCoinView(APIView):
-    permission_classes = [HasAPIKey]
-
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        date = request.GET.get('date')
-
-        try:
-            input_date = datetime.strptime(date, "%d-%m-%Y")
-        except ValueError:
-            return Response({'error': 'Invalid date format. Expected dd-mm-yyyy'}, status=400)
-
-        if not date:
-            return Response({'error': 'date parameter required'}, status=400)
-
-        crypto_id = request.GET.get('id')
-
-        if not crypto_id:
-            return Response({'error': 'id parameter required'}, status=400)
-
-        today = datetime.today().date()
 
-        difference = today - input_date.date()
+class ExchangesRateView(ProviderView):
+    capability = 'fx'
+    operation = 'latest'
 
-        if difference.days > 365:
-            return Response({'error': 'Your request exceeds the allowed time range. Public API users are limited to querying historical data within the past 365 days.'}, status=400)
 
-        client = APIClient()
-        results = client.make_request(
-            'coingecko',
-            f'/coins/{crypto_id}/history',
-            params={"date": date},
-            user=request.user
-        )
+class PairView(ProviderView):
+    capability = 'fx'
+    operation = 'pair'
 
-        return Response(results)
 
+class PriceStreamView(View):
+    """
+    Server-Sent Events: harga `ids` x `vs_currencies` dari price_stream_hub. Event pertama
+    berisi snapshot (jika sudah ada), selanjutnya hanya nilai yang berubah.
 
-class CGSearchView(APIView):
-    permission_classes = [HasAPIKey]
+    Hanya bisa dilayani lewat ASGI (api_aggregator.asgi): di bawah WSGI/runserver Django
+    mem-buffer seluruh async iterator, sehingga stream tanpa akhir tidak pernah mengirim
+    byte dan menahan worker. Request lewat WSGI mendapat 501.
+    """
+    heartbeat = 15
+    max_ids = 100
 
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        query = request.GET.get('query')
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {'error': 'The price stream requires an ASGI server (api_aggregator.asgi:application)'}, status=501
+            )
 
-        if not query:
-            return Response({'error': 'query parameter required'}, status=400)
+        if not await sync_to_async(HasAPIKey().has_permission)(request, self):
+            return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
 
-        client = APIClient()
-        results = client.make_request(
-            'coingecko',
-            '/search',
-            params={"query": query},
-            user=request.user
-        )
+        # Satu koneksi stream dihitung sebagai satu request
+        limit, period = get_plan_rate(request.api_key_plan)
+        result = rate_limiter.hit(f"key:{request.api_key_id}", limit, period)
+        if not result.allowed:
+            response = JsonResponse({'error': 'Rate limit exceeded'}, status=429)
+            for header, value in result.headers().items():
+                response[header] = value
+            return response
 
-        return Response(results)
+        try:
+            cleaned = get_endpoint('simple-price').clean(request.GET)
+        except ParamError as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
+        ids = cleaned['ids'].split(',')
+        if len(ids) > self.max_ids:
+            return JsonResponse({'error': f'A maximum of {self.max_ids} ids is allowed per stream'}, status=400)
 
-class CGSearchTrendingView(APIView):
-    permission_classes = [HasAPIKey]
-
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        client = APIClient()
-        results = client.make_request(
-            'coingecko',
-            '/search/trending',
-            user=request.user
+        response = StreamingHttpResponse(
+            self.events(ids, cleaned['vs_currencies'].split(',')),
+            content_type='text/event-stream'
         )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
-        return Response(results)
-
-
-class CGExchangesView(APIView):
+    async def events(self, ids, vs_currencies):
+        subscription = price_stream_hub.subscribe(ids, vs_currencies)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    update = await asyncio.wait_for(subscription.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield f"event: price\ndata: {json.dumps(update)}\n\n"
+        finally:
+            price_stream_hub.unsubscribe(subscription)
+
+
+class WeatherBatchView(EndpointView):
+    """Cuaca banyak lokasi (ids, cities, coords) dengan cache per lokasi"""
+
+    def fetch(self, client, request, cleaned):
+        locations = weather_batch_locations(cleaned)
+        return WeatherBatch(client, get_endpoint('unified-weather'), user=request.user).fetch(locations)
+
+
+class GitHubUsersView(EndpointView):
+    """Banyak user GitHub sekaligus lewat GraphQL, cache per user dipakai bersama /api/github/user/"""
+
+    def fetch(self, client, request, cleaned):
+        spec = get_endpoint('github-user')
+        service = service_registry.get(spec.service)
+        graphql = service is not None and spec.auth.has_key(service.api_key)
+        return GitHubUserBatch(client, spec, user=request.user).fetch(cleaned['usernames'], graphql=graphql)
+
+
+class CoinMarketChartView(EndpointView):
+    """
+    market_chart dilayani dari market_chart_store: upstream hanya dipanggil untuk ekor data
+    yang belum tersimpan, window `days` diambil dengan slicing.
+    """
+
+    def fetch(self, client, request, cleaned):
+        days = cleaned['days']
+        path, params = self.endpoint.build(cleaned)
+
+        def load():
+            return market_chart_store.get_chart(
+                client, cleaned['id'], cleaned['vs_currency'], days, user=request.user
+            )
+
+        variant = self.endpoint.local_values(cleaned)
+        if variant:
+            return client.make_derived_request(
+                self.endpoint.service,
+                path,
+                params=params,
+                user=request.user,
+                spec=self.endpoint,
+                variant=variant,
+                source=load
+            )
+        return load()
+
+
+class CoinSearchView(EndpointView):
+    """
+    Autocomplete dijawab dari coin_search_index; upstream /search hanya dipakai
+    selama index belum pernah dibangun (cold start).
+    """
+
+    def fetch(self, client, request, cleaned):
+        if coin_search_index.stale:
+            coin_search_index.refresh_async()
+
+        coins = coin_search_index.search(cleaned['query'])
+        if coins is None:
+            return super().fetch(client, request, cleaned)
+        return {'coins': coins, 'exchanges': [], 'icos': [], 'categories': [], 'nfts': []}
+
+
+class CoinHistoryRangeView(APIView):
+    """Banyak tanggal history sekaligus, hanya dari history_store (tanpa request upstream)"""
     permission_classes = [HasAPIKey]
+    max_days = 366
 
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
+    @method_decorator(api_key_ratelimit)
     def get(self, request, format=None):
-        client = APIClient()
-        results = client.make_request(
-            'coingecko',
-            '/exchanges',
-            user=request.user
-        )
+        coin_id = request.GET.get('id', '').strip().lower()
+        start = request.GET.get('from')
+        end = request.GET.get('to')
 
-        return Response(results)
+        if not coin_id or not start or not end:
+            return Response({'error': 'parameters id, from and to required'}, status=400)
 
+        try:
+            start, end = parse_date(start), parse_date(end)
+        except ValueError:
+            return Response({'error': 'Invalid date format. Expected dd-mm-yyyy'}, status=400)
 
-class CGExchangesDetailView(APIView):
-    permission_classes = [HasAPIKey]
+        if end < start or (end - start).days >= self.max_days:
+            return Response({'error': f'Date range must be between 1 and {self.max_days} days'}, status=400)
 
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        exchangesId = request.GET.get('id')
+        snapshots, missing = history_store.get_range(coin_id, start, end)
+        return Response({'id': coin_id, 'snapshots': snapshots, 'missing': missing})
 
-        if not exchangesId:
-            return Response({'error': 'id parameter required'}, status=400)
 
-        client = APIClient()
-        results = client.make_request(
-            'coingecko',
-            f'/exchanges/{exchangesId}',
-            user=request.user
-        )
+class CachePurgeView(APIView):
+    """Purge entry cache yang punya semua tag yang diberikan (staff only)"""
+    permission_classes = [IsAdminUser]
 
-        return Response(results)
+    def post(self, request, format=None):
+        tags = request.data.get('tags')
+        if (not isinstance(tags, list) or not tags
+                or not all(isinstance(tag, str) and tag.startswith(TAG_PREFIXES) for tag in tags)):
+            return Response(
+                {'error': "tags must be a non-empty list of 'service:', 'endpoint:' or 'param:' tags"}, status=400
+            )
+        return Response({'tags': tags, 'purged': file_cache.purge(tags)})
 
 
-class ExchangesRateView(APIView):
-    permission_classes = [HasAPIKey]
+class CacheTTLView(APIView):
+    """TTL cache yang dipelajari per endpoint (staff only)"""
+    permission_classes = [IsAdminUser]
 
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
     def get(self, request, format=None):
-        currency = request.GET.get("currency")
+        return Response(adaptive_ttl.stats())
 
-        if not currency:
-            return Response({'error': 'currency parameter required'}, status=400)
 
-        client = APIClient()
-        results = client.make_request(
-            'exchangeRate',
-            f'/latest/{currency}',
-            user=request.user
-        )
-
-        return Response(results)
+class MetricsView(View):
+    """
+    Metrics format Prometheus. Hanya untuk staff (session login) atau scraper dengan
+    'Authorization: Bearer <METRICS['token']>', karena isinya termasuk TTL yang dipelajari,
+    state circuit breaker dan admission control.
+    """
 
-
-class ConvertCurrencyView(APIView):
-    permission_classes = [HasAPIKey]
-
-    @method_decorator(ratelimit(key='ip', rate='10/m', method='GET', block=True))
-    def get(self, request, format=None):
-        fromCurrency = request.GET.get("from")
-        to = request.GET.get("to")
-        amount = request.GET.get("amount")
-
-        if not amount:
-            amount = ""
-        elif not amount.isdigit():
-            return Response({'error': 'The parameter \'amount\' must be a number.'}, status=400)
-        else:
-            pass
-
-        if not fromCurrency or not to:
-            return Response({'error': 'parameters from and to is required'}, status=400)
-
-        client = APIClient()
-        results = client.make_request(
-            'exchangeRate',
-            f'/pair/{fromCurrency}/{to}/{amount}',
-            user=request.user
+    def get(self, request):
+        token = getattr(settings, 'METRICS', {}).get('token')
+        user = getattr(request, 'user', None)
+        authorized = (user is not None and user.is_staff) or (
+            token and hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f"Bearer {token}")
         )
-
-        return Response(results)
+        if not authorized:
+            return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+ENDPOINT_VIEW_CLASSES = {
+    'simple-price': SimplePriceView,
+    'weather-batch': WeatherBatchView,
+    'github-users': GitHubUsersView,
+    'coins-history': CoinHistoryView,
+    'coins-market-chart': CoinMarketChartView,
+    'search': CoinSearchView,
+    'exchanges-rate': ExchangesRateView,
+    'pair': PairView,
+}
+
+ENDPOINT_VIEWS = {
+    endpoint.name: ENDPOINT_VIEW_CLASSES.get(endpoint.name, EndpointView).for_endpoint(endpoint)
+    for endpoint in ENDPOINTS
+}
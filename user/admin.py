@@ -3,5 +3,6 @@ from .models import UserAPIKey
 
 @admin.register(UserAPIKey)
 class UserAPIKeyAdmin(admin.ModelAdmin):
-    list_display = ['name', 'user', 'prefix', 'created', 'revoked']
+    list_display = ['name', 'user', 'prefix', 'plan', 'created', 'revoked']
+    list_filter = ['plan', 'revoked']
     search_fields = ['user__username', 'name']
@@ -3,7 +3,14 @@ from django.db import models
 from rest_framework_api_key.models import AbstractAPIKey
 
 class UserAPIKey(AbstractAPIKey):
+    PLAN_CHOICES = [
+        ('free', 'Free'),
+        ('pro', 'Pro'),
+        ('enterprise', 'Enterprise'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="api_key")
+    plan = models.CharField(max_length=20, choices=PLAN_CHOICES, default='free')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):